@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# For tlm_adjoint copyright information see ACKNOWLEDGEMENTS in the tlm_adjoint
+# root directory
+
+# This file is part of tlm_adjoint.
+#
+# tlm_adjoint is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# tlm_adjoint is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
+
+# Compare checkpointing schedules, without running a model, across a grid of
+# numbers of blocks and snapshots. Costs are expressed relative to the cost of
+# one forward block.
+
+from tlm_adjoint.checkpoint_schedules import benchmark_schedules
+
+import argparse
+
+parser = argparse.ArgumentParser(
+    description="Checkpointing schedule benchmark")
+parser.add_argument("--blocks", type=int, nargs="+",
+                    default=[10, 100, 1000],
+                    help="Numbers of blocks")
+parser.add_argument("--snapshots", type=int, nargs="+",
+                    default=[1, 3, 10, 30],
+                    help="Numbers of snapshots")
+parser.add_argument("--adjoint-cost", type=float, default=2.0,
+                    help="Adjoint block cost")
+parser.add_argument("--ram-cost", type=float, default=0.01,
+                    help="RAM snapshot write and read cost")
+parser.add_argument("--disk-cost", type=float, default=0.2,
+                    help="Disk snapshot write and read cost")
+args = parser.parse_args()
+
+results = benchmark_schedules(
+    args.blocks, args.snapshots,
+    adjoint_cost=args.adjoint_cost,
+    write_cost={"RAM": args.ram_cost, "disk": args.disk_cost},
+    read_cost={"RAM": args.ram_cost, "disk": args.disk_cost})
+
+print(f"{'schedule':14s} {'n':>6s} {'s':>4s} {'forward':>9s} "
+      f"{'writes':>11s} {'reads':>11s} {'snapshots':>11s} {'data':>6s} "
+      f"{'time':>10s}")
+for result in results:
+    writes = f"{result['writes']['RAM']:d}/{result['writes']['disk']:d}"
+    reads = f"{result['reads']['RAM']:d}/{result['reads']['disk']:d}"
+    snapshots = (f"{result['max_snapshots']['RAM']:d}/"
+                 f"{result['max_snapshots']['disk']:d}")
+    print(f"{result['schedule']:14s} {result['n']:6d} {result['s']:4d} "
+          f"{result['forward_steps']:9d} {writes:>11s} {reads:>11s} "
+          f"{snapshots:>11s} {result['max_data']:6d} "
+          f"{result['time']:10.1f}")
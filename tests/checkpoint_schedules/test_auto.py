@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# For tlm_adjoint copyright information see ACKNOWLEDGEMENTS in the tlm_adjoint
+# root directory
+
+# This file is part of tlm_adjoint.
+#
+# tlm_adjoint is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# tlm_adjoint is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
+
+from tlm_adjoint.checkpoint_schedules import select_checkpoint_schedule, \
+    simulate_schedule
+
+import logging
+import pytest
+
+
+@pytest.mark.parametrize("n", [1, 2, 10, 100])
+@pytest.mark.parametrize("memory_limit", [1, 2, 5, 20, 1000])
+@pytest.mark.parametrize("disk_bandwidth", [None, 1.0, 0.01])
+def test_select_checkpoint_schedule(n, memory_limit, disk_bandwidth):
+    name, parameters, cp_schedule, info = select_checkpoint_schedule(
+        n, forward_cost=1.0, adjoint_cost=2.0, snapshot_size=1,
+        memory_limit=memory_limit, disk_bandwidth=disk_bandwidth)
+    assert name in {"multistage", "mixed", "two_level", "periodic_disk"}
+
+    # The prediction matches a simulation of the selected schedule
+    write_cost = {"disk": 0.0 if disk_bandwidth is None
+                  else 1.0 / disk_bandwidth}
+    result = simulate_schedule(cp_schedule, n,
+                               forward_cost=1.0, adjoint_cost=2.0,
+                               write_cost=write_cost, read_cost=write_cost)
+    assert result == info["predicted"]
+
+    # The memory limit is satisfied
+    assert (result["max_snapshots"]["RAM"] + result["max_data"]
+            <= memory_limit)
+
+    # The selected schedule has the minimal predicted time
+    times = [time for _, _, time, _ in info["candidates"] if time is not None]
+    assert result["time"] == min(times)
+
+    if disk_bandwidth is None and memory_limit >= n:
+        # No recomputation is needed
+        assert result["forward_steps"] == n
+
+
+def test_select_checkpoint_schedule_slow_disk(caplog):
+    n = 100
+    with caplog.at_level(logging.INFO, logger="tlm_adjoint.checkpointing"):
+        name, parameters, _, _ = select_checkpoint_schedule(
+            n, forward_cost=1.0, adjoint_cost=2.0, snapshot_size=1,
+            memory_limit=10, disk_bandwidth=1.0e-3)
+    # Disk access is expensive, so only RAM snapshots are used
+    assert name in {"multistage", "mixed"}
+    assert parameters.get("snaps_on_disk", 0) == 0
+    assert parameters.get("storage", "RAM") == "RAM"
+    assert "Selected checkpointing schedule" in caplog.text
+
+
+def test_select_checkpoint_schedule_errors():
+    with pytest.raises(ValueError, match="Memory limit"):
+        select_checkpoint_schedule(
+            10, forward_cost=1.0, adjoint_cost=2.0, snapshot_size=1,
+            data_size=2, memory_limit=1)
+    with pytest.raises(RuntimeError, match="memory limit"):
+        select_checkpoint_schedule(
+            10, forward_cost=1.0, adjoint_cost=2.0, snapshot_size=1,
+            memory_limit=1, disk_snapshots=0)
@@ -19,8 +19,10 @@
 # along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
 
 from tlm_adjoint.checkpoint_schedules import MultistageCheckpointSchedule, \
-    Clear, Configure, Forward, Reverse, Read, Write, EndForward, EndReverse
-from tlm_adjoint.checkpoint_schedules.binomial import optimal_steps
+    MultitierCheckpointSchedule, Clear, Configure, Forward, Reverse, Read, \
+    Write, EndForward, EndReverse
+from tlm_adjoint.checkpoint_schedules.binomial import allocate_snapshots, \
+    allocate_snapshots_tiers, optimal_steps
 
 import functools
 import pytest
@@ -213,3 +215,142 @@ def test_MultistageCheckpointSchedule(trajectory,
             pass
         except Exception:
             raise RuntimeError("Iterator not exhausted")
+
+
+@pytest.mark.parametrize("trajectory", ["revolve",
+                                        "maximum"])
+@pytest.mark.parametrize("n, S", [(2, (1,)),
+                                  (3, (1, 2)),
+                                  (10, tuple(range(1, 10))),
+                                  (100, tuple(range(1, 100, 7)))])
+def test_allocate_snapshots(trajectory,
+                            n, S):
+    @functools.singledispatch
+    def action(cp_action):
+        pass
+
+    @action.register(Read)
+    def action_read(cp_action):
+        assert snapshots[-1] == cp_action.n
+        weights[len(snapshots) - 1] += 1.0
+        if cp_action.delete:
+            weights[len(snapshots) - 1] += 10.0
+            snapshots.pop()
+
+    @action.register(Write)
+    def action_write(cp_action):
+        snapshots.append(cp_action.n)
+        weights[len(snapshots) - 1] += 100.0
+
+    for s in S:
+        print(f"{n=:d} {s=:d}")
+
+        cp_schedule = MultistageCheckpointSchedule(n, 0, s,
+                                                   trajectory=trajectory)
+        snapshots = []
+        weights = [0.0 for _ in range(s)]
+        while True:
+            cp_action = next(cp_schedule)
+            action(cp_action)
+            if isinstance(cp_action, EndReverse):
+                break
+
+        # Read and write counts match those for the schedule
+        assert allocate_snapshots(n, 1, s - 1,
+                                  write_weight=100.0, read_weight=1.0,
+                                  delete_weight=10.0,
+                                  trajectory=trajectory)[0] == tuple(weights)
+
+
+@pytest.mark.parametrize("n, S", [(2, (1,)),
+                                  (3, (1, 2)),
+                                  (10, tuple(range(1, 10))),
+                                  (100, tuple(range(1, 100, 7)))])
+def test_MultitierCheckpointSchedule(n, S):
+    @functools.singledispatch
+    def action(cp_action):
+        pass
+
+    @action.register(Forward)
+    def action_forward(cp_action):
+        nonlocal model_steps
+
+        model_steps += cp_action.n1 - cp_action.n0
+
+    @action.register(Read)
+    def action_read(cp_action):
+        assert snapshots[-1] == (cp_action.n, cp_action.storage)
+        counts[cp_action.storage] += 1
+        if cp_action.delete:
+            snapshots.pop()
+
+    @action.register(Write)
+    def action_write(cp_action):
+        snapshots.append((cp_action.n, cp_action.storage))
+        counts[cp_action.storage] += 1
+        for storage in tiers:
+            assert sum(1 for _, cp_storage in snapshots
+                       if cp_storage == storage) <= tiers[storage]
+
+    for s in S:
+        print(f"{n=:d} {s=:d}")
+
+        tiers = {"RAM": s // 3, "ssd": s // 3, "pfs": s - 2 * (s // 3)}
+        cp_schedule = MultitierCheckpointSchedule(n, tiers.items())
+        assert cp_schedule.uses_disk_storage()
+        assert sum(cp_schedule.tiers().values()) == s
+
+        model_steps = 0
+        snapshots = []
+        counts = {storage: 0 for storage in tiers}
+        while True:
+            cp_action = next(cp_schedule)
+            action(cp_action)
+            if isinstance(cp_action, EndReverse):
+                break
+
+        # The number of forward steps is independent of the allocation
+        assert model_steps == optimal_steps(n, s)
+        assert len(snapshots) == 0
+
+        # Snapshots are allocated in order of read/write counts
+        weights, allocation = allocate_snapshots_tiers(n, tiers.items())
+        order = {storage: i for i, storage in enumerate(tiers)}
+        for i in range(s):
+            for j in range(s):
+                if order[allocation[i]] < order[allocation[j]]:
+                    assert weights[i] >= weights[j]
+        if n > 3:
+            assert counts["pfs"] / tiers["pfs"] \
+                <= counts["RAM"] / max(tiers["RAM"], 1) or tiers["RAM"] == 0
+
+
+def test_allocate_snapshots_tiers():
+    for n in (2, 10, 100):
+        for s_ram in range(0, 5):
+            for s_disk in range(0, 5):
+                if s_ram + s_disk == 0:
+                    continue
+                assert allocate_snapshots_tiers(
+                    n, (("RAM", s_ram), ("disk", s_disk))) \
+                    == allocate_snapshots(n, s_ram, s_disk)
+
+
+@pytest.mark.parametrize("n, S", [(10 ** 5, (1, 10, 100)),
+                                  (10 ** 6, (10, 100))])
+def test_optimal_steps_closed_form(n, S):
+    def extra_steps(n, s):
+        # Binomial recursion, equation (2) of Griewank and Walther 2000,
+        # with the optimal split given by n_advance
+        from tlm_adjoint.checkpoint_schedules.binomial import n_advance
+        if n == 1:
+            return 0
+        s = min(s, n - 1)
+        if s == 1:
+            return n * (n - 1) // 2
+        i = n_advance(n, s)
+        return i + extra_steps(i, s) + extra_steps(n - i, s - 1)
+
+    for s in S:
+        print(f"{n=:d} {s=:d}")
+        assert optimal_steps(n, s) == n + extra_steps(n, s)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# For tlm_adjoint copyright information see ACKNOWLEDGEMENTS in the tlm_adjoint
+# root directory
+
+# This file is part of tlm_adjoint.
+#
+# tlm_adjoint is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# tlm_adjoint is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
+
+from tlm_adjoint.checkpoint_schedules import CostAwareCheckpointSchedule, \
+    MultistageCheckpointSchedule, Clear, Configure, Forward, Reverse, Read, \
+    Write, EndForward, EndReverse
+from tlm_adjoint.checkpoint_schedules.binomial import optimal_steps
+
+import functools
+import numpy as np
+import pytest
+
+
+def schedule_cost(cp_schedule, forward_costs, write_costs, read_costs):
+    @functools.singledispatch
+    def action(cp_action):
+        raise TypeError("Unexpected action")
+
+    @action.register(Clear)
+    @action.register(Configure)
+    @action.register(EndForward)
+    @action.register(Reverse)
+    @action.register(EndReverse)
+    def action_pass(cp_action):
+        pass
+
+    @action.register(Forward)
+    def action_forward(cp_action):
+        nonlocal cost
+
+        cost += forward_costs[cp_action.n0:cp_action.n1].sum()
+        if cp_action.n1 == len(forward_costs):
+            cp_schedule.finalize(cp_action.n1)
+
+    @action.register(Read)
+    def action_read(cp_action):
+        nonlocal cost
+
+        cost += read_costs[cp_action.n]
+
+    @action.register(Write)
+    def action_write(cp_action):
+        nonlocal cost
+
+        cost += write_costs[cp_action.n]
+
+    cost = 0.0
+    while True:
+        cp_action = next(cp_schedule)
+        action(cp_action)
+        if isinstance(cp_action, EndReverse):
+            break
+    return cost
+
+
+@pytest.mark.parametrize("n, S", [(1, (1,)),
+                                  (2, (1,)),
+                                  (3, (1, 2)),
+                                  (10, tuple(range(1, 10))),
+                                  (100, tuple(range(1, 100, 7)))])
+def test_CostAwareCheckpointSchedule_uniform(n, S):
+    for s in S:
+        print(f"{n=:d} {s=:d}")
+
+        cp_schedule = CostAwareCheckpointSchedule(np.ones(n), s)
+        assert cp_schedule.cost() == optimal_steps(n, s)
+        assert schedule_cost(cp_schedule, np.ones(n), np.zeros(n),
+                             np.zeros(n)) == optimal_steps(n, s)
+
+
+@pytest.mark.parametrize("n, S", [(2, (1,)),
+                                  (3, (1, 2)),
+                                  (10, tuple(range(1, 10))),
+                                  (50, (1, 2, 5, 10, 25))])
+def test_CostAwareCheckpointSchedule_non_uniform(n, S):
+    np.random.seed(76718 + n)
+    forward_costs = np.exp(2.0 * np.random.random(n))
+    write_costs = np.random.random(n)
+    read_costs = np.random.random(n)
+
+    for s in S:
+        print(f"{n=:d} {s=:d}")
+
+        cp_schedule = CostAwareCheckpointSchedule(
+            forward_costs, s,
+            write_costs=write_costs, read_costs=read_costs)
+        cost = schedule_cost(cp_schedule, forward_costs, write_costs,
+                             read_costs)
+        assert abs(cost - cp_schedule.cost()) < 1.0e-10 * cost
+
+        # No more expensive than binomial checkpointing
+        multistage_cost = schedule_cost(
+            MultistageCheckpointSchedule(n, 0, s),
+            forward_costs, write_costs, read_costs)
+        assert cost <= multistage_cost * (1.0 + 1.0e-12)
@@ -20,10 +20,14 @@
 
 from tlm_adjoint.checkpoint_schedules import MixedCheckpointSchedule, Clear, \
     Configure, Forward, Reverse, Read, Write, EndForward, EndReverse
-from tlm_adjoint.checkpoint_schedules.mixed import mixed_step_memoization, \
+from tlm_adjoint.checkpoint_schedules.mixed import mixed_steps_tables, \
+    mixed_steps_tabulation, mixed_steps_tabulation_0, \
+    mixed_steps_tabulation_0_numpy, mixed_steps_tabulation_numpy, \
     optimal_steps
 
 import functools
+import numpy as np
+import os
 import pytest
 
 
@@ -223,7 +227,7 @@ def test_MixedCheckpointSchedule(n, S):
 
         # The correct total number of forward steps has been taken
         assert model_steps == optimal_steps(n, s)
-        assert model_steps == mixed_step_memoization(n, s)[2]
+        assert model_steps == mixed_steps_tables(n, s)[0][n, s, 2]
         # No data is stored
         assert len(ics) == 0 and len(data) == 0
         # No checkpoints are stored
@@ -237,3 +241,37 @@ def test_MixedCheckpointSchedule(n, S):
             pass
         except Exception:
             raise RuntimeError("Iterator not exhausted")
+
+
+@pytest.mark.parametrize("n, s", [(1, 0),
+                                  (2, 1),
+                                  (10, 3),
+                                  (60, 20),
+                                  (40, 39)])
+def test_mixed_steps_tabulation_numpy(n, s):
+    schedule = mixed_steps_tabulation(n, s)
+    schedule_0 = mixed_steps_tabulation_0(n, s, schedule)
+    assert (mixed_steps_tabulation_numpy(n, s) == schedule).all()
+    assert (mixed_steps_tabulation_0_numpy(n, s, schedule) == schedule_0).all()  # noqa: E501
+
+
+def test_mixed_steps_tables(tmp_path):
+    cache_path = str(tmp_path / "cache")
+    schedule, schedule_0 = mixed_steps_tables(50, 7, cache_path=cache_path)
+    assert os.path.isfile(os.path.join(cache_path, "mixed_steps_50_7.npz"))
+
+    # Tables are reused for fewer steps and snapshots
+    schedule_1, schedule_0_1 = mixed_steps_tables(30, 5)
+    assert (schedule_1 == schedule[:31, :6, :]).all()
+    # Entries for the maximum number of snapshots are not used when a snapshot
+    # exists
+    assert (schedule_0_1[:, :5, :]
+            == mixed_steps_tabulation_0_numpy(30, 5, schedule_1)[:, :5, :]).all()  # noqa: E501
+
+    # Tables are loaded from disk
+    mixed_steps_tables(10, 9)
+    with np.load(os.path.join(cache_path, "mixed_steps_50_7.npz")) as tables:
+        assert (tables["schedule"] == schedule).all()
+    schedule_2, schedule_0_2 = mixed_steps_tables(50, 7, cache_path=cache_path)
+    assert (schedule_2 == schedule).all()
+    assert (schedule_0_2 == schedule_0).all()
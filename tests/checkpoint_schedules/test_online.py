@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# For tlm_adjoint copyright information see ACKNOWLEDGEMENTS in the tlm_adjoint
+# root directory
+
+# This file is part of tlm_adjoint.
+#
+# tlm_adjoint is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# tlm_adjoint is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
+from tlm_adjoint.checkpoint_schedules import OnlineCheckpointSchedule, \
+    Clear, Configure, Forward, Reverse, Read, Write, Delete, EndForward, \
+    EndReverse
+
+import functools
+import pytest
+
+
+@pytest.mark.parametrize("n, S", [(1, (1,)),
+                                  (2, (1,)),
+                                  (3, (1, 2)),
+                                  (10, tuple(range(1, 10))),
+                                  (100, tuple(range(1, 100, 7))),
+                                  (250, tuple(range(25, 250, 25)))])
+def test_OnlineCheckpointSchedule(n, S):
+    @functools.singledispatch
+    def action(cp_action):
+        raise TypeError("Unexpected action")
+
+    @action.register(Clear)
+    @action.register(Configure)
+    @action.register(EndForward)
+    def action_pass(cp_action):
+        pass
+
+    @action.register(Forward)
+    def action_forward(cp_action):
+        nonlocal model_n, model_steps
+
+        assert model_n == cp_action.n0
+        n1 = min(cp_action.n1, n)
+        model_n = n1
+        model_steps += n1 - cp_action.n0
+        if n1 == n and cp_schedule.max_n() is None:
+            cp_schedule.finalize(n1)
+
+    @action.register(Reverse)
+    def action_reverse(cp_action):
+        nonlocal model_r
+
+        model_r += cp_action.n1 - cp_action.n0
+
+    @action.register(Read)
+    def action_read(cp_action):
+        nonlocal model_n
+
+        assert cp_action.n in snapshots
+        model_n = cp_action.n
+        if cp_action.delete:
+            snapshots.remove(cp_action.n)
+
+    @action.register(Write)
+    def action_write(cp_action):
+        assert cp_action.n not in snapshots
+        snapshots.add(cp_action.n)
+
+    @action.register(Delete)
+    def action_delete(cp_action):
+        # Snapshots are only deleted in the forward
+        assert cp_schedule.max_n() is None
+        snapshots.remove(cp_action.n)
+
+    @action.register(EndReverse)
+    def action_end_reverse(cp_action):
+        nonlocal model_r
+
+        assert model_r == n
+        assert not cp_action.exhausted
+        model_r = 0
+
+    for s in S:
+        print(f"{n=:d} {s=:d}")
+
+        cp_schedule = OnlineCheckpointSchedule(s)
+        assert cp_schedule.max_n() is None
+
+        model_n = 0
+        model_r = 0
+        model_steps = 0
+        snapshots = set()
+
+        steps = []
+        for _ in range(2):
+            while True:
+                cp_action = next(cp_schedule)
+                action(cp_action)
+                assert len(snapshots) <= s
+                if isinstance(cp_action, EndForward):
+                    # No recomputation in the forward
+                    assert model_steps == n
+                if isinstance(cp_action, EndReverse):
+                    break
+            steps.append(model_steps)
+            model_steps = 0
+
+        # Bounds on the snapshot interval and the number of forward steps
+        d = cp_schedule._interval
+        assert d <= max(1, 2 * (n - 1) / s)
+        assert steps[0] <= n + n * (d + 1) / 2
+        # Repeated reverse, without the original forward
+        assert steps[1] == steps[0] - n
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# For tlm_adjoint copyright information see ACKNOWLEDGEMENTS in the tlm_adjoint
+# root directory
+
+# This file is part of tlm_adjoint.
+#
+# tlm_adjoint is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# tlm_adjoint is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
+
+from tlm_adjoint.checkpoint_schedules import MemoryCheckpointSchedule, \
+    MultistageCheckpointSchedule, MultitierCheckpointSchedule, \
+    OnlineCheckpointSchedule, PeriodicDiskCheckpointSchedule, \
+    benchmark_schedules, simulate_schedule
+from tlm_adjoint.checkpoint_schedules.binomial import optimal_steps
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("n, S", [(1, (0,)),
+                                  (2, (1,)),
+                                  (10, tuple(range(1, 10))),
+                                  (100, (1, 2, 5, 10, 50))])
+def test_simulate_multistage(n, S):
+    for s in S:
+        print(f"{n=:d} {s=:d}")
+
+        result = simulate_schedule(
+            MultistageCheckpointSchedule(n, 0, s), n,
+            forward_cost=2.0, adjoint_cost=3.0,
+            write_cost={"disk": 5.0}, read_cost={"disk": 7.0})
+        assert result["forward_steps"] == optimal_steps(n, s)
+        assert result["adjoint_steps"] == n
+        assert result["writes"]["RAM"] == 0
+        assert result["reads"]["RAM"] == 0
+        assert result["max_snapshots"]["RAM"] == 0
+        assert result["max_snapshots"]["disk"] == min(s, n - 1)
+        assert result["max_data"] == 1
+        # Each step in the reverse, except the last, starts from a snapshot
+        assert result["reads"]["disk"] == n - 1
+        assert result["time"] == (2.0 * result["forward_steps"]
+                                  + 3.0 * n
+                                  + 5.0 * result["writes"]["disk"]
+                                  + 7.0 * result["reads"]["disk"])
+
+
+def test_simulate_memory():
+    n = 10
+    result = simulate_schedule(MemoryCheckpointSchedule(), n, reverses=3,
+                               forward_cost=np.arange(n))
+    assert result["forward_steps"] == n
+    assert result["adjoint_steps"] == 3 * n
+    assert result["max_data"] == n + 1
+    assert result["time"] == np.arange(n).sum() + 3 * n
+
+
+@pytest.mark.parametrize("period", [1, 3, 7])
+def test_simulate_periodic_disk(period):
+    n = 20
+    result = simulate_schedule(PeriodicDiskCheckpointSchedule(period), n,
+                               reverses=2)
+    n_snapshots = -(-n // period)
+    assert result["forward_steps"] == 3 * n
+    assert result["writes"]["disk"] == n_snapshots
+    assert result["reads"]["disk"] == 2 * n_snapshots
+    assert result["max_snapshots"]["disk"] == n_snapshots
+    assert result["max_data"] == period
+
+
+def test_simulate_online():
+    n = 23
+    result = simulate_schedule(OnlineCheckpointSchedule(3), n)
+    # Snapshots are deleted in the forward
+    assert result["writes"]["disk"] > result["max_snapshots"]["disk"]
+    assert result["max_snapshots"]["disk"] == 3
+
+
+def test_simulate_exhausted():
+    with pytest.raises(RuntimeError, match="repeated adjoint"):
+        simulate_schedule(MultistageCheckpointSchedule(10, 0, 3), 10,
+                          reverses=2)
+
+
+def test_benchmark_schedules():
+    N = (10, 50)
+    S = (1, 4)
+    results = benchmark_schedules(N, S)
+    for n in N:
+        for s in S:
+            schedules = {result["schedule"]: result for result in results
+                         if result["n"] == n and result["s"] == s}
+            assert {"memory", "periodic_disk", "multistage", "two_level",
+                    "mixed", "online"}.issubset(set(schedules))
+            for result in schedules.values():
+                assert result["adjoint_steps"] == n
+                if result["schedule"] != "memory":
+                    assert (result["max_snapshots"]["RAM"]
+                            + result["max_snapshots"]["disk"]) <= s
+            # The mixed schedule is optimal in the number of forward steps,
+            # amongst the schedules which store data for at most one step
+            assert schedules["mixed"]["forward_steps"] \
+                == min(result["forward_steps"]
+                       for result in schedules.values()
+                       if result["max_data"] == 1)
+
+
+def test_simulate_schedule_tiers():
+    n = 50
+    cp_schedule = MultitierCheckpointSchedule(
+        n, (("RAM", 2), ("ssd", 2), ("pfs", 2)))
+    result = simulate_schedule(cp_schedule, n,
+                               write_cost={"ssd": 1.0, "pfs": 10.0},
+                               read_cost={"ssd": 1.0, "pfs": 10.0})
+
+    assert result["forward_steps"] == optimal_steps(n, 6)
+    assert result["max_snapshots"]["RAM"] == 2
+    assert result["max_snapshots"]["ssd"] == 2
+    assert result["max_snapshots"]["pfs"] == 2
+    assert result["max_snapshots"]["disk"] == 0
+    assert result["time"] == (optimal_steps(n, 6) + n
+                              + result["writes"]["ssd"]
+                              + result["reads"]["ssd"]
+                              + 10.0 * result["writes"]["pfs"]
+                              + 10.0 * result["reads"]["pfs"])
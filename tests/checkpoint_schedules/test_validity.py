@@ -19,16 +19,21 @@
 # along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
 
 from tlm_adjoint.checkpoint_schedules import \
-    Clear, Configure, Forward, Reverse, Read, Write, EndForward, EndReverse
+    (Clear, Configure, Forward, Reverse, Read, Write, Delete, EndForward,
+     EndReverse)
 from tlm_adjoint.checkpoint_schedules import \
     (MemoryCheckpointSchedule,
      PeriodicDiskCheckpointSchedule,
      MultistageCheckpointSchedule,
+     MultitierCheckpointSchedule,
      TwoLevelCheckpointSchedule,
      HRevolveCheckpointSchedule,
-     MixedCheckpointSchedule)
+     MixedCheckpointSchedule,
+     OnlineCheckpointSchedule,
+     CostAwareCheckpointSchedule)
 
 import functools
+import numpy as np
 import pytest
 
 try:
@@ -52,6 +57,12 @@ def multistage(n, s):
             {"RAM": 0, "disk": s}, 1)
 
 
+def multitier(n, s):
+    tiers = {"RAM": s // 3, "ssd": s // 3, "pfs": s - 2 * (s // 3)}
+    return (MultitierCheckpointSchedule(n, tiers.items()),
+            dict(tiers, disk=0), 1)
+
+
 def two_level(n, s, *, period):
     return (TwoLevelCheckpointSchedule(period, s, binomial_storage="RAM"),
             {"RAM": s, "disk": 1 + (n - 1) // period}, 1)
@@ -71,6 +82,24 @@ def mixed(n, s):
             {"RAM": 0, "disk": s}, 1)
 
 
+def online(n, s, *, storage):
+    s = max(s, 1)
+    return (OnlineCheckpointSchedule(s, storage=storage),
+            {"RAM": s if storage == "RAM" else 0,
+             "disk": s if storage == "disk" else 0}, 1)
+
+
+def cost_aware(n, s):
+    # Limit the number of snapshots, as the tabulation cost is O(n^3 s)
+    s = min(s, 20)
+    np.random.seed(2189 + n + s)
+    cp_schedule = CostAwareCheckpointSchedule(
+        np.random.random(n), s,
+        write_costs=np.random.random(n), read_costs=np.random.random(n))
+    return (cp_schedule,
+            {"RAM": 0, "disk": s}, 1)
+
+
 @pytest.mark.parametrize(
     "schedule, schedule_kwargs",
     [(memory, {}),
@@ -79,6 +108,7 @@ def mixed(n, s):
      (periodic_disk, {"period": 7}),
      (periodic_disk, {"period": 10}),
      (multistage, {}),
+     (multitier, {}),
      (two_level, {"period": 1}),
      (two_level, {"period": 2}),
      (two_level, {"period": 7}),
@@ -87,7 +117,10 @@ def mixed(n, s):
          h_revolve, {},
          marks=pytest.mark.skipif(hrevolve is None,
                                   reason="H-Revolve not available")),
-     (mixed, {})])
+     (mixed, {}),
+     (online, {"storage": "RAM"}),
+     (online, {"storage": "disk"}),
+     (cost_aware, {})])
 @pytest.mark.parametrize("n, S", [(1, (0,)),
                                   (2, (1,)),
                                   (3, (1, 2)),
@@ -204,6 +237,13 @@ def test_validity(schedule, schedule_kwargs,
 
         snapshots[cp_action.storage][cp_action.n] = (set(ics), set(data))
 
+    @action.register(Delete)
+    def action_delete(cp_action):
+        # The checkpoint exists
+        assert cp_action.n in snapshots[cp_action.storage]
+
+        del snapshots[cp_action.storage][cp_action.n]
+
     @action.register(EndForward)
     def action_end_forward(cp_action):
         # The correct number of forward steps has been taken
@@ -230,9 +270,8 @@ def test_validity(schedule, schedule_kwargs,
         store_data = False
         data = set()
 
-        snapshots = {"RAM": {}, "disk": {}}
-
         cp_schedule, storage_limits, data_limit = schedule(n, s, **schedule_kwargs)  # noqa: E501
+        snapshots = {storage_type: {} for storage_type in storage_limits}
         if cp_schedule is None:
             pytest.skip("Incompatible with schedule type")
         assert cp_schedule.n() == 0
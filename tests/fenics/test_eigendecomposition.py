@@ -27,6 +27,7 @@ from .test_base import *
 
 import mpi4py.MPI as MPI
 import numpy as np
+import os
 import petsc4py.PETSc as PETSc
 import pytest
 
@@ -182,3 +183,66 @@ def test_CachedHessian(setup_test):
         error = (np.array(sorted(lam.imag), dtype=np.float64)
                  - np.array(sorted(lam_opt.imag), dtype=np.float64))
         assert abs(error).max() == 0.0
+
+
+@pytest.mark.fenics
+@no_space_type_checking
+@seed_test
+def test_HEP_restart(setup_test, test_leaks, tmp_path):
+    mesh = UnitIntervalMesh(20)
+    space = FunctionSpace(mesh, "Lagrange", 1)
+    test, trial = TestFunction(space), TrialFunction(space)
+
+    M = assemble(inner(trial, test) * dx)
+    n_actions = [0]
+
+    def M_action(x):
+        n_actions[0] += 1
+        y = function_new_conjugate_dual(x)
+        assemble(inner(x, test) * dx, tensor=function_vector(y))
+        return y
+
+    import slepc4py.SLEPc as SLEPc
+    lam, V = eigendecompose(space, M_action, action_type="conjugate_dual",
+                            problem_type=SLEPc.EPS.ProblemType.HEP,
+                            path=str(tmp_path / "eigendecompose"))
+    assert n_actions[0] > 0
+    n_actions_0 = n_actions[0]
+
+    lam_V = []
+
+    def eigenpair_callback(i, lam_i, v_r, v_i):
+        assert v_i is None
+        assert i == len(lam_V)
+        lam_V.append((lam_i, function_copy(v_r)))
+
+    lam_restart, V_restart = eigendecompose(
+        space, M_action, action_type="conjugate_dual",
+        problem_type=SLEPc.EPS.ProblemType.HEP,
+        path=str(tmp_path / "eigendecompose"),
+        eigenpair_callback=eigenpair_callback)
+    assert n_actions[0] == n_actions_0
+    assert V_restart is None
+    assert (lam_restart == lam).all()
+
+    diff = Function(space)
+    assert len(lam_V) == len(lam)
+    for lam_val, v in lam_V:
+        matrix_multiply(M, function_vector(v),
+                        tensor=function_vector(diff))
+        function_axpy(diff, -lam_val, v)
+        assert function_linf_norm(diff) < 1.0e-16
+
+    # Simulate an interruption while writing the final record
+    filename = str(tmp_path / "eigendecompose" / "A_action_0.pickle")
+    if space_comm(space).rank == 0:
+        with open(filename, "r+b") as h:
+            h.truncate(os.path.getsize(filename) - 1)
+    space_comm(space).barrier()
+
+    lam_restart, V_restart = eigendecompose(
+        space, M_action, action_type="conjugate_dual",
+        problem_type=SLEPc.EPS.ProblemType.HEP,
+        path=str(tmp_path / "eigendecompose"))
+    assert n_actions[0] == n_actions_0 + 1
+    assert (lam_restart == lam).all()
@@ -1122,3 +1122,42 @@ def test_ZeroFunction(setup_test, test_leaks, test_configurations):
 
     min_order = taylor_test_tlm_adjoint(forward, m, adjoint_order=2)
     assert min_order > 2.00
+
+
+@pytest.mark.fenics
+@seed_test
+def test_Functional_addto_forms(setup_test, test_leaks):
+    mesh = UnitIntervalMesh(20)
+    X = SpatialCoordinate(mesh)
+    space = FunctionSpace(mesh, "Lagrange", 1)
+
+    y_refs = []
+    for i in range(5):
+        y_ref = Function(space, name=f"y_ref_{i:d}", static=True)
+        interpolate_expression(y_ref, sin((i + 1) * pi * X[0]))
+        y_refs.append(y_ref)
+
+    def forward(y):
+        J = Functional(name="J")
+        J.addto([inner(y - y_ref, y - y_ref) * dx for y_ref in y_refs])
+        return J
+
+    y = Function(space, name="y", static=True)
+    interpolate_expression(y, cos(pi * X[0]))
+
+    start_manager()
+    J = forward(y)
+    stop_manager()
+
+    # A single term equation, and a single accumulation equation
+    assert len(manager()._block) == 2
+    assert isinstance(manager()._block[0], Assembly)
+
+    J_val = J.value()
+    J_ref = sum(assemble(inner(y - y_ref, y - y_ref) * dx) for y_ref in y_refs)
+    assert abs(J_val - J_ref) < 1.0e-14
+
+    dJ = compute_gradient(J, y)
+
+    min_order = taylor_test(forward, y, J_val=J_val, dJ=dJ)
+    assert min_order > 1.99
@@ -129,3 +129,44 @@ def test_minimize_project_multiple(setup_test, test_leaks):
     function_assign(error, beta_ref)
     function_axpy(error, -1.0, beta)
     assert function_linf_norm(error) < 1.0e-9
+
+
+@pytest.mark.fenics
+@pytest.mark.skipif(complex_mode, reason="real only")
+@seed_test
+def test_minimize_l_bfgs_project(setup_test, test_leaks):
+    mesh = UnitSquareMesh(20, 20)
+    X = SpatialCoordinate(mesh)
+    space = FunctionSpace(mesh, "Lagrange", 1)
+    test, trial = TestFunction(space), TrialFunction(space)
+
+    def forward(alpha, x_ref=None):
+        x = Function(space, name="x")
+        solve(inner(trial, test) * dx == inner(alpha, test) * dx,
+              x, solver_parameters=ls_parameters_cg)
+
+        if x_ref is None:
+            x_ref = Function(space, name="x_ref", static=True)
+            function_assign(x_ref, x)
+
+        J = Functional(name="J")
+        J.assign(inner(x - x_ref, x - x_ref) * dx)
+        return x_ref, J
+
+    alpha_ref = Function(space, name="alpha_ref", static=True)
+    interpolate_expression(alpha_ref, exp(X[0] + X[1]))
+    x_ref, _ = forward(alpha_ref)
+
+    alpha0 = Function(space, name="alpha0", static=True)
+
+    def forward_J(alpha):
+        return forward(alpha, x_ref=x_ref)[1]
+
+    alpha, result = minimize_l_bfgs(forward_J, alpha0, m=30,
+                                    ftol=0.0, gtol=1.0e-10)
+    assert result.success
+
+    error = Function(space, name="error")
+    function_assign(error, alpha_ref)
+    function_axpy(error, -1.0, alpha)
+    assert function_linf_norm(error) < 1.0e-7
@@ -146,6 +146,106 @@ def test_Axpy(setup_test, test_leaks, test_default_dtypes):
     assert min_order > 2.00
 
 
+@pytest.mark.numpy
+@pytest.mark.parametrize("cp_method, cp_parameters",
+                         [("memory", {"drop_references": True}),
+                          ("multistage", {"blocks": 3, "snaps_in_ram": 1})])
+@no_space_type_checking
+@seed_test
+def test_fuse_linear_combinations(setup_test, test_leaks,
+                                  cp_method, cp_parameters):
+    x = Constant(1.0, name="x", static=True)
+    z = Constant(7.0, name="z", static=True)
+
+    def forward(x):
+        w = Constant(name="w")
+        y_keep = None
+        for step in range(3):
+            if y_keep is not None:
+                w_new = Constant(name="w")
+                Axpy(w_new, w, -1.0, y_keep).solve()
+                w = w_new
+                del w_new
+            y = [Constant(name=f"y_{i:d}") for i in range(5)]
+            Assignment(y[0], x).solve()
+            for i in range(len(y) - 1):
+                Axpy(y[i + 1], y[i], i + 1, z).solve()
+            # y[-2] is accessed after the block ends, and so is not
+            # eliminated
+            y_keep = y[-2]
+            w_new = Constant(name="w")
+            LinearCombination(w_new, (1.0, w), (2.0, y[-1])).solve()
+            w = w_new
+            del y, w_new
+            if step < 2:
+                new_block()
+
+        J = Functional(name="J")
+        DotProduct(J.function(), w, w).solve()
+        return J
+
+    old_manager = manager()
+    try:
+        set_manager(old_manager.new(cp_method, cp_parameters))
+        add_block_pass(fuse_linear_combinations)
+
+        start_manager()
+        J = forward(x)
+        stop_manager()
+
+        # y[0], y[1], y[2], and y[3] are fused, y[4] is eliminated, and
+        # intermediate values for w are eliminated. In the final block y[-2]
+        # is not accessed after the block ends, and so all values for y are
+        # eliminated.
+        dJ = compute_gradient(J, x)
+        assert len(manager()._blocks) == 3
+        for block in manager()._blocks:
+            assert len(block) == 2
+        # Replaced equations are not retained
+        assert len(manager()._eqs) == 6
+
+        J_val = J.value()
+        assert abs(J_val - 115600.0) == 0.0
+
+        dm = Constant(1.0, name="dm", static=True)
+
+        min_order = taylor_test(forward, x, J_val=J_val, dJ=dJ, dM=dm)
+        assert min_order > 2.00
+    finally:
+        set_manager(old_manager)
+
+
+@pytest.mark.numpy
+@no_space_type_checking
+@seed_test
+def test_fuse_linear_combinations_references(setup_test, test_leaks):
+    x = Constant(1.0, name="x", static=True)
+
+    old_manager = manager()
+    try:
+        set_manager(old_manager.new("memory", {}))
+        add_block_pass(fuse_linear_combinations)
+
+        start_manager()
+        y = [Constant(name=f"y_{i:d}") for i in range(5)]
+        Assignment(y[0], x).solve()
+        for i in range(len(y) - 1):
+            Axpy(y[i + 1], y[i], 2.0, x).solve()
+        J = Functional(name="J")
+        DotProduct(J.function(), y[-1], y[-1]).solve()
+        del y
+        stop_manager()
+
+        # The equation manager holds references to recorded equations, and
+        # so no equations are eliminated
+        with pytest.warns(UserWarning, match="considered live"):
+            manager().finalize()
+        assert len(manager()._blocks) == 1
+        assert len(manager()._blocks[0]) == 6
+    finally:
+        set_manager(old_manager)
+
+
 @pytest.mark.numpy
 @no_space_type_checking
 @seed_test
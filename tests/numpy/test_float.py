@@ -2,10 +2,13 @@
 # -*- coding: utf-8 -*-
 
 from tlm_adjoint.numpy import *
+from tlm_adjoint.equations import AndersonMixing
 
 from .test_base import *
 
+import numpy as np
 import pytest
+import sympy as sp
 
 pytestmark = pytest.mark.skipif(
     DEFAULT_COMM.size not in {1, 4},
@@ -23,3 +26,293 @@ def test_Float_new(setup_test, test_leaks,
     y = x.new(value)
     assert x.value() == 0.0
     assert y.value() == value
+
+
+@pytest.mark.numpy
+@seed_test
+def test_FloatEquation_compile_cache(setup_test, test_leaks):
+    def forward(m):
+        x = Float(1.0, name="x")
+        eqs = []
+        for i in range(3):
+            y = Float(name="y")
+            eq_0 = FloatEquation(y, x * x + 2.0 * x.sin())
+            eq_0.solve()
+            x = Float(name="x")
+            eq_1 = FloatEquation(x, y * m)
+            eq_1.solve()
+            eqs.append((eq_0, eq_1))
+        return x, eqs
+
+    def forward_J(m):
+        x, eqs = forward(m)
+        J = Functional(name="J")
+        J.assign(x * x)
+        return J, eqs
+
+    m = Float(0.3, name="m")
+    start_manager()
+    J, eqs = forward_J(m)
+    stop_manager()
+
+    # Structurally identical expressions share compiled code
+    for eq_0, eq_1 in eqs[1:]:
+        assert eq_0._F is eqs[0][0]._F
+        assert eq_1._F is eqs[0][1]._F
+        assert eq_0._dF[1] is eqs[0][0]._dF[1]
+
+    dJ = compute_gradient(J, m)
+
+    def forward_J_val(m):
+        J, _ = forward_J(m)
+        return J
+
+    min_order = taylor_test(forward_J_val, m, J_val=J.value(), dJ=dJ)
+    assert min_order > 1.99
+
+    min_order = taylor_test_tlm(forward_J_val, m, tlm_order=1)
+    assert min_order > 1.99
+
+
+@pytest.mark.numpy
+@seed_test
+def test_VectorizedFloatEquation(setup_test, test_leaks):
+    c = [Float(n + 1.0, name=f"c_{n:d}", static=True) for n in range(4)]
+
+    def forward(m):
+        X = [Float(name=f"x_{n:d}") for n in range(4)]
+        deps = [(m, c[0]), (c[1], m), (m, c[2]), (c[3], c[3])]
+        a, b = deps[0]
+        with paused_float_overloading():
+            expr = a * a * b + sp.sin(a) * b
+        VectorizedFloatEquation(X, expr, deps).solve()
+
+        J = Functional(name="J")
+        J.assign(X[0] * X[1] + X[2] * X[2] + X[3])
+        return J
+
+    m = Float(0.7, name="m")
+    start_manager()
+    J = forward(m)
+    stop_manager()
+
+    J_val = J.value()
+    x_0 = (0.7 ** 2 + np.sin(0.7)) * 1.0
+    x_1 = (2.0 ** 2 + np.sin(2.0)) * 0.7
+    x_2 = (0.7 ** 2 + np.sin(0.7)) * 3.0
+    x_3 = (4.0 ** 2 + np.sin(4.0)) * 4.0
+    J_ref = x_0 * x_1 + x_2 * x_2 + x_3
+    assert abs(J_val - J_ref) < 1.0e-13
+
+    dJ = compute_gradient(J, m)
+
+    min_order = taylor_test(forward, m, J_val=J_val, dJ=dJ)
+    assert min_order > 1.99
+
+    min_order = taylor_test_tlm(forward, m, tlm_order=1)
+    assert min_order > 1.99
+
+    min_order = taylor_test_tlm_adjoint(forward, m, adjoint_order=1)
+    assert min_order > 1.99
+
+    min_order = taylor_test_tlm_adjoint(forward, m, adjoint_order=2)
+    assert min_order > 1.99
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("cp_method, cp_parameters",
+                         [("memory", {"drop_references": True}),
+                          ("multistage", {"blocks": 4, "snaps_in_ram": 1})])
+@seed_test
+def test_vectorize_float_equations(setup_test, test_leaks,
+                                   cp_method, cp_parameters):
+    def forward(m):
+        X = [Float(n + 1.0, name=f"x_{n:d}") for n in range(5)]
+        for step in range(3):
+            Y = [Float(name=f"y_{n:d}") for n in range(5)]
+            for x, y in zip(X, Y):
+                with paused_float_overloading():
+                    expr = x * x * m + 0.1 * sp.sin(x)
+                FloatEquation(y, expr).solve()
+            X = Y
+            new_block()
+
+        J = Functional(name="J")
+        J.assign(X[0] * X[1] + X[-1])
+        return J
+
+    old_manager = manager()
+    try:
+        set_manager(old_manager.new(cp_method, cp_parameters))
+        add_block_pass(vectorize_float_equations)
+
+        m = Float(0.3, name="m")
+        start_manager()
+        J = forward(m)
+        stop_manager()
+
+        for block in manager()._blocks:
+            assert len(block) == 1
+            eq, = block
+            assert isinstance(eq, VectorizedFloatEquation)
+
+        J_val = J.value()
+        dJ = compute_gradient(J, m)
+
+        min_order = taylor_test(forward, m, J_val=J_val, dJ=dJ)
+        assert min_order > 1.99
+    finally:
+        set_manager(old_manager)
+
+
+@pytest.mark.numpy
+@seed_test
+def test_Functional_addto_terms(setup_test, test_leaks):
+    def forward(m):
+        x = m * m
+        terms = [x, m.sin(), x, m]
+
+        J = Functional(name="J")
+        J.assign(m)
+        J.addto(terms)
+        return J
+
+    m = Float(0.4, name="m")
+    start_manager()
+    J = forward(m)
+    stop_manager()
+
+    J_val = J.value()
+    assert abs(J_val - (2.0 * 0.4 + 2.0 * 0.4 * 0.4 + np.sin(0.4))) < 1.0e-15
+    # Two term equations, the assignment, and a single accumulation equation
+    assert len(manager()._block) == 4
+
+    dJ = compute_gradient(J, m)
+
+    min_order = taylor_test(forward, m, J_val=J_val, dJ=dJ)
+    assert min_order > 1.99
+
+    min_order = taylor_test_tlm(forward, m, tlm_order=1)
+    assert min_order > 1.99
+
+    min_order = taylor_test_tlm_adjoint(forward, m, adjoint_order=1)
+    assert min_order > 1.99
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("anderson_mixing", [1.0, 0.7])
+@seed_test
+def test_FixedPointSolver_anderson(setup_test, test_leaks,
+                                   anderson_mixing):
+    def forward(m, anderson_depth=3, maximum_iterations=40):
+        x = Float(name="x")
+        y = Float(name="y")
+        with paused_float_overloading():
+            eqs = [FloatEquation(y, 0.9 * sp.cos(x) + m),
+                   FloatEquation(x, 0.95 * y - 0.1 * sp.sin(y))]
+        FixedPointSolver(
+            eqs,
+            solver_parameters={"absolute_tolerance": 0.0,
+                               "relative_tolerance": 1.0e-14,
+                               "maximum_iterations": maximum_iterations,
+                               "anderson_depth": anderson_depth,
+                               "anderson_mixing": anderson_mixing}).solve()
+
+        J = Functional(name="J")
+        J.assign(x * x * y)
+        return J
+
+    m = Float(0.3, name="m")
+
+    # Picard iteration converges slowly for this problem
+    with pytest.raises(RuntimeError):
+        forward(m, anderson_depth=0)
+
+    start_manager()
+    J = forward(m)
+    stop_manager()
+
+    J_val = J.value()
+    assert abs(J_val - forward(m, anderson_depth=0,
+                               maximum_iterations=1000).value()) < 1.0e-13
+
+    dJ = compute_gradient(J, m)
+
+    min_order = taylor_test(forward, m, J_val=J_val, dJ=dJ)
+    assert min_order > 1.99
+
+    ddJ = Hessian(forward)
+    min_order = taylor_test(forward, m, J_val=J_val, ddJ=ddJ)
+    assert min_order > 2.99
+
+    min_order = taylor_test_tlm(forward, m, tlm_order=1)
+    assert min_order > 1.99
+
+    min_order = taylor_test_tlm_adjoint(forward, m, adjoint_order=1)
+    assert min_order > 1.99
+
+    min_order = taylor_test_tlm_adjoint(forward, m, adjoint_order=2)
+    assert min_order > 1.99
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("anderson_depth", [0, 2])
+@seed_test
+def test_FixedPointSolver_work_vectors(setup_test, test_leaks,
+                                       anderson_depth):
+    def forward(m, fp_eq=None):
+        if fp_eq is None:
+            x = Float(name="x")
+            y = Float(name="y")
+            with paused_float_overloading():
+                eqs = [FloatEquation(y, 0.5 * sp.cos(x) + m),
+                       Assignment(x, y)]
+            fp_eq = FixedPointSolver(
+                eqs,
+                solver_parameters={"absolute_tolerance": 0.0,
+                                   "relative_tolerance": 1.0e-14,
+                                   "anderson_depth": anderson_depth})
+        else:
+            x, y = fp_eq.X()
+        fp_eq.solve()
+
+        J_0 = Functional(name="J_0")
+        J_0.assign(x * x)
+        J_1 = Functional(name="J_1")
+        J_1.assign(x * y * y)
+        return fp_eq, J_0, J_1
+
+    m = Float(0.3, name="m")
+
+    start_manager()
+    _, J_0, J_1 = forward(m)
+    stop_manager()
+
+    dJ_0, dJ_1 = compute_gradient([J_0, J_1], m)
+
+    reset_manager()
+    start_manager()
+    # Solve using the same FixedPointSolver, so that work vectors are reused
+    fp_eq, _, _ = forward(m)
+    for i in range(2):
+        _, J_0, J_1 = forward(m, fp_eq=fp_eq)
+    stop_manager()
+
+    for i in range(2):
+        dJ_0_1, dJ_1_1 = compute_gradient([J_0, J_1], m)
+        assert abs(dJ_0_1.value() - dJ_0.value()) < 1.0e-14
+        assert abs(dJ_1_1.value() - dJ_1.value()) < 1.0e-14
+    assert len(fp_eq._work) == 2
+    # The Anderson mixing history is released at the end of each solve
+    for key in ["forward", "adjoint"]:
+        anderson = [work for work in fp_eq._work[key]
+                    if isinstance(work, AndersonMixing)]
+        if anderson_depth == 0:
+            assert len(anderson) == 0
+        else:
+            anderson, = anderson
+            assert anderson._G_0 is None
+            assert len(anderson._dG) == 0
+            assert len(anderson._free) == 0
+
+    del fp_eq
@@ -21,6 +21,12 @@
 from tlm_adjoint.numpy import *
 from tlm_adjoint.numpy import manager as _manager
 from tlm_adjoint.alias import WeakAlias
+from tlm_adjoint.checkpointing import ReplayStorage, nbytes_by_space, \
+    replay_next_use
+from tlm_adjoint.equations import ControlsMarker, FunctionalMarker
+from tlm_adjoint.tlm_adjoint import DependencyGraphTranspose
+from tlm_adjoint.verification import _mpi_initialized, perturbed_J_values
+from tlm_adjoint.checkpoint_schedules import CostAwareCheckpointSchedule
 from tlm_adjoint.checkpoint_schedules.binomial import optimal_steps
 
 from .test_base import *
@@ -467,6 +473,513 @@ def test_binomial_checkpointing(setup_test, test_leaks, test_default_dtypes,
     assert min_order > 1.99
 
 
+@pytest.mark.numpy
+@pytest.mark.parametrize("storage", ["RAM", "disk"])
+@pytest.mark.parametrize("snapshots", [1, 3, 10])
+@no_space_type_checking
+@seed_test
+def test_online_checkpointing(setup_test, test_leaks,
+                              tmp_path, storage, snapshots):
+    n_steps = 23
+    m_val = 1.05
+
+    def forward(m):
+        x = Constant(1.0, name="x")
+        for n in range(n_steps):
+            x_new = Constant(name="x")
+            DotProduct(x_new, x, m).solve()
+            x = x_new
+            if n < n_steps - 1:
+                new_block()
+
+        J = Functional(name="J")
+        DotProduct(J.function(), x, x).solve()
+        return J
+
+    # The number of blocks is not supplied
+    configure_checkpointing("online",
+                            {"snapshots": snapshots, "storage": storage,
+                             "path": str(tmp_path / "checkpoints~")})
+
+    m = Constant(m_val, name="m", static=True)
+
+    start_manager()
+    J = forward(m)
+    stop_manager()
+
+    J_val = J.value()
+    assert abs(J_val - m_val ** (2 * n_steps)) < 1.0e-13
+
+    for _ in range(2):
+        dJ = compute_gradient(J, m)
+        dJ_val = function_scalar_value(dJ)
+        assert abs(dJ_val - 2 * n_steps * m_val ** (2 * n_steps - 1)) \
+            < 1.0e-12
+
+    min_order = taylor_test(forward, m, J_val=J_val, dJ=dJ)
+    assert min_order > 1.99
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("memory_limit", [10, 100, 10000])
+@no_space_type_checking
+@seed_test
+def test_auto_checkpointing(setup_test, test_leaks,
+                            tmp_path, memory_limit):
+    m_val = 1.05
+
+    def forward(m, n_steps):
+        x = Constant(1.0, name="x")
+        for n in range(n_steps):
+            x_new = Constant(name="x")
+            DotProduct(x_new, x, m).solve()
+            x = x_new
+            if n < n_steps - 1:
+                new_block()
+
+        J = Functional(name="J")
+        DotProduct(J.function(), x, x).solve()
+        return J
+
+    m = Constant(m_val, name="m", static=True)
+
+    calibration = calibrate_checkpointing(
+        lambda m: forward(m, 3), m,
+        path=str(tmp_path / "checkpoints~"))
+    assert calibration["blocks"] == 3
+    assert calibration["forward_cost"] > 0.0
+    assert calibration["adjoint_cost"] > 0.0
+    assert calibration["snapshot_size"] > 0
+    assert calibration["data_size"] > 0
+    assert calibration["disk_bandwidth"] > 0.0
+    assert len(manager()._blocks) == 0
+
+    # Sizes relative to the calibrated snapshot size
+    n_steps = 23
+    calibration["data_size"] = calibration["snapshot_size"]
+    configure_checkpointing(
+        "auto",
+        {"blocks": n_steps, "calibration": calibration,
+         "memory_limit": memory_limit * calibration["snapshot_size"],
+         "path": str(tmp_path / "checkpoints~")})
+    name, parameters, info = manager()._cp_auto
+    print(f"{name=:s} {parameters=}")
+    assert (info["predicted"]["max_snapshots"]["RAM"]
+            + info["predicted"]["max_data"]) <= memory_limit
+
+    start_manager()
+    J = forward(m, n_steps)
+    stop_manager()
+
+    J_val = J.value()
+    assert abs(J_val - m_val ** (2 * n_steps)) < 1.0e-13
+
+    dJ = compute_gradient(J, m)
+    dJ_val = function_scalar_value(dJ)
+    assert abs(dJ_val - 2 * n_steps * m_val ** (2 * n_steps - 1)) < 1.0e-12
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("storage", ["RAM", "disk"])
+@pytest.mark.parametrize("snapshots", [1, 3, 10])
+@no_space_type_checking
+@seed_test
+def test_cost_aware_checkpointing(setup_test, test_leaks,
+                                  tmp_path, storage, snapshots):
+    n_steps = 23
+    m_val = 1.05
+    forward_costs = np.linspace(1.0, 3.0, n_steps)
+
+    def forward(m):
+        x = Constant(1.0, name="x")
+        for n in range(n_steps):
+            x_new = Constant(name="x")
+            DotProduct(x_new, x, m).solve()
+            x = x_new
+            if n < n_steps - 1:
+                new_block()
+
+        J = Functional(name="J")
+        DotProduct(J.function(), x, x).solve()
+        return J
+
+    configure_checkpointing(CostAwareCheckpointSchedule,
+                            {"forward_costs": forward_costs,
+                             "snapshots": snapshots, "storage": storage,
+                             "write_costs": 0.5, "read_costs": 0.5,
+                             "path": str(tmp_path / "checkpoints~")})
+
+    m = Constant(m_val, name="m", static=True)
+
+    start_manager()
+    J = forward(m)
+    stop_manager()
+
+    J_val = J.value()
+    assert abs(J_val - m_val ** (2 * n_steps)) < 1.0e-13
+
+    dJ = compute_gradient(J, m)
+    dJ_val = function_scalar_value(dJ)
+    assert abs(dJ_val - 2 * n_steps * m_val ** (2 * n_steps - 1)) < 1.0e-12
+
+    min_order = taylor_test(forward, m, J_val=J_val, dJ=dJ)
+    assert min_order > 1.99
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("tiers", [(("RAM", 1), ("ssd", 2), ("pfs", 3)),
+                                   (("ssd", 2), ("pfs", 10)),
+                                   (("ssd", 1), ("disk", 1), ("pfs", 1))])
+@no_space_type_checking
+@seed_test
+def test_multitier_checkpointing(setup_test, test_leaks,
+                                 tmp_path, tiers):
+    n_steps = 20
+    m_val = 1.05
+
+    def forward(m):
+        x = Constant(1.0, name="x")
+        for n in range(n_steps):
+            x_new = Constant(name="x")
+            DotProduct(x_new, x, m).solve()
+            x = x_new
+            if n < n_steps - 1:
+                new_block()
+
+        J = Functional(name="J")
+        DotProduct(J.function(), x, x).solve()
+        return J
+
+    configure_checkpointing(
+        "multitier",
+        {"blocks": n_steps, "tiers": tiers,
+         "path": str(tmp_path / "checkpoints~"),
+         "storage_tiers": {"ssd": {"path": str(tmp_path / "ssd"),
+                                   "format": "pickle"},
+                           "pfs": {"path": str(tmp_path / "pfs")}}})
+
+    m = Constant(m_val, name="m", static=True)
+
+    start_manager()
+    J = forward(m)
+    stop_manager()
+
+    J_val = J.value()
+    assert abs(J_val - m_val ** (2 * n_steps)) < 1.0e-13
+
+    dJ = compute_gradient(J, m)
+    dJ_val = function_scalar_value(dJ)
+    assert abs(dJ_val - 2 * n_steps * m_val ** (2 * n_steps - 1)) < 1.0e-12
+
+    assert (tmp_path / "ssd").exists()
+    assert (tmp_path / "pfs").exists()
+    assert (tmp_path / "checkpoints~").exists() \
+        == ("disk" in dict(tiers))
+
+
+@pytest.mark.numpy
+@no_space_type_checking
+@seed_test
+def test_memory_usage(setup_test, test_leaks,
+                      tmp_path):
+    n_steps = 10
+
+    configure_checkpointing(
+        "multistage",
+        {"blocks": n_steps, "snaps_on_disk": 2, "snaps_in_ram": 2,
+         "path": str(tmp_path / "checkpoints~"), "format": "pickle"})
+
+    m = Constant(1.05, name="m", static=True)
+
+    start_manager()
+    x = Constant(1.0, name="x")
+    X = [x]
+    for n in range(n_steps):
+        x_new = Constant(name="x")
+        DotProduct(x_new, x, m).solve()
+        x = x_new
+        X.append(x)
+        if n < n_steps - 1:
+            new_block()
+    J = Functional(name="J")
+    DotProduct(J.function(), x, x).solve()
+    stop_manager()
+
+    usage = _manager().memory_usage()
+    assert sorted(usage["snapshots"]) == ["RAM", "disk"]
+    assert len(usage["snapshots"]["RAM"]) == 2
+    assert len(usage["snapshots"]["disk"]) == 2
+    memory = 0
+    for storage, cp_nbytes in usage["snapshots"].items():
+        tier_nbytes = {}
+        for n, n_nbytes in cp_nbytes.items():
+            # Each snapshot contains the forward restart value at the start
+            # of block n. The static control is stored by reference.
+            assert n_nbytes == nbytes_by_space([X[n]])
+            tier_nbytes.update(n_nbytes)
+        assert usage["tiers"][storage] == tier_nbytes
+        assert usage["peak"]["tiers"][storage] \
+            == sum(tier_nbytes.values())
+        if storage == "RAM":
+            memory += sum(tier_nbytes.values())
+    # Non-linear dependency data for the last block
+    assert usage["storage"] == nbytes_by_space(X[-2:])
+    # Running totals agree with the stored values
+    cp = _manager()._cp
+    assert usage["storage"] == nbytes_by_space(
+        value for key, value in cp._storage.items()
+        if key not in cp._refs_keys)
+    assert cp.total_nbytes() == sum(usage["storage"].values())
+    del cp
+    assert usage["adjoint_cache"] == {}
+    memory += sum(usage["storage"].values())
+    assert usage["memory"] == memory
+    assert usage["peak"]["memory"] == memory
+
+    compute_gradient(J, m)
+
+    usage_1 = _manager().memory_usage()
+    assert usage_1["snapshots"] == {"RAM": {}, "disk": {}}
+    assert usage_1["tiers"] == {"RAM": {}, "disk": {}}
+    assert usage_1["storage"] == {}
+    assert usage_1["memory"] == 0
+    # Snapshots are reused in the reverse, so peak snapshot storage is
+    # unchanged
+    assert usage_1["peak"]["tiers"] == usage["peak"]["tiers"]
+    assert usage_1["peak"]["memory"] >= usage["peak"]["memory"]
+
+    lines = []
+    _manager().info(info=lines.append)
+    assert "Memory usage (bytes, this process):" in lines
+    assert f'  Memory: 0, peak {usage_1["peak"]["memory"]:d}' in lines
+
+
+@pytest.mark.numpy
+@seed_test
+def test_replay_next_use(setup_test):
+    no_block = 10
+    dep_ids = np.random.randint(5, size=(100,)).astype(np.int64)
+    thresholds = np.random.randint(-1, no_block + 1,
+                                   size=(100,)).astype(np.int64)
+
+    next_use = replay_next_use(dep_ids, thresholds, no_block)
+    for j in range(dep_ids.shape[0]):
+        later = thresholds[j + 1:][dep_ids[j + 1:] == dep_ids[j]]
+        assert next_use[j] == min(later.tolist() + [no_block])
+
+    assert replay_next_use(np.zeros(0, dtype=np.int64),
+                           np.zeros(0, dtype=np.int64), no_block).shape == (0,)
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("prune_forward", [True, False])
+@no_space_type_checking
+@seed_test
+def test_replay_data(setup_test, test_leaks,
+                     prune_forward):
+    class InPlaceUpdate(Equation):
+        # x <- x * (1 + y)
+        def __init__(self, x, y):
+            super().__init__(x, deps=[x, y], nl_deps=[x, y], ic=True,
+                             adj_ic=False)
+
+        def forward_solve(self, x, deps=None):
+            _, y = self.dependencies() if deps is None else deps
+            function_assign(x, function_scalar_value(x)
+                            * (1.0 + function_scalar_value(y)))
+
+    m = Constant(2.0, name="m", static=True)
+    p = Constant(3.0, name="p", static=True)
+
+    start_manager()
+    x = Constant(1.0, name="x")
+    z = Constant(name="z")
+    for n in range(6):
+        x_new = Constant(name="x")
+        Axpy(x_new, x, 1.0, m).solve()
+        x = x_new
+        if n % 2 == 0:
+            Axpy(z, x, 1.0, p).solve()
+        else:
+            InPlaceUpdate(z, x).solve()
+        if n == 3:
+            x_new = Constant(name="x")
+            DotProduct(x_new, x, z).solve()
+            x = x_new
+        new_block()
+    J = Functional(name="J")
+    DotProduct(J.function(), x, x).solve()
+    stop_manager()
+
+    # As in EquationManager.compute_gradient
+    manager = _manager()
+    blocks = {-1: [ControlsMarker([m])]}
+    for n, block in enumerate(manager._blocks + [manager._block]):
+        blocks[n] = block
+    blocks_N = len(blocks) - 1
+    blocks[blocks_N] = [FunctionalMarker(J)]
+    del manager
+    transpose_deps = DependencyGraphTranspose(
+        [blocks[blocks_N][0].x()], [m], blocks, prune_forward=prune_forward)
+
+    n_active = 0
+    for N0 in range(blocks_N):
+        for N1 in range(N0 + 1, blocks_N + 1):
+            storage_0 = ReplayStorage(blocks, N0, N1,
+                                      transpose_deps=transpose_deps)
+            storage_1 = ReplayStorage(
+                blocks, N0, N1,
+                replay_data=transpose_deps.replay_data())
+            assert set(storage_0) == set(storage_1)
+            for n in range(N0, N1):
+                for i in range(len(blocks[n])):
+                    assert storage_0.is_active(n, i) \
+                        == storage_1.is_active(n, i)
+                    n_active += int(storage_1.is_active(n, i))
+                    assert storage_0.pop() == storage_1.pop() == (n, i)
+                    assert set(storage_0) == set(storage_1)
+            assert len(storage_0) == len(storage_1) == 0
+    assert n_active > 0
+
+
+@pytest.mark.numpy
+@no_space_type_checking
+@seed_test
+def test_tape_profile(setup_test, test_leaks, test_default_dtypes):
+    def forward(m0, m1):
+        J_0 = Constant(name="J_0")
+        DotProduct(J_0, m0, m0).solve()
+        J_1 = Constant(name="J_1")
+        DotProduct(J_1, m1, m1).solve()
+
+        J = Functional(name="J")
+        J.assign(J_0)
+        J.addto(J_1)
+        return J
+
+    m0 = Constant(2.0, name="m0", static=True)
+    m1 = Constant(3.0, name="m1", static=True)
+
+    profile = TapeProfile()
+    set_tape_profile(profile)
+
+    # Only the equations involving m0 are active
+    for _ in range(2):
+        reset_manager("memory", {"drop_references": True})
+        start_manager()
+        J = forward(m0, m1)
+        stop_manager()
+
+        dJ = compute_gradient(J, m0)
+        assert function_scalar_value(dJ) == 4.0
+    assert _manager()._tape_profile_skipped == {(0, 1)}
+
+    # Non-linear dependency data for the equation involving m1 is now needed
+    dJ = compute_gradient(J, m1)
+    assert function_scalar_value(dJ) == 6.0
+    assert len(_manager()._tape_profile_skipped) == 0
+
+    reset_manager("memory", {"drop_references": True})
+    start_manager()
+    J = forward(m0, m1)
+    stop_manager()
+    assert len(_manager()._tape_profile_skipped) == 0
+
+    dJ = compute_gradient(J, m1)
+    assert function_scalar_value(dJ) == 6.0
+
+    min_order = taylor_test(lambda m: forward(m0, m), m1, J_val=J.value(),
+                            dJ=dJ)
+    assert min_order > 1.99
+
+    set_tape_profile(None)
+
+
+@pytest.mark.numpy
+@seed_test
+def test_AdjointBufferPool(setup_test, test_leaks):
+    space = FunctionSpace(10)
+    pool = AdjointBufferPool()
+
+    x = Function(space, name="x")
+    function_set_values(x, np.random.random(function_local_size(x)))
+
+    y = pool.copy(x)
+    assert function_id(y) != function_id(x)
+    assert function_space_type(y) == "primal"
+    assert (function_get_values(y) == function_get_values(x)).all()
+
+    # Released functions are reused, with value zero
+    pool.release(y)
+    z = pool.new(x)
+    assert z is y
+    assert (function_get_values(z) == 0.0).all()
+    assert pool.info() == {"new": 1, "reused": 1, "free": 0}
+
+    # Functions with a different space type are not reused
+    pool.release(z)
+    w = pool.new(x, rel_space_type="conjugate_dual")
+    assert w is not z
+    assert function_space_type(w) == "conjugate_dual"
+    assert pool.info() == {"new": 2, "reused": 1, "free": 1}
+
+    # Functions not allocated by the pool, and functions which have already
+    # been released, are ignored
+    pool.release(x, z)
+    assert pool.info()["free"] == 1
+
+    pool.clear()
+    assert pool.info()["free"] == 0
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize(
+    "kwargs, cleanups",
+    [({}, 10),
+     ({"interval": 2}, 6),
+     ({"interval": None}, 2),
+     ({"interval": None, "rss_threshold": 0}, 10),
+     ({"enabled": False}, 0)])
+@no_space_type_checking
+@seed_test
+def test_GarbageCleanupPolicy(setup_test, test_leaks,
+                              kwargs, cleanups):
+    policy = GarbageCleanupPolicy(**kwargs)
+    set_garbage_cleanup_policy(policy)
+    try:
+        # One opportunity on reset
+        reset_manager("memory", {"drop_references": True})
+
+        m = Constant(2.0, name="m", static=True)
+        start_manager()
+        x = Constant(name="x")
+        Assignment(x, m).solve()
+        # Two opportunities on ending the blocks
+        for _ in range(2):
+            new_block()
+            x_new = Constant(name="x")
+            Axpy(x_new, x, 1.0, m).solve()
+            x = x_new
+        J = Functional(name="J")
+        DotProduct(J.function(), x, x).solve()
+        stop_manager()
+
+        # One further opportunity on finalization, five for the adjoint
+        # blocks, including the functional and control blocks, and one at the
+        # end of the adjoint calculation
+        dJ = compute_gradient(J, m)
+        assert function_scalar_value(dJ) == 36.0
+
+        info = policy.info()
+        if kwargs.get("enabled", True):
+            assert info["opportunities"] == 10
+        else:
+            assert info["opportunities"] == 0
+        assert info["cleanups"] == cleanups
+    finally:
+        set_garbage_cleanup_policy(GarbageCleanupPolicy())
+
+
 @pytest.mark.numpy
 @pytest.mark.parametrize("max_degree", [1, 2, 3, 4, 5])
 @no_space_type_checking
@@ -535,3 +1048,112 @@ def test_tlm_annotation(setup_test, test_leaks):
     stop_manager()
 
     assert len(manager()._blocks) == 0 and len(manager()._block) == 2
+
+
+def taylor_test_processes(processes):
+    if processes == "comm":
+        MPI = pytest.importorskip("mpi4py.MPI")
+        return MPI.COMM_WORLD
+    elif isinstance(processes, int) and _mpi_initialized():
+        with pytest.raises(RuntimeError):
+            perturbed_J_values(lambda i: float(i), 2, processes=processes)
+        pytest.skip("Process pool unsupported when MPI has been initialized")
+    else:
+        return processes
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("processes", [None, 2, "comm"])
+@seed_test
+def test_taylor_test_processes(setup_test, test_leaks,
+                               processes):
+    processes = taylor_test_processes(processes)
+
+    def forward(x, y):
+        return (x ** 3) * y + 2.0 * x * (y ** 2)
+
+    x = Float(0.7, name="x")
+    y = Float(-1.3, name="y")
+
+    start_manager()
+    J = forward(x, y)
+    stop_manager()
+
+    J_val = J.value()
+    dJ = compute_gradient(J, (x, y))
+
+    min_order = taylor_test(forward, (x, y), J_val=J_val, dJ=dJ,
+                            processes=processes)
+    assert min_order > 1.99
+
+    min_order = taylor_test_tlm(forward, (x, y), tlm_order=1,
+                                processes=processes)
+    assert min_order > 1.99
+
+    min_order = taylor_test_tlm_adjoint(forward, (x, y), adjoint_order=2,
+                                        processes=processes)
+    assert min_order > 1.99
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("processes", [None, 2, "comm"])
+@seed_test
+def test_taylor_test_all(setup_test, test_leaks,
+                         processes):
+    processes = taylor_test_processes(processes)
+
+    def forward(x, y):
+        return (x ** 3) * y + 2.0 * x * (y ** 2)
+
+    x = Float(0.7, name="x")
+    y = Float(-1.3, name="y")
+
+    min_orders = taylor_test_all(forward, (x, y), processes=processes)
+    assert min_orders["forward"] > 0.99
+    assert min_orders["tlm"] > 1.99
+    assert min_orders["adjoint"] > 1.99
+    assert min_orders["hessian"] > 2.99
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("processes", [None, 2, "comm"])
+@seed_test
+def test_taylor_test_tlm_adjoint_orders(setup_test, test_leaks,
+                                        processes):
+    processes = taylor_test_processes(processes)
+
+    def forward(x, y):
+        return (x ** 3) * y + 2.0 * x * (y ** 2)
+
+    x = Float(0.7, name="x")
+    y = Float(-1.3, name="y")
+
+    min_orders = taylor_test_tlm_adjoint_orders(forward, (x, y),
+                                                adjoint_order=3,
+                                                processes=processes)
+    assert len(min_orders) == 3
+    for min_order in min_orders:
+        assert min_order > 1.99
+
+
+@pytest.mark.numpy
+@seed_test
+def test_taylor_test_tlm_adjoint_orders_dMs(setup_test, test_leaks):
+    def forward(x, y):
+        return (x ** 3) * y + 2.0 * x * (y ** 2)
+
+    x = Float(0.7, name="x")
+    y = Float(-1.3, name="y")
+    dMs = ((Float(0.3), Float(-0.2)),
+           (Float(-0.1), Float(0.5)),
+           (Float(0.4), Float(0.6)))
+
+    min_orders = taylor_test_tlm_adjoint_orders(forward, (x, y),
+                                                adjoint_order=3, dMs=dMs)
+    assert len(min_orders) == 3
+    for k, min_order in enumerate(min_orders):
+        min_order_ref = taylor_test_tlm_adjoint(forward, (x, y),
+                                                adjoint_order=k + 1,
+                                                dMs=dMs[:k + 1])
+        assert min_order > 1.98
+        assert abs(min_order - min_order_ref) < 1.0e-10
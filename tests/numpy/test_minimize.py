@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# For tlm_adjoint copyright information see ACKNOWLEDGEMENTS in the tlm_adjoint
+# root directory
+
+# This file is part of tlm_adjoint.
+#
+# tlm_adjoint is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# tlm_adjoint is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
+
+from tlm_adjoint.numpy import *
+
+from .test_base import *
+
+import numpy as np
+import pytest
+
+try:
+    import mpi4py.MPI as MPI
+    pytestmark = pytest.mark.skipif(
+        MPI.COMM_WORLD.size != 1, reason="serial only")
+except ImportError:
+    pass
+
+
+def rosenbrock(x, y):
+    return (1.0 - x) ** 2 + 100.0 * (y - x ** 2) ** 2
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("m", [5, 10])
+@seed_test
+def test_minimize_l_bfgs_rosenbrock(setup_test, test_leaks,
+                                    m):
+    x0 = Float(-1.2, name="x0")
+    y0 = Float(1.0, name="y0")
+
+    (x, y), result = minimize_l_bfgs(rosenbrock, (x0, y0), m=m,
+                                     ftol=0.0, gtol=1.0e-8)
+    assert result.success
+    assert abs(x.value() - 1.0) < 1.0e-7
+    assert abs(y.value() - 1.0) < 1.0e-7
+    assert result.nit < 100
+
+
+@pytest.mark.numpy
+@seed_test
+def test_minimize_l_bfgs_bounds(setup_test, test_leaks):
+    x0 = Float(-1.2, name="x0")
+    y0 = Float(1.0, name="y0")
+
+    (x, y), result = minimize_l_bfgs(rosenbrock, (x0, y0),
+                                     ftol=0.0, gtol=1.0e-10,
+                                     bounds=((None, 0.5), (-1.0, 1.0)))
+    assert result.success
+    assert x.value() == 0.5
+    assert abs(y.value() - 0.25) < 1.0e-9
+
+
+@pytest.mark.numpy
+@no_space_type_checking
+@seed_test
+def test_minimize_l_bfgs_project(setup_test, test_leaks):
+    space = FunctionSpace(10)
+    alpha_ref = Function(space, name="alpha_ref", static=True)
+    function_set_values(alpha_ref,
+                        np.exp(np.linspace(0.0, 1.0, 10, dtype=np.float64)))
+    A = np.diag(np.arange(1.0, 11.0, dtype=np.float64))
+
+    def forward(alpha):
+        x = Function(space, name="x")
+        Contraction(x, A, (1,), (alpha,)).solve()
+
+        x_ref = Function(space, name="x_ref")
+        Contraction(x_ref, A, (1,), (alpha_ref,)).solve()
+
+        e = Function(space, name="e")
+        Axpy(e, x, -1.0, x_ref).solve()
+
+        J = Functional(name="J")
+        DotProduct(J.function(), e, e).solve()
+        return J
+
+    alpha0 = Function(space, name="alpha0", static=True)
+    alpha, result = minimize_l_bfgs(forward, alpha0, ftol=0.0, gtol=1.0e-10)
+    assert result.success
+
+    error = function_copy(alpha_ref, name="error")
+    function_axpy(error, -1.0, alpha)
+    assert function_linf_norm(error) < 1.0e-10
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("cache_size, jac_with_fun", [(0, False),
+                                                      (1, False),
+                                                      (1, True),
+                                                      (10, True)])
+@seed_test
+def test_minimize_scipy_cache(setup_test, test_leaks,
+                              cache_size, jac_with_fun):
+    n_forward = [0]
+
+    def forward(x, y):
+        n_forward[0] += 1
+        return rosenbrock(x, y)
+
+    x0 = Float(-1.2, name="x0")
+    y0 = Float(1.0, name="y0")
+
+    (x, y), result = minimize_scipy(forward, (x0, y0), method="BFGS",
+                                    cache_size=cache_size,
+                                    jac_with_fun=jac_with_fun,
+                                    options={"gtol": 1.0e-8})
+    assert result.success
+    assert abs(x.value() - 1.0) < 1.0e-7
+    assert abs(y.value() - 1.0) < 1.0e-7
+    assert n_forward[0] == result.nfev
+
+
+@pytest.mark.numpy
+@pytest.mark.parametrize("cache_size, n_forward_ref", [(0, 4),
+                                                       (1, 4),
+                                                       (2, 2)])
+@seed_test
+def test_minimize_scipy_cache_revisit(setup_test, test_leaks,
+                                      cache_size, n_forward_ref):
+    from scipy.optimize import OptimizeResult
+
+    n_forward = [0]
+
+    def forward(x, y):
+        n_forward[0] += 1
+        return rosenbrock(x, y)
+
+    def revisit(fun, x0, args=(), jac=None, **kwargs):
+        # Evaluate the functional and its derivative at two alternating points
+        x1 = x0 + 0.1
+        values = []
+        for x in (x0, x1, x0, x1):
+            values.append((fun(x), jac(x)))
+        assert values[2][0] == values[0][0]
+        assert (values[2][1] == values[0][1]).all()
+        assert values[3][0] == values[1][0]
+        assert (values[3][1] == values[1][1]).all()
+        return OptimizeResult(x=x1, fun=values[-1][0], jac=values[-1][1],
+                              success=True, nfev=4, njev=4, nit=0)
+
+    x0 = Float(-1.2, name="x0")
+    y0 = Float(1.0, name="y0")
+
+    (x, y), result = minimize_scipy(forward, (x0, y0), method=revisit,
+                                    cache_size=cache_size)
+    assert result.success
+    assert n_forward[0] == n_forward_ref
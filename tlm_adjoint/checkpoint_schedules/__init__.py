@@ -5,3 +5,7 @@ from .periodic import *  # noqa: F401
 from .binomial import *  # noqa: F401
 from .h_revolve import *  # noqa: F401
 from .mixed import *  # noqa: F401
+from .online import *  # noqa: F401
+from .cost_aware import *  # noqa: F401
+from .simulator import *  # noqa: F401
+from .auto import *  # noqa: F401
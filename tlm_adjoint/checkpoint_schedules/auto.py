@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# For tlm_adjoint copyright information see ACKNOWLEDGEMENTS in the tlm_adjoint
+# root directory
+
+# This file is part of tlm_adjoint.
+#
+# tlm_adjoint is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# tlm_adjoint is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
+
+from .periodic import PeriodicDiskCheckpointSchedule
+from .binomial import MultistageCheckpointSchedule, \
+    TwoLevelCheckpointSchedule
+from .mixed import MixedCheckpointSchedule
+from .simulator import simulate_schedule
+
+import functools
+import logging
+
+__all__ = \
+    [
+        "select_checkpoint_schedule"
+    ]
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def _candidates(n, s_ram, s_disk, data_limit):
+    # Candidate schedules, as (name, parameters, callable) tuples
+
+    candidates = []
+
+    # Multistage, with snapshots in RAM, on disk, or both
+    for snaps_in_ram, snaps_on_disk in sorted({(s_ram, 0), (0, s_disk),
+                                               (s_ram, s_disk)}):
+        if snaps_in_ram + snaps_on_disk >= min(1, n - 1):
+            candidates.append(
+                ("multistage",
+                 {"snaps_in_ram": snaps_in_ram,
+                  "snaps_on_disk": snaps_on_disk},
+                 functools.partial(MultistageCheckpointSchedule,
+                                   n, snaps_in_ram, snaps_on_disk)))
+
+    # Mixed, with snapshots in RAM or on disk
+    for snapshots, storage in ((s_ram, "RAM"), (s_disk, "disk")):
+        if snapshots >= min(1, n - 1):
+            candidates.append(
+                ("mixed",
+                 {"snapshots": snapshots, "storage": storage},
+                 functools.partial(MixedCheckpointSchedule,
+                                   n, snapshots, storage=storage)))
+
+    # Two-level, with binomial snapshots in RAM, and periods for which the
+    # number of disk snapshots is within the limit
+    if s_disk > 0:
+        periods = set()
+        k = 1
+        while k <= n:
+            period = _ceil_div(n, k)
+            if _ceil_div(n, period) <= s_disk:
+                periods.add(period)
+            k *= 2
+        for period in sorted(periods):
+            candidates.append(
+                ("two_level",
+                 {"period": period, "binomial_snapshots": s_ram},
+                 functools.partial(TwoLevelCheckpointSchedule,
+                                   period, s_ram, binomial_storage="RAM")))
+
+    # Periodic disk, with the largest period for which the non-linear
+    # dependency data fits within the limit
+    period = min(data_limit, n)
+    if period >= 1 and _ceil_div(n, period) <= s_disk:
+        candidates.append(
+            ("periodic_disk",
+             {"period": period},
+             functools.partial(PeriodicDiskCheckpointSchedule, period)))
+
+    return candidates
+
+
+def select_checkpoint_schedule(n, *, forward_cost, adjoint_cost,
+                               snapshot_size, memory_limit, data_size=None,
+                               disk_bandwidth=None, ram_bandwidth=None,
+                               disk_snapshots=None):
+    """
+    Select a checkpointing schedule to minimize the predicted total wall time
+    of a forward and an adjoint calculation, subject to a memory limit.
+    Candidate MultistageCheckpointSchedule, MixedCheckpointSchedule,
+    TwoLevelCheckpointSchedule, and PeriodicDiskCheckpointSchedule schedules
+    are simulated using simulate_schedule.
+
+    The memory usage of a schedule is estimated as the maximum number of
+    snapshots in RAM multiplied by snapshot_size, plus the maximum number of
+    blocks of data held outside of snapshots multiplied by data_size.
+
+    Returns a tuple (name, parameters, cp_schedule, info). name is the name of
+    the selected schedule, one of "multistage", "mixed", "two_level", or
+    "periodic_disk", parameters is a dictionary of schedule parameters, and
+    cp_schedule is the CheckpointSchedule. info is a dictionary containing the
+    key "predicted", whose value is the simulate_schedule result for the
+    selected schedule, and the key "candidates", whose value is a list of
+    (name, parameters, predicted time, predicted memory) tuples for all
+    candidates. The predicted time is None for candidates which exceed the
+    memory limit. The decision is logged.
+
+    Arguments:
+
+    n               The number of forward blocks.
+    forward_cost    The wall time for a forward block.
+    adjoint_cost    The wall time for an adjoint block.
+    snapshot_size   The size, in bytes, of a snapshot.
+    memory_limit    The maximum memory usage, in bytes.
+    data_size       (Optional) The size, in bytes, of the data stored for one
+                    block outside of snapshots. Defaults to snapshot_size.
+    disk_bandwidth  (Optional) The disk bandwidth, in bytes per second.
+                    Defaults to no disk cost.
+    ram_bandwidth   (Optional) The RAM bandwidth, in bytes per second.
+                    Defaults to no RAM cost.
+    disk_snapshots  (Optional) The maximum number of snapshots stored on disk.
+                    Defaults to no limit.
+    """
+
+    if n < 1:
+        raise ValueError("Require at least one block")
+    if snapshot_size <= 0:
+        raise ValueError("Invalid snapshot size")
+    if data_size is None:
+        data_size = snapshot_size
+    elif data_size <= 0:
+        raise ValueError("Invalid data size")
+    if disk_snapshots is None:
+        disk_snapshots = max(n - 1, 1)
+
+    if memory_limit < data_size:
+        raise ValueError("Memory limit too small")
+    s_ram = min(int((memory_limit - data_size) // snapshot_size), n - 1)
+    s_disk = min(disk_snapshots, max(n - 1, 1))
+    data_limit = int(memory_limit // data_size)
+
+    write_cost = {"RAM": 0.0 if ram_bandwidth is None
+                  else snapshot_size / ram_bandwidth,
+                  "disk": 0.0 if disk_bandwidth is None
+                  else snapshot_size / disk_bandwidth}
+
+    logger = logging.getLogger("tlm_adjoint.checkpointing")
+
+    selected = None
+    info = {"candidates": []}
+    for name, parameters, cp_schedule in _candidates(n, s_ram, s_disk,
+                                                     data_limit):
+        result = simulate_schedule(
+            cp_schedule(), n,
+            forward_cost=forward_cost, adjoint_cost=adjoint_cost,
+            write_cost=write_cost, read_cost=write_cost)
+        memory = (result["max_snapshots"]["RAM"] * snapshot_size
+                  + result["max_data"] * data_size)
+        if memory > memory_limit:
+            time = None
+        else:
+            time = result["time"]
+            if selected is None or time < selected[3]["time"]:
+                selected = (name, parameters, cp_schedule, result)
+        info["candidates"].append((name, parameters, time, memory))
+        logger.debug(f"Checkpointing candidate {name:s} {parameters}: "
+                     f"predicted time {time}, predicted memory {memory}")
+
+    if selected is None:
+        raise RuntimeError("No checkpointing schedule satisfies the memory "
+                           "limit")
+    name, parameters, cp_schedule, result = selected
+    info["predicted"] = result
+    logger.info(f"Selected checkpointing schedule {name:s} {parameters}: "
+                f"predicted time {result['time']:.6g}, predicted forward "
+                f"steps {result['forward_steps']:d}, predicted snapshots "
+                f"{result['max_snapshots']}")
+
+    return name, parameters, cp_schedule(), info
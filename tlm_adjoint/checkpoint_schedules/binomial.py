@@ -22,6 +22,7 @@ from .schedule import CheckpointSchedule, Clear, Configure, Forward, Reverse, \
     Read, Write, EndForward, EndReverse
 
 import functools
+import numpy as np
 from operator import itemgetter
 
 try:
@@ -39,6 +40,7 @@ except ImportError:
 __all__ = \
     [
         "MultistageCheckpointSchedule",
+        "MultitierCheckpointSchedule",
         "TwoLevelCheckpointSchedule"
     ]
 
@@ -113,22 +115,20 @@ def n_advance(n, snapshots, *, trajectory="maximum"):
         raise ValueError("Unexpected trajectory: '{trajectory:s}'")
 
 
-def cache_step(fn):
-    _cache = {}
-
-    @functools.wraps(fn)
-    def wrapped_fn(n, s):
-        # Avoid some cache misses
-        s = min(s, n - 1)
-        if (n, s) not in _cache:
-            _cache[(n, s)] = fn(n, s)
-        return _cache[(n, s)]
-
-    return wrapped_fn
-
-
-@cache_step
 def optimal_extra_steps(n, s):
+    """
+    Return the minimal number of additional forward steps, beyond the first
+    n, required by binomial checkpointing with n steps and s snapshots. Uses
+    the closed form in Proposition 1 of
+       A. Griewank and A. Walther, "Algorithm 799: Revolve: An implementation
+       of checkpointing for the reverse or adjoint mode of computational
+       differentiation", ACM Transactions on Mathematical Software, 26(1), pp.
+       19--45, 2000
+    for the solution of their equation (2).
+    """
+
+    # Discard excess snapshots
+    s = min(s, n - 1)
     if n <= 0:
         raise ValueError("Invalid number of steps")
     if s < min(1, n - 1) or s > n - 1:
@@ -136,30 +136,111 @@ def optimal_extra_steps(n, s):
 
     if n == 1:
         return 0
-    # Equation (2) of
-    #   A. Griewank and A. Walther, "Algorithm 799: Revolve: An implementation
-    #   of checkpointing for the reverse or adjoint mode of computational
-    #   differentiation", ACM Transactions on Mathematical Software, 26(1), pp.
-    #   19--45, 2000
-    elif s == 1:
-        return n * (n - 1) // 2
-    else:
-        m = None
-        for i in range(1, n):
-            m1 = (i
-                  + optimal_extra_steps(i, s)
-                  + optimal_extra_steps(n - i, s - 1))
-            if m is None or m1 < m:
-                m = m1
-        if m is None:
-            raise RuntimeError("Failed to determine number of extra steps")
-        return m
+    # Find t such that beta(s, t - 1) < n <= beta(s, t), where
+    # beta(s, t) = (s + t)! / (s! t!)
+    t = 1
+    b_s_t = s + 1
+    while b_s_t < n:
+        t += 1
+        b_s_t = (b_s_t * (s + t)) // t
+    # beta(s + 1, t - 1) = t beta(s, t) / (s + 1)
+    return t * n - (b_s_t * t) // (s + 1)
 
 
 def optimal_steps(n, s):
     return n + optimal_extra_steps(n, s)
 
 
+def _snapshot_counts(max_n, snapshots, *, trajectory="maximum"):
+    # Snapshot write, read, and delete counts for each stack position,
+    # following the structure of MultistageCheckpointSchedule. counts[(m, k)]
+    # contains counts for the reversal of m steps, starting from a snapshot at
+    # stack position k, excluding the write of this snapshot. Evaluated
+    # without recursion, as the recursion depth can exceed the number of
+    # snapshots.
+    counts = {}
+    stack = [(max_n, 0)]
+    while len(stack) > 0:
+        m, k = stack[-1]
+        if (m, k) in counts:
+            stack.pop()
+            continue
+        c = np.zeros((3, snapshots), dtype=np.int64)
+        if m > 1:
+            i = n_advance(m, snapshots - k, trajectory=trajectory)
+            children = []
+            if m - i > 1:
+                children.append((m - i, k + 1))
+            if i > 1:
+                children.append((i, k))
+            children = [key for key in children if key not in counts]
+            if len(children) > 0:
+                stack.extend(children)
+                continue
+
+            if m - i > 1:
+                c[0, k + 1] += 1
+                c += counts[(m - i, k + 1)]
+            c[1, k] += 1
+            if i == 1:
+                c[2, k] += 1
+            else:
+                c += counts[(i, k)]
+        counts[(m, k)] = c
+        stack.pop()
+
+    c = counts[(max_n, 0)]
+    if snapshots > 0:
+        c[0, 0] += 1
+    return c
+
+
+def allocate_snapshots_tiers(max_n, tiers, *,
+                             write_weight=1.0, read_weight=1.0,
+                             delete_weight=0.0, trajectory="maximum"):
+    """
+    Allocate a stack of snapshots to a sequence of storage tiers, based upon
+    the number of read/writes. Snapshots with the largest numbers of
+    read/writes are allocated to the first tiers. Returns a tuple
+    (weights, allocation), where weights contains the weight for each stack
+    position and allocation contains the storage for each stack position.
+
+    Arguments:
+
+    max_n          The number of forward blocks.
+    tiers          A sequence of (storage, snapshots) pairs, defining the
+                   storage and the maximum number of snapshots for each tier.
+                   Ordered from fastest to slowest.
+    write_weight   (Optional) The weight of a snapshot write.
+    read_weight    (Optional) The weight of a snapshot read.
+    delete_weight  (Optional) The weight of a snapshot delete.
+    trajectory     (Optional) Binomial trajectory, as for
+                   MultistageCheckpointSchedule.
+    """
+
+    tiers = tuple((storage, min(tier_snapshots, max_n - 1))
+                  for storage, tier_snapshots in tiers)
+    snapshots = min(sum(tier_snapshots for _, tier_snapshots in tiers),
+                    max_n - 1)
+
+    c = _snapshot_counts(max_n, snapshots, trajectory=trajectory)
+    weights = tuple(float(write_weight * c[0, i]
+                          + read_weight * c[1, i]
+                          + delete_weight * c[2, i])
+                    for i in range(snapshots))
+
+    allocation = [None for _ in range(snapshots)]
+    positions = [i for i, _ in sorted(enumerate(weights), key=itemgetter(1),
+                                      reverse=True)]
+    for storage, tier_snapshots in tiers:
+        for i in positions[:tier_snapshots]:
+            allocation[i] = storage
+        positions = positions[tier_snapshots:]
+    assert len(positions) == 0
+
+    return weights, tuple(allocation)
+
+
 def allocate_snapshots(max_n, snapshots_in_ram, snapshots_on_disk, *,
                        write_weight=1.0, read_weight=1.0, delete_weight=0.0,
                        trajectory="maximum"):
@@ -169,66 +250,15 @@ def allocate_snapshots(max_n, snapshots_in_ram, snapshots_on_disk, *,
        P. Stumm and A. Walther, "MultiStage approaches for optimal offline
        checkpointing", SIAM Journal on Scientific Computing, 31(3), pp.
        1946--1967, 2009
-    but applies a brute force approach to determine the allocation.
+    but applies a brute force approach to determine the allocation. The number
+    of reads and writes for each snapshot is computed recursively, without
+    simulating the schedule.
     """
 
-    snapshots_in_ram = min(snapshots_in_ram, max_n - 1)
-    snapshots_on_disk = min(snapshots_on_disk, max_n - 1)
-    snapshots = min(snapshots_in_ram + snapshots_on_disk, max_n - 1)
-    weights = [0.0 for _ in range(snapshots)]
-
-    cp_schedule = MultistageCheckpointSchedule(max_n, snapshots, 0,
-                                               trajectory=trajectory)
-
-    snapshot_i = -1
-
-    @functools.singledispatch
-    def action(cp_action):
-        raise TypeError(f"Unexpected checkpointing action: {cp_action}")
-
-    @action.register(Read)
-    def action_read(cp_action):
-        nonlocal snapshot_i
-
-        if snapshot_i < 0:
-            raise RuntimeError("Invalid checkpointing state")
-        weights[snapshot_i] += read_weight
-        if cp_action.delete:
-            weights[snapshot_i] += delete_weight
-            snapshot_i -= 1
-
-    @action.register(Write)
-    def action_write(cp_action):
-        nonlocal snapshot_i
-
-        snapshot_i += 1
-        if snapshot_i >= snapshots:
-            raise RuntimeError("Invalid checkpointing state")
-        weights[snapshot_i] += write_weight
-
-    @action.register(Clear)
-    @action.register(Configure)
-    @action.register(Forward)
-    @action.register(Reverse)
-    @action.register(EndForward)
-    @action.register(EndReverse)
-    def action_pass(cp_action):
-        pass
-
-    while True:
-        cp_action = next(cp_schedule)
-        action(cp_action)
-        if isinstance(cp_action, EndReverse):
-            break
-
-    assert snapshot_i == -1
-
-    allocation = ["disk" for _ in range(snapshots)]
-    for i, _ in sorted(enumerate(weights), key=itemgetter(1),
-                       reverse=True)[:snapshots_in_ram]:
-        allocation[i] = "RAM"
-
-    return tuple(weights), tuple(allocation)
+    return allocate_snapshots_tiers(
+        max_n, (("RAM", snapshots_in_ram), ("disk", snapshots_on_disk)),
+        write_weight=write_weight, read_weight=read_weight,
+        delete_weight=delete_weight, trajectory=trajectory)
 
 
 class MultistageCheckpointSchedule(CheckpointSchedule):
@@ -264,6 +294,7 @@ class MultistageCheckpointSchedule(CheckpointSchedule):
         super().__init__(max_n=max_n)
         self._snapshots_in_ram = snapshots_in_ram
         self._snapshots_on_disk = snapshots_on_disk
+        self._snapshots = len(storage)
         self._storage = storage
         self._exhausted = False
         self._trajectory = trajectory
@@ -272,7 +303,7 @@ class MultistageCheckpointSchedule(CheckpointSchedule):
         snapshots = []
 
         def write(n):
-            if len(snapshots) >= self._snapshots_in_ram + self._snapshots_on_disk:  # noqa: E501
+            if len(snapshots) >= self._snapshots:
                 raise RuntimeError("Invalid checkpointing state")
             snapshots.append(n)
             return self._storage[len(snapshots) - 1]
@@ -284,9 +315,7 @@ class MultistageCheckpointSchedule(CheckpointSchedule):
         while self._n < self._max_n - 1:
             yield Configure(True, False)
 
-            n_snapshots = (self._snapshots_in_ram
-                           + self._snapshots_on_disk
-                           - len(snapshots))
+            n_snapshots = self._snapshots - len(snapshots)
             n0 = self._n
             n1 = n0 + n_advance(self._max_n - n0, n_snapshots,
                                 trajectory=self._trajectory)
@@ -332,9 +361,7 @@ class MultistageCheckpointSchedule(CheckpointSchedule):
 
                 yield Configure(False, False)
 
-                n_snapshots = (self._snapshots_in_ram
-                               + self._snapshots_on_disk
-                               - len(snapshots) + 1)
+                n_snapshots = self._snapshots - len(snapshots) + 1
                 n0 = self._n
                 n1 = n0 + n_advance(self._max_n - self._r - n0, n_snapshots,
                                     trajectory=self._trajectory)
@@ -346,9 +373,7 @@ class MultistageCheckpointSchedule(CheckpointSchedule):
                 while self._n < self._max_n - self._r - 1:
                     yield Configure(True, False)
 
-                    n_snapshots = (self._snapshots_in_ram
-                                   + self._snapshots_on_disk
-                                   - len(snapshots))
+                    n_snapshots = self._snapshots - len(snapshots)
                     n0 = self._n
                     n1 = n0 + n_advance(self._max_n - self._r - n0, n_snapshots,  # noqa: E501
                                         trajectory=self._trajectory)
@@ -385,6 +410,55 @@ class MultistageCheckpointSchedule(CheckpointSchedule):
         return self._snapshots_on_disk > 0
 
 
+class MultitierCheckpointSchedule(MultistageCheckpointSchedule):
+    """
+    Binomial checkpointing, as for MultistageCheckpointSchedule, with
+    snapshots allocated across a sequence of storage tiers. Snapshots which
+    are read and written most frequently are allocated to the first tiers,
+    generalizing the allocation used by MultistageCheckpointSchedule.
+
+    Arguments:
+
+    max_n       The number of forward blocks.
+    tiers       A sequence of (storage, snapshots) pairs, defining the storage
+                and the maximum number of snapshots for each tier. Ordered
+                from fastest to slowest. "RAM" indicates storage in memory,
+                and other storage names indicate storage on disk.
+    trajectory  (Optional) Binomial trajectory, as for
+                MultistageCheckpointSchedule.
+    """
+
+    def __init__(self, max_n, tiers, *, trajectory="maximum"):
+        tiers = tuple((storage, tier_snapshots)
+                      for storage, tier_snapshots in tiers)
+        for storage, tier_snapshots in tiers:
+            if not isinstance(storage, str):
+                raise TypeError("Invalid storage")
+            if tier_snapshots < 0:
+                raise ValueError("Invalid number of snapshots")
+        if len(set(storage for storage, _ in tiers)) != len(tiers):
+            raise ValueError("Duplicate storage")
+        _, storage = allocate_snapshots_tiers(max_n, tiers,
+                                              trajectory=trajectory)
+
+        CheckpointSchedule.__init__(self, max_n=max_n)
+        self._snapshots_in_ram = storage.count("RAM")
+        self._snapshots_on_disk = len(storage) - self._snapshots_in_ram
+        self._snapshots = len(storage)
+        self._storage = storage
+        self._exhausted = False
+        self._trajectory = trajectory
+
+    def tiers(self):
+        """
+        Return a dictionary mapping each storage to the number of snapshots
+        allocated to it.
+        """
+
+        return {storage: self._storage.count(storage)
+                for storage in dict.fromkeys(self._storage)}
+
+
 class TwoLevelCheckpointSchedule(CheckpointSchedule):
     def __init__(self, period, binomial_snapshots, *,
                  binomial_storage="disk",
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# For tlm_adjoint copyright information see ACKNOWLEDGEMENTS in the tlm_adjoint
+# root directory
+
+# This file is part of tlm_adjoint.
+#
+# tlm_adjoint is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# tlm_adjoint is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
+
+from .schedule import CheckpointSchedule, Clear, Configure, Forward, Reverse, \
+    Read, Write, EndForward, EndReverse
+
+import numpy as np
+
+__all__ = \
+    [
+        "CostAwareCheckpointSchedule"
+    ]
+
+
+def cost_aware_tabulation(forward_costs, write_costs, read_costs, s):
+    """
+    Tabulate the minimal cost of reversing blocks a, ..., a + L - 1, starting
+    from the forward state at the start of block a, which is stored in a
+    snapshot, and using at most s_i additional snapshots. Returns
+    (cost, split), where cost[s_i, a, L] is the minimal cost and
+    split[s_i, a, L] is the block at which a snapshot is next stored, or -1 if
+    the forward is instead advanced to the start of block a + L - 1 without
+    storing a snapshot.
+
+    Each interval length is tabulated for all a and s_i at once.
+    """
+
+    n = forward_costs.shape[0]
+    P = np.zeros(n + 1, dtype=np.float64)
+    P[1:] = np.cumsum(forward_costs)
+
+    cost = np.full((s + 1, n + 1, n + 1), np.inf, dtype=np.float64)
+    split = np.full((s + 1, n + 1, n + 1), -1, dtype=np.int64)
+
+    cost[:, :n, 1] = forward_costs
+    for L in range(2, n + 1):
+        a = np.arange(n - L + 1, dtype=np.int64)
+
+        # Advance to the start of block a + L - 1, reverse block a + L - 1,
+        # and then restart from the snapshot at block a
+        c = (P[a + L] - P[a] + read_costs[a])[np.newaxis, :] \
+            + cost[:, :n - L + 1, L - 1]
+        j = np.full(c.shape, -1, dtype=np.int64)
+
+        if s > 0:
+            # Advance to the start of block j = a + k, storing a snapshot,
+            # reverse blocks j, ..., a + L - 1, and then restart from the
+            # snapshot at block a
+            k = np.arange(1, L, dtype=np.int64)
+            j_k = a[:, np.newaxis] + k[np.newaxis, :]
+            c_k = ((P[j_k] - P[a][:, np.newaxis]
+                    + write_costs[j_k]
+                    + read_costs[a][:, np.newaxis])[np.newaxis, :, :]
+                   + cost[:-1, j_k, L - k[np.newaxis, :]]
+                   + cost[1:, :n - L + 1, 1:L])
+            k_min = np.argmin(c_k, axis=2)
+            c_min = np.take_along_axis(
+                c_k, k_min[:, :, np.newaxis], axis=2)[:, :, 0]
+            update = c_min < c[1:, :]
+            c[1:, :][update] = c_min[update]
+            j[1:, :][update] = (a[np.newaxis, :] + 1 + k_min)[update]
+
+        cost[:, :n - L + 1, L] = c
+        split[:, :n - L + 1, L] = j
+
+    return cost, split
+
+
+class CostAwareCheckpointSchedule(CheckpointSchedule):
+    """
+    Binomial-type checkpointing for blocks with non-uniform costs. A schedule
+    minimizing the total cost of forward recomputation, and of snapshot
+    writes and reads, is computed using dynamic programming, generalizing the
+    recursion in equation (2) of
+       A. Griewank and A. Walther, "Algorithm 799: Revolve: An implementation
+       of checkpointing for the reverse or adjoint mode of computational
+       differentiation", ACM Transactions on Mathematical Software, 26(1), pp.
+       19--45, 2000
+    Forward restart data is stored in snapshots, and non-linear dependency
+    data is stored for one block at a time. With uniform forward costs, and
+    zero snapshot write and read costs, the number of forward steps is equal
+    to that for MultistageCheckpointSchedule.
+
+    The tabulation requires O(n^2 s) memory and O(n^3 s) operations for n
+    blocks and s snapshots, and so is intended for moderate n.
+
+    Arguments:
+
+    forward_costs  A sequence defining the forward cost of each block. Its
+                   length defines the number of blocks.
+    snapshots      The maximum number of snapshots. Must be positive if there
+                   is more than one block.
+    storage        (Optional) The storage used for snapshots. One of {"RAM",
+                   "disk"}, default "disk".
+    write_costs    (Optional) The cost of writing a snapshot at the start of
+                   each block. A scalar, or a sequence with one value for each
+                   block. Default zero.
+    read_costs     (Optional) The cost of reading a snapshot at the start of
+                   each block. A scalar, or a sequence with one value for each
+                   block. Default zero.
+
+    Snapshot write and read costs can, for example, be defined by dividing
+    the snapshot size by the storage bandwidth.
+    """
+
+    def __init__(self, forward_costs, snapshots, *, storage="disk",
+                 write_costs=0.0, read_costs=0.0):
+        forward_costs = np.array(forward_costs, dtype=np.float64)
+        max_n = forward_costs.shape[0]
+        if len(forward_costs.shape) != 1 or max_n < 1:
+            raise ValueError("Invalid forward costs")
+
+        def costs(values):
+            values = np.array(values, dtype=np.float64)
+            if len(values.shape) == 0:
+                values = np.full(max_n, values, dtype=np.float64)
+            if values.shape != (max_n,):
+                raise ValueError("Invalid costs")
+            return values
+
+        write_costs = costs(write_costs)
+        read_costs = costs(read_costs)
+        for values in (forward_costs, write_costs, read_costs):
+            if not np.isfinite(values).all() or (values < 0.0).any():
+                raise ValueError("Costs must be finite and non-negative")
+        if snapshots < min(1, max_n - 1):
+            raise ValueError("Invalid number of snapshots")
+        if storage not in ["RAM", "disk"]:
+            raise ValueError("Invalid storage")
+
+        super().__init__(max_n)
+        self._snapshots = min(snapshots, max_n - 1)
+        self._storage = storage
+        self._forward_costs = forward_costs
+        self._write_costs = write_costs
+        self._read_costs = read_costs
+        self._exhausted = False
+
+        if max_n > 1:
+            self._cost, self._split = cost_aware_tabulation(
+                forward_costs, write_costs, read_costs,
+                max(self._snapshots - 1, 0))
+
+    def cost(self):
+        """
+        Return the total cost of the forward, including recomputation, and of
+        snapshot writes and reads.
+        """
+
+        if self._max_n == 1:
+            return self._forward_costs[0]
+        else:
+            return (self._write_costs[0]
+                    + self._cost[self._snapshots - 1, 0, self._max_n])
+
+    def iter(self):
+        snapshots = []
+
+        def advance(n0, n1, write):
+            if n1 > n0:
+                yield Configure(write, False)
+                self._n = n1
+                yield Forward(n0, n1)
+                if write:
+                    if len(snapshots) >= self._snapshots:
+                        raise RuntimeError("Invalid checkpointing state")
+                    snapshots.append(n0)
+                    yield Write(n0, self._storage)
+                yield Clear(True, True)
+
+        def reverse_step(n0):
+            if self._n != n0:
+                raise RuntimeError("Invalid checkpointing state")
+            yield Configure(False, True)
+            self._n = n0 + 1
+            yield Forward(n0, n0 + 1)
+            if self._r == 0:
+                yield EndForward()
+            if self._max_n - self._r != n0 + 1:
+                raise RuntimeError("Invalid checkpointing state")
+            self._r += 1
+            yield Reverse(n0 + 1, n0)
+            yield Clear(True, True)
+
+        def read(n0, delete):
+            if len(snapshots) == 0 or snapshots[-1] != n0:
+                raise RuntimeError("Invalid checkpointing state")
+            if delete:
+                snapshots.pop()
+            self._n = n0
+            yield Read(n0, self._storage, delete)
+            yield Clear(True, True)
+
+        def reverse(n0, n1, s, write):
+            # Reverse blocks n0, ..., n1 - 1, starting from the forward state
+            # at the start of block n0. A snapshot of this state is written
+            # when first advancing from n0 if write is True.
+            if n1 == n0 + 1:
+                yield from reverse_step(n0)
+                return
+
+            j = self._split[s, n0, n1 - n0]
+            if j < 0:
+                yield from advance(n0, n1 - 1, write)
+                yield from reverse_step(n1 - 1)
+                yield from read(n0, n1 - 1 == n0 + 1)
+                yield from reverse(n0, n1 - 1, s, False)
+            else:
+                yield from advance(n0, j, write)
+                yield from reverse(j, n1, s - 1, True)
+                yield from read(n0, j == n0 + 1)
+                yield from reverse(n0, j, s, False)
+
+        if self._max_n == 1:
+            yield from reverse_step(0)
+        else:
+            yield from reverse(0, self._max_n, self._snapshots - 1, True)
+        if self._r != self._max_n:
+            raise RuntimeError("Invalid checkpointing state")
+        if len(snapshots) != 0:
+            raise RuntimeError("Invalid checkpointing state")
+
+        self._exhausted = True
+        yield EndReverse(True)
+
+    def is_exhausted(self):
+        return self._exhausted
+
+    def uses_disk_storage(self):
+        return self._max_n > 1 and self._storage == "disk"
@@ -24,7 +24,8 @@ from .schedule import CheckpointSchedule, Clear, Configure, Forward, Reverse, \
 import enum
 import functools
 import numpy as np
-import warnings
+import os
+import tempfile
 
 try:
     import numba
@@ -91,36 +92,6 @@ def optimal_steps(n, s):
         return m
 
 
-@cache_step
-def mixed_step_memoization(n, s):
-    if n <= 0:
-        raise ValueError("Invalid number of steps")
-    if s < min(1, n - 1) or s > n - 1:
-        raise ValueError("Invalid number of snapshots")
-
-    if n == 1:
-        return (StepType.FORWARD_REVERSE, 1, 1)
-    elif n <= s + 1:
-        return (StepType.WRITE_DATA, 1, n)
-    elif s == 1:
-        return (StepType.WRITE_ICS, n - 1, n * (n + 1) // 2 - 1)
-    else:
-        m = None
-        for i in range(2, n):
-            m1 = (
-                i
-                + mixed_step_memoization(i, s)[2]
-                + mixed_step_memoization(n - i, s - 1)[2])
-            if m is None or m1 <= m[2]:
-                m = (StepType.WRITE_ICS, i, m1)
-        if m is None:
-            raise RuntimeError("Failed to determine total number of steps")
-        m1 = 1 + mixed_step_memoization(n - 1, s - 1)[2]
-        if m1 <= m[2]:
-            m = (StepType.WRITE_DATA, 1, m1)
-        return m
-
-
 _NONE = int(StepType.NONE)
 _FORWARD = int(StepType.FORWARD)
 _FORWARD_REVERSE = int(StepType.FORWARD_REVERSE)
@@ -163,43 +134,6 @@ def mixed_steps_tabulation(n, s):
     return schedule
 
 
-def cache_step_0(fn):
-    _cache = {}
-
-    @functools.wraps(fn)
-    def wrapped_fn(n, s):
-        # Avoid some cache misses
-        s = min(s, n - 2)
-        if (n, s) not in _cache:
-            _cache[(n, s)] = fn(n, s)
-        return _cache[(n, s)]
-
-    return wrapped_fn
-
-
-@cache_step_0
-def mixed_step_memoization_0(n, s):
-    if s < 0:
-        raise ValueError("Invalid number of snapshots")
-    if n < s + 2:
-        raise ValueError("Invalid number of steps")
-
-    if s == 0:
-        return (StepType.FORWARD_REVERSE, n, n * (n + 1) // 2 - 1)
-    else:
-        m = None
-        for i in range(1, n):
-            m1 = (
-                i
-                + mixed_step_memoization(i, s + 1)[2]
-                + mixed_step_memoization(n - i, s)[2])
-            if m is None or m1 <= m[2]:
-                m = (StepType.FORWARD, i, m1)
-        if m is None:
-            raise RuntimeError("Failed to determine total number of steps")
-        return m
-
-
 @njit
 def mixed_steps_tabulation_0(n, s, schedule):
     schedule_0 = np.zeros((n + 1, s + 1, 3), dtype=np.int64)
@@ -226,8 +160,148 @@ def mixed_steps_tabulation_0(n, s, schedule):
     return schedule_0
 
 
+def mixed_steps_tabulation_numpy(n, s):
+    """
+    As mixed_steps_tabulation, but vectorizing the inner loop using NumPy,
+    for use when Numba is not available.
+    """
+
+    schedule = np.zeros((n + 1, s + 1, 3), dtype=np.int64)
+    schedule[:, :, 0] = _NONE
+    schedule[:, :, 1] = 0
+    schedule[:, :, 2] = -1
+
+    schedule[1, :, :] = (_FORWARD_REVERSE, 1, 1)
+    for s_i in range(1, s + 1):
+        for n_i in range(2, min(s_i + 1, n) + 1):
+            schedule[n_i, s_i, :] = (_WRITE_DATA, 1, n_i)
+        if s_i == 1:
+            for n_i in range(3, n + 1):
+                schedule[n_i, s_i, :] = (_WRITE_ICS, n_i - 1, n_i * (n_i + 1) // 2 - 1)  # noqa: E501
+        else:
+            for n_i in range(s_i + 2, n + 1):
+                i = np.arange(2, n_i, dtype=np.int64)
+                m1 = (i
+                      + schedule[2:n_i, s_i, 2]
+                      + schedule[n_i - 2:0:-1, s_i - 1, 2])
+                # Select the largest minimizing i, as in
+                # mixed_steps_tabulation
+                k = m1.shape[0] - 1 - np.argmin(m1[::-1])
+                schedule[n_i, s_i, :] = (_WRITE_ICS, i[k], m1[k])
+                m1 = 1 + schedule[n_i - 1, s_i - 1, 2]
+                if m1 <= schedule[n_i, s_i, 2]:
+                    schedule[n_i, s_i, :] = (_WRITE_DATA, 1, m1)
+    return schedule
+
+
+def mixed_steps_tabulation_0_numpy(n, s, schedule):
+    """
+    As mixed_steps_tabulation_0, but vectorizing the inner loop using NumPy,
+    for use when Numba is not available.
+    """
+
+    schedule_0 = np.zeros((n + 1, s + 1, 3), dtype=np.int64)
+    schedule_0[:, :, 0] = _NONE
+    schedule_0[:, :, 1] = 0
+    schedule_0[:, :, 2] = -1
+
+    for n_i in range(2, n + 1):
+        schedule_0[n_i, 0, :] = (_FORWARD_REVERSE, n_i, n_i * (n_i + 1) // 2 - 1)  # noqa: E501
+    for s_i in range(1, s):
+        for n_i in range(s_i + 2, n + 1):
+            i = np.arange(1, n_i, dtype=np.int64)
+            m1 = (i
+                  + schedule[1:n_i, s_i + 1, 2]
+                  + schedule[n_i - 1:0:-1, s_i, 2])
+            k = m1.shape[0] - 1 - np.argmin(m1[::-1])
+            schedule_0[n_i, s_i, :] = (_FORWARD, i[k], m1[k])
+    return schedule_0
+
+
+_tabulation_cache = {}
+
+
+def mixed_steps_tables(n, s, *, cache_path=None):
+    """
+    Return tables defining the schedule for MixedCheckpointSchedule, for n
+    steps and s snapshots. The most recently computed or loaded tables are
+    cached in memory, and are reused if they are for at least as many steps
+    and snapshots.
+
+    Arguments:
+
+    n           The number of steps.
+    s           The number of snapshots.
+    cache_path  (Optional) A directory in which tables are additionally
+                cached on disk, as NumPy .npz files keyed by (n, s).
+    """
+
+    if cache_path is None:
+        filename = None
+    else:
+        filename = os.path.join(cache_path, f"mixed_steps_{n:d}_{s:d}.npz")
+
+    for (n_c, s_c), (schedule, schedule_0) in _tabulation_cache.items():
+        if n_c >= n and s_c >= s:
+            schedule = schedule[:n + 1, :s + 1, :]
+            schedule_0 = schedule_0[:n + 1, :s + 1, :]
+            break
+    else:
+        if filename is not None and os.path.isfile(filename):
+            with np.load(filename) as tables:
+                schedule = tables["schedule"]
+                schedule_0 = tables["schedule_0"]
+            if schedule.shape != (n + 1, s + 1, 3) \
+                    or schedule_0.shape != (n + 1, s + 1, 3):
+                raise RuntimeError("Invalid cached tables")
+        elif numba is None:
+            schedule = mixed_steps_tabulation_numpy(n, s)
+            schedule_0 = mixed_steps_tabulation_0_numpy(n, s, schedule)
+        else:
+            schedule = mixed_steps_tabulation(n, s)
+            schedule_0 = mixed_steps_tabulation_0(n, s, schedule)
+        _tabulation_cache.clear()
+        _tabulation_cache[(n, s)] = (schedule, schedule_0)
+
+    if filename is not None and not os.path.isfile(filename):
+        os.makedirs(cache_path, exist_ok=True)
+        # Write to a temporary file and rename, so that concurrent readers
+        # never see a partially written file
+        fd, tmp_filename = tempfile.mkstemp(dir=cache_path, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as h:
+                np.savez(h, schedule=schedule, schedule_0=schedule_0)
+            os.replace(tmp_filename, filename)
+        except BaseException:
+            if os.path.isfile(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+
+    return schedule, schedule_0
+
+
 class MixedCheckpointSchedule(CheckpointSchedule):
-    def __init__(self, max_n, snapshots, *, storage="disk"):
+    """
+    The schedule is defined by tables computed using a dynamic programming
+    tabulation, requiring O(n^2 s) operations and O(n s) memory for n steps
+    and s snapshots. Without Numba this takes of order a second for 4000
+    steps and 10 snapshots, and the cost grows quadratically with the number
+    of steps, so that this schedule is impractical for more than of order
+    10^4 steps. The tables can be cached on disk using the cache_path
+    argument, but for longer runs MultistageCheckpointSchedule, which is
+    computed in closed form, should instead be used.
+
+    Arguments:
+
+    max_n       The number of steps.
+    snapshots   The maximum number of snapshots.
+    storage     (Optional) The storage used for snapshots. One of {"RAM",
+                "disk"}, default "disk".
+    cache_path  (Optional) A directory in which the tables defining the
+                schedule are cached on disk. See mixed_steps_tables.
+    """
+
+    def __init__(self, max_n, snapshots, *, storage="disk", cache_path=None):
         if snapshots < min(1, max_n - 1):
             raise ValueError("Invalid number of snapshots")
         if storage not in ["RAM", "disk"]:
@@ -237,6 +311,7 @@ class MixedCheckpointSchedule(CheckpointSchedule):
         self._exhausted = False
         self._snapshots = min(snapshots, max_n - 1)
         self._storage = storage
+        self._cache_path = cache_path
 
     def iter(self):
         snapshot_n = set()
@@ -245,12 +320,8 @@ class MixedCheckpointSchedule(CheckpointSchedule):
         if self._max_n is None:
             raise RuntimeError("Invalid checkpointing state")
 
-        if numba is None:
-            warnings.warn("Numba not available -- using memoization",
-                          RuntimeWarning)
-        else:
-            schedule = mixed_steps_tabulation(self._max_n, self._snapshots)
-            schedule_0 = mixed_steps_tabulation_0(self._max_n, self._snapshots, schedule)  # noqa: E501
+        schedule, schedule_0 = mixed_steps_tables(
+            self._max_n, self._snapshots, cache_path=self._cache_path)
 
         step_type = StepType.NONE
         while True:
@@ -258,24 +329,15 @@ class MixedCheckpointSchedule(CheckpointSchedule):
                 n0 = self._n
                 if n0 in snapshot_n:
                     # n0 checkpoint exists
-                    if numba is None:
-                        step_type, n1, _ = mixed_step_memoization_0(
-                            self._max_n - self._r - n0,
-                            self._snapshots - len(snapshots))
-                    else:
-                        step_type, n1, _ = schedule_0[
-                            self._max_n - self._r - n0,
-                            self._snapshots - len(snapshots)]
+                    step_type, n1, _ = schedule_0[
+                        self._max_n - self._r - n0,
+                        self._snapshots - len(snapshots)]
                 else:
                     # n0 checkpoint does not exist
-                    if numba is None:
-                        step_type, n1, _ = mixed_step_memoization(
-                            self._max_n - self._r - n0,
-                            self._snapshots - len(snapshots))
-                    else:
-                        step_type, n1, _ = schedule[
-                            self._max_n - self._r - n0,
-                            self._snapshots - len(snapshots)]
+                    step_type, n1, _ = schedule[
+                        self._max_n - self._r - n0,
+                        self._snapshots - len(snapshots)]
+                step_type = StepType(step_type)
                 n1 += n0
 
                 if step_type == StepType.FORWARD_REVERSE:
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# For tlm_adjoint copyright information see ACKNOWLEDGEMENTS in the tlm_adjoint
+# root directory
+
+# This file is part of tlm_adjoint.
+#
+# tlm_adjoint is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# tlm_adjoint is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
+
+from .schedule import CheckpointSchedule, Clear, Configure, Forward, Reverse, \
+    Read, Write, Delete, EndForward, EndReverse
+from .binomial import n_advance
+
+import bisect
+
+__all__ = \
+    [
+        "OnlineCheckpointSchedule"
+    ]
+
+
+class OnlineCheckpointSchedule(CheckpointSchedule):
+    """
+    An online checkpointing schedule, for use when the number of blocks is not
+    known in advance, and which stores at most a fixed number of snapshots.
+
+    In the forward snapshots are stored at the start of every d th block, with
+    d initially one. When all snapshots are in use the interval d is doubled,
+    and every other snapshot is deleted. The forward requires no
+    recomputation, and on finalization the blocks are divided into intervals
+    of at most d blocks, with d <= max(1, 2 (n - 1) / snapshots) for n blocks.
+
+    In the reverse each interval is reversed using binomial checkpointing,
+    with the snapshot at the start of the interval, and with the snapshots not
+    used by the forward, applying the approach of
+       A. Griewank and A. Walther, "Algorithm 799: Revolve: An implementation
+       of checkpointing for the reverse or adjoint mode of computational
+       differentiation", ACM Transactions on Mathematical Software, 26(1), pp.
+       19--45, 2000
+    The number of forward steps in the reverse is hence at most that of
+    binomial checkpointing with a single snapshot for each interval, and the
+    total number of forward steps is at most n + n (d + 1) / 2.
+
+    Snapshots at the start of each interval are retained, and the reverse may
+    be repeated.
+
+    Arguments:
+
+    snapshots   The maximum number of snapshots. Positive integer.
+    storage     (Optional) The storage used for snapshots. One of {"RAM",
+                "disk"}, default "disk".
+    trajectory  (Optional) Binomial trajectory, as for
+                MultistageCheckpointSchedule.
+    """
+
+    def __init__(self, snapshots, *, storage="disk", trajectory="maximum"):
+        if snapshots < 1:
+            raise ValueError("snapshots must be positive")
+        if storage not in ["RAM", "disk"]:
+            raise ValueError("Invalid storage")
+
+        super().__init__()
+        self._snapshots = snapshots
+        self._storage = storage
+        self._trajectory = trajectory
+        self._interval = 1
+        self._forward_snapshots = []
+
+    def iter(self):
+        # Forward
+
+        snapshots = self._forward_snapshots
+        while self._max_n is None:
+            n0 = self._n
+            if len(snapshots) >= self._snapshots \
+                    and n0 % self._interval == 0:
+                # Double the interval, and delete every other snapshot
+                self._interval *= 2
+                for cp_n in tuple(snapshots):
+                    if cp_n % self._interval != 0:
+                        snapshots.remove(cp_n)
+                        yield Delete(cp_n, self._storage)
+
+            if n0 % self._interval == 0:
+                yield Configure(True, False)
+                if self._max_n is not None:
+                    # Unexpected finalize
+                    raise RuntimeError("Invalid checkpointing state")
+                n1 = n0 + self._interval
+                self._n = n1
+                yield Forward(n0, n1)
+
+                # Finalize permitted here
+
+                snapshots.append(n0)
+                yield Write(n0, self._storage)
+                yield Clear(True, True)
+            else:
+                yield Configure(False, False)
+                if self._max_n is not None:
+                    # Unexpected finalize
+                    raise RuntimeError("Invalid checkpointing state")
+                n1 = n0 + self._interval - (n0 % self._interval)
+                self._n = n1
+                yield Forward(n0, n1)
+
+                # Finalize permitted here
+
+                yield Clear(True, True)
+
+        yield EndForward()
+
+        binomial_snapshots = self._snapshots - len(snapshots)
+        while True:
+            # Reverse
+
+            while self._r < self._max_n:
+                n = self._max_n - self._r - 1
+                n0s = snapshots[bisect.bisect_right(snapshots, n) - 1]
+                del n
+
+                binomial = [n0s]
+                while self._r < self._max_n - n0s:
+                    if len(binomial) == 0:
+                        raise RuntimeError("Invalid checkpointing state")
+                    cp_n = binomial[-1]
+                    if cp_n == self._max_n - self._r - 1:
+                        binomial.pop()
+                        self._n = cp_n
+                        yield Read(cp_n, self._storage, cp_n != n0s)
+                        yield Clear(True, True)
+                    else:
+                        self._n = cp_n
+                        yield Read(cp_n, self._storage, False)
+                        yield Clear(True, True)
+
+                        yield Configure(False, False)
+
+                        n_snapshots = (binomial_snapshots + 1
+                                       - len(binomial) + 1)
+                        n0 = self._n
+                        n1 = n0 + n_advance(self._max_n - self._r - n0,
+                                            n_snapshots,
+                                            trajectory=self._trajectory)
+                        assert n1 > n0
+                        self._n = n1
+                        yield Forward(n0, n1)
+                        yield Clear(True, True)
+
+                        while self._n < self._max_n - self._r - 1:
+                            yield Configure(True, False)
+
+                            n_snapshots = (binomial_snapshots + 1
+                                           - len(binomial))
+                            n0 = self._n
+                            n1 = n0 + n_advance(self._max_n - self._r - n0,
+                                                n_snapshots,
+                                                trajectory=self._trajectory)
+                            assert n1 > n0
+                            self._n = n1
+                            yield Forward(n0, n1)
+
+                            if len(binomial) >= binomial_snapshots + 1:
+                                raise RuntimeError("Invalid checkpointing "
+                                                   "state")
+                            binomial.append(n0)
+                            yield Write(n0, self._storage)
+                            yield Clear(True, True)
+                        if self._n != self._max_n - self._r - 1:
+                            raise RuntimeError("Invalid checkpointing state")
+
+                    yield Configure(False, True)
+
+                    self._n += 1
+                    yield Forward(self._n - 1, self._n)
+
+                    self._r += 1
+                    yield Reverse(self._n, self._n - 1)
+                    yield Clear(True, True)
+                if self._r != self._max_n - n0s:
+                    raise RuntimeError("Invalid checkpointing state")
+                if len(binomial) != 0:
+                    raise RuntimeError("Invalid checkpointing state")
+            if self._r != self._max_n:
+                raise RuntimeError("Invalid checkpointing state")
+
+            # Reset for new reverse
+
+            self._r = 0
+            yield EndReverse(False)
+
+    def is_exhausted(self):
+        return False
+
+    def uses_disk_storage(self):
+        return self._storage == "disk"
@@ -30,6 +30,7 @@ __all__ = \
         "Reverse",
         "Read",
         "Write",
+        "Delete",
         "EndForward",
         "EndReverse",
 
@@ -148,6 +149,19 @@ class Write(CheckpointAction):
         return self.args[1]
 
 
+class Delete(CheckpointAction):
+    def __init__(self, n, storage):
+        super().__init__(n, storage)
+
+    @property
+    def n(self):
+        return self.args[0]
+
+    @property
+    def storage(self):
+        return self.args[1]
+
+
 class EndForward(CheckpointAction):
     pass
 
@@ -200,6 +214,9 @@ class CheckpointSchedule(ABC):
     Write(n, storage)
     Write checkpoint data associated with block n to the indicated storage.
 
+    Delete(n, storage)
+    Delete checkpoint data associated with block n from the indicated storage.
+
     EndForward()
     End the forward calculation.
 
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# For tlm_adjoint copyright information see ACKNOWLEDGEMENTS in the tlm_adjoint
+# root directory
+
+# This file is part of tlm_adjoint.
+#
+# tlm_adjoint is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# tlm_adjoint is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
+
+from .schedule import Clear, Configure, Forward, Reverse, Read, Write, \
+    Delete, EndForward, EndReverse
+from .memory import MemoryCheckpointSchedule
+from .periodic import PeriodicDiskCheckpointSchedule
+from .binomial import MultistageCheckpointSchedule, \
+    TwoLevelCheckpointSchedule
+from .h_revolve import HRevolveCheckpointSchedule
+from .mixed import MixedCheckpointSchedule
+from .online import OnlineCheckpointSchedule
+
+import functools
+import numpy as np
+
+__all__ = \
+    [
+        "benchmark_schedules",
+        "simulate_schedule"
+    ]
+
+
+def simulate_schedule(cp_schedule, n, *, reverses=1,
+                      forward_cost=1.0, adjoint_cost=1.0,
+                      write_cost=None, read_cost=None):
+    """
+    Simulate a checkpointing schedule for a forward with n blocks, without
+    running a model. Returns a dictionary containing
+
+    forward_steps  The total number of forward steps, including the
+                   original forward and any recomputation.
+    adjoint_steps  The total number of adjoint steps.
+    writes         A dictionary containing the number of snapshot writes to
+                   each storage.
+    reads          A dictionary containing the number of snapshot reads from
+                   each storage.
+    max_snapshots  A dictionary containing the maximum number of snapshots
+                   stored in each storage.
+    max_data       The maximum number of blocks for which forward restart or
+                   non-linear dependency data is held outside of snapshots,
+                   with forward restart data counted as at most one block.
+    time           The estimated wall time, given the cost model.
+
+    The storage dictionaries have keys "RAM" and "disk", together with keys
+    for any further storage used by the schedule or supplied in write_cost or
+    read_cost.
+
+    Arguments:
+
+    cp_schedule   A CheckpointSchedule. Should not have been iterated.
+    n             The number of forward blocks.
+    reverses      (Optional) The number of adjoint calculations. The schedule
+                  must support repeated adjoint calculations if this is
+                  greater than one.
+    forward_cost  (Optional) The cost of a forward step. A scalar, or a
+                  sequence with one value for each block. Default one.
+    adjoint_cost  (Optional) The cost of an adjoint step. A scalar, or a
+                  sequence with one value for each block. Default one.
+    write_cost    (Optional) A dictionary, with storage keys, whose values are
+                  the cost of a snapshot write to each storage. Default zero.
+    read_cost     (Optional) A dictionary, with storage keys, whose values are
+                  the cost of a snapshot read from each storage. Default zero.
+    """
+
+    if n < 1:
+        raise ValueError("Require at least one block")
+    if reverses < 1:
+        raise ValueError("Require at least one adjoint calculation")
+
+    def costs(values):
+        values = np.array(values, dtype=np.float64)
+        if len(values.shape) == 0:
+            values = np.full(n, values, dtype=np.float64)
+        if values.shape != (n,):
+            raise ValueError("Invalid costs")
+        return values
+
+    forward_cost = costs(forward_cost)
+    adjoint_cost = costs(adjoint_cost)
+    write_cost = dict(write_cost or {})
+    read_cost = dict(read_cost or {})
+
+    forward_steps = 0
+    adjoint_steps = 0
+    writes = {}
+    reads = {}
+    max_snapshots = {}
+    max_data = 0
+    time = 0.0
+
+    store_ics = False
+    ics = set()
+    store_data = False
+    data = set()
+    snapshots = {}
+    reverse_i = 0
+
+    def add_storage(storage):
+        if storage not in snapshots:
+            write_cost.setdefault(storage, 0.0)
+            read_cost.setdefault(storage, 0.0)
+            writes[storage] = 0
+            reads[storage] = 0
+            max_snapshots[storage] = 0
+            snapshots[storage] = {}
+
+    for storage in ("RAM", "disk", *write_cost, *read_cost):
+        add_storage(storage)
+
+    @functools.singledispatch
+    def action(cp_action):
+        raise TypeError(f"Unexpected checkpointing action: {cp_action}")
+
+    @action.register(Clear)
+    def action_clear(cp_action):
+        if cp_action.clear_ics:
+            ics.clear()
+        if cp_action.clear_data:
+            data.clear()
+
+    @action.register(Configure)
+    def action_configure(cp_action):
+        nonlocal store_ics, store_data
+
+        store_ics = cp_action.store_ics
+        store_data = cp_action.store_data
+
+    @action.register(Forward)
+    def action_forward(cp_action):
+        nonlocal forward_steps, time
+
+        n1 = min(cp_action.n1, n)
+        forward_steps += n1 - cp_action.n0
+        time += forward_cost[cp_action.n0:n1].sum()
+        if store_ics:
+            ics.update(range(cp_action.n0, n1))
+        if store_data:
+            data.update(range(cp_action.n0, n1))
+        if n1 == n and cp_schedule.max_n() is None:
+            cp_schedule.finalize(n1)
+
+    @action.register(Reverse)
+    def action_reverse(cp_action):
+        nonlocal adjoint_steps, time
+
+        adjoint_steps += cp_action.n1 - cp_action.n0
+        time += adjoint_cost[cp_action.n0:cp_action.n1].sum()
+
+    @action.register(Read)
+    def action_read(cp_action):
+        nonlocal time
+
+        reads[cp_action.storage] += 1
+        time += read_cost[cp_action.storage]
+        cp_ics, cp_data = snapshots[cp_action.storage][cp_action.n]
+        if len(cp_ics) > 0:
+            ics.clear()
+            ics.update(cp_ics)
+        if len(cp_data) > 0:
+            data.clear()
+            data.update(cp_data)
+        if cp_action.delete:
+            del snapshots[cp_action.storage][cp_action.n]
+
+    @action.register(Write)
+    def action_write(cp_action):
+        nonlocal time
+
+        add_storage(cp_action.storage)
+        writes[cp_action.storage] += 1
+        time += write_cost[cp_action.storage]
+        snapshots[cp_action.storage][cp_action.n] = (set(ics), set(data))
+
+    @action.register(Delete)
+    def action_delete(cp_action):
+        del snapshots[cp_action.storage][cp_action.n]
+
+    @action.register(EndForward)
+    def action_pass(cp_action):
+        pass
+
+    @action.register(EndReverse)
+    def action_end_reverse(cp_action):
+        nonlocal reverse_i
+
+        reverse_i += 1
+        if reverse_i < reverses and cp_action.exhausted:
+            raise RuntimeError("Schedule does not support repeated adjoint "
+                               "calculations")
+
+    while reverse_i < reverses:
+        cp_action = next(cp_schedule)
+        action(cp_action)
+
+        for storage in snapshots:
+            max_snapshots[storage] = max(max_snapshots[storage],
+                                         len(snapshots[storage]))
+        max_data = max(max_data, min(1, len(ics)) + len(data))
+
+    return {"forward_steps": forward_steps,
+            "adjoint_steps": adjoint_steps,
+            "writes": writes,
+            "reads": reads,
+            "max_snapshots": max_snapshots,
+            "max_data": max_data,
+            "time": float(time)}
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def _memory(n, s):
+    return MemoryCheckpointSchedule()
+
+
+def _periodic_disk(n, s):
+    return PeriodicDiskCheckpointSchedule(_ceil_div(n, max(s, 1)))
+
+
+def _multistage(n, s):
+    return MultistageCheckpointSchedule(n, 0, s)
+
+
+def _two_level(n, s):
+    # Half the snapshots (rounded up) used for periodic disk storage
+    s_disk = max(_ceil_div(s, 2), 1)
+    return TwoLevelCheckpointSchedule(_ceil_div(n, s_disk), s - s_disk,
+                                      binomial_storage="RAM")
+
+
+def _mixed(n, s):
+    return MixedCheckpointSchedule(n, s)
+
+
+def _h_revolve(n, s):
+    try:
+        import hrevolve  # noqa: F401
+    except ImportError:
+        return None
+    if s < 2:
+        return None
+    return HRevolveCheckpointSchedule(n, s // 2, s - (s // 2))
+
+
+def _online(n, s):
+    return OnlineCheckpointSchedule(max(s, 1))
+
+
+_BENCHMARK_SCHEDULES = {"memory": _memory,
+                        "periodic_disk": _periodic_disk,
+                        "multistage": _multistage,
+                        "two_level": _two_level,
+                        "mixed": _mixed,
+                        "h_revolve": _h_revolve,
+                        "online": _online}
+
+
+def benchmark_schedules(N, S, *, schedules=None, **kwargs):
+    """
+    Simulate checkpointing schedules for a grid of numbers of blocks and
+    snapshots, using simulate_schedule. Returns a list of dictionaries, each
+    containing the keys "schedule", "n", and "s", together with the results
+    returned by simulate_schedule.
+
+    Arguments:
+
+    N          A sequence of numbers of blocks.
+    S          A sequence of numbers of snapshots.
+    schedules  (Optional) A dictionary mapping schedule names to callables.
+               Each callable accepts the number of blocks and the number of
+               snapshots as arguments, and returns a CheckpointSchedule, or
+               None if the combination is not supported. Defaults to the
+               "memory", "periodic_disk", "multistage", "two_level", "mixed",
+               "h_revolve" (if available), and "online" schedules. The
+               periodic schedule uses s disk snapshots, and the two-level
+               schedule divides the snapshots between disk and RAM.
+    Remaining keyword arguments are passed to simulate_schedule.
+    """
+
+    if schedules is None:
+        schedules = _BENCHMARK_SCHEDULES
+
+    results = []
+    for n in N:
+        for s in S:
+            if s < min(1, n - 1):
+                continue
+            for name, schedule in schedules.items():
+                cp_schedule = schedule(n, s)
+                if cp_schedule is None:
+                    continue
+                result = {"schedule": name, "n": n, "s": s}
+                result.update(simulate_schedule(cp_schedule, n, **kwargs))
+                results.append(result)
+    return results
@@ -19,13 +19,13 @@
 # along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
 
 from .interface import DEFAULT_COMM, comm_dup, function_assign, \
-    function_copy, function_get_values, function_global_size, function_id, \
-    function_is_checkpointed, function_is_scalar, function_local_indices, \
-    function_new, function_scalar_value, function_set_values, function_space, \
+    function_copy, function_dtype, function_get_values, function_global_size, \
+    function_id, function_is_checkpointed, function_is_scalar, \
+    function_local_indices, function_local_size, function_new, \
+    function_scalar_value, function_set_values, function_space, \
     function_space_type, space_id, space_new
 
 from abc import ABC, abstractmethod
-from collections import deque
 try:
     import mpi4py.MPI as MPI
 except ImportError:
@@ -46,6 +46,45 @@ __all__ = \
     ]
 
 
+def function_nbytes(x):
+    """
+    Return the size, in bytes, of the data for x on this process.
+    """
+
+    return function_local_size(x) * np.dtype(function_dtype(x)).itemsize
+
+
+def nbytes_by_space(X):
+    """
+    Return a dictionary mapping function space IDs to the total size, in
+    bytes, of the data on this process for the functions in the iterable X.
+    """
+
+    nbytes = {}
+    for x in X:
+        x_space_id = space_id(function_space(x))
+        nbytes[x_space_id] = nbytes.get(x_space_id, 0) + function_nbytes(x)
+    return nbytes
+
+
+def add_nbytes(nbytes, x, sign):
+    """
+    Add (sign 1) or subtract (sign -1) the size, in bytes, of the data for x
+    on this process to or from the entry for its function space in the
+    dictionary nbytes, removing entries which become zero. Returns the signed
+    size.
+    """
+
+    x_space_id = space_id(function_space(x))
+    x_nbytes = sign * function_nbytes(x)
+    x_space_nbytes = nbytes.get(x_space_id, 0) + x_nbytes
+    if x_space_nbytes == 0:
+        nbytes.pop(x_space_id, None)
+    else:
+        nbytes[x_space_id] = x_space_nbytes
+    return x_nbytes
+
+
 class CheckpointStorage:
     def __init__(self, *, store_ics, store_data):
         self._cp_keys = set()
@@ -60,6 +99,9 @@ class CheckpointStorage:
         self._data = {}
 
         self._storage = {}
+        # Sizes of values not stored by reference
+        self._nbytes = {}
+        self._total_nbytes = 0
 
         self.configure(store_ics=store_ics,
                        store_data=store_data)
@@ -78,7 +120,7 @@ class CheckpointStorage:
         if clear_ics:
             for key in self._cp_keys:
                 if key not in self._data_keys:
-                    del self._storage[key]
+                    self._delete(key)
             self._cp_keys.clear()
             self._cp.clear()
             self._seen_ics.clear()
@@ -86,7 +128,7 @@ class CheckpointStorage:
         if clear_refs:
             for key in self._refs_keys:
                 if key not in self._data_keys:
-                    del self._storage[key]
+                    self._delete(key)
             self._refs_keys.clear()
             self._refs.clear()
             self._seen_ics.clear()
@@ -95,7 +137,7 @@ class CheckpointStorage:
         if clear_data:
             for key in self._data_keys:
                 if key not in self._cp_keys and key not in self._refs_keys:
-                    del self._storage[key]
+                    self._delete(key)
             self._keys.clear()
             self._data_keys.clear()
             self._data.clear()
@@ -135,11 +177,101 @@ class CheckpointStorage:
             x_id=function_id(x), value=value,
             copy=function_is_checkpointed(x))
 
+    def clear_keys(self):
+        self._keys.clear()
+
     def update_keys(self, n, i, eq):
         for m, x in enumerate(eq.X()):
             x_id = function_id(x)
             self._keys[x_id] = (x_id, (n, i, m))
 
+    def rewrite_block(self, n, labels, data):
+        """
+        Update keys and non-linear dependency data following a rewrite of the
+        equations in block n. Must be called before any equations are added in
+        later blocks.
+
+        Arguments:
+
+        n       The block index.
+        labels  A dictionary mapping (i, m), for solution m of equation i in
+                the original block, to (x_id, new_label), where x_id is the ID
+                of the solution and new_label is (i', m'), for solution m' of
+                equation i' in the rewritten block, or None if the value is no
+                longer computed by the rewritten block.
+        data    A dictionary mapping each equation index i' in the rewritten
+                block to (nl_dep_ids, sources), where nl_dep_ids is a sequence
+                of the IDs of the non-linear dependencies of the rewritten
+                equation, and sources is a sequence of (i, eq_nl_dep_ids) pairs
+                for the original equations which it replaces.
+        """
+
+        def relabel(key):
+            x_id, label = key
+            if label is None or label[0] != n:
+                return key
+            _, i, m = label
+            _, new_label = labels[(i, m)]
+            if new_label is None:
+                # Unique label for a value not computed by the rewritten block
+                return (x_id, (n, -1 - i, m))
+            else:
+                i, m = new_label
+                return (x_id, (n, i, m))
+
+        old_keys = [(x_id, (n, i, m)) for (i, m), (x_id, _) in labels.items()]
+        X_ids = {x_id for x_id, _ in old_keys}
+
+        for x_id in X_ids:
+            if x_id in self._keys:
+                self._keys[x_id] = relabel(self._keys[x_id])
+
+        for x_id_keys, keys in ((self._cp, self._cp_keys),
+                                (self._refs, self._refs_keys)):
+            for x_id in X_ids:
+                if x_id in x_id_keys:
+                    key = x_id_keys[x_id]
+                    new_key = relabel(key)
+                    if new_key != key:
+                        x_id_keys[x_id] = new_key
+                        keys.remove(key)
+                        keys.add(new_key)
+
+        old_storage = {key: self._storage.pop(key) for key in old_keys
+                       if key in self._storage}
+        for key, value in old_storage.items():
+            self._storage[relabel(key)] = value
+        del old_storage
+
+        old_data_keys = [key for key in old_keys if key in self._data_keys]
+        for key in old_data_keys:
+            del self._data_keys[key]
+        for key in old_data_keys:
+            self._data_keys[relabel(key)] = None
+        del old_data_keys
+
+        old_data = {}
+        for _, sources in data.values():
+            for i, _ in sources:
+                if (n, i) in self._data:
+                    old_data[i] = tuple(map(relabel, self._data.pop((n, i))))
+        for i_new, (nl_dep_ids, sources) in data.items():
+            if all(i not in old_data for i, _ in sources):
+                continue
+            dep_keys = {}
+            for i, eq_nl_dep_ids in sources:
+                if i not in old_data:
+                    raise RuntimeError("Missing non-linear dependency data")
+                for dep_id, key in zip(eq_nl_dep_ids, old_data.pop(i)):
+                    if dep_keys.setdefault(dep_id, key) != key:
+                        raise RuntimeError("Inconsistent non-linear "
+                                           "dependency data")
+            if not set(nl_dep_ids).issubset(dep_keys.keys()):
+                raise RuntimeError("Missing non-linear dependency data")
+            self._data[(n, i_new)] = tuple(dep_keys[dep_id]
+                                           for dep_id in nl_dep_ids)
+        assert len(old_data) == 0
+
     def _store(self, *, x_id=None, key=None, value, refs=True, copy):
         if key is None:
             if x_id is None:
@@ -159,9 +291,17 @@ class CheckpointStorage:
                     self._refs_keys.add(key)
                     self._refs[x_id] = key
                     self._seen_ics.add(x_id)
+            if key not in self._refs_keys:
+                self._total_nbytes += add_nbytes(
+                    self._nbytes, self._storage[key], 1)
 
         return key, self._storage[key]
 
+    def _delete(self, key):
+        value = self._storage.pop(key)
+        if key not in self._refs_keys:
+            self._total_nbytes += add_nbytes(self._nbytes, value, -1)
+
     def _add_initial_condition(self, *, x_id, value, refs=True, copy):
         if self._store_ics and x_id not in self._seen_ics:
             key, _ = self._store(x_id=x_id, value=value, refs=refs, copy=copy)
@@ -170,7 +310,7 @@ class CheckpointStorage:
                 self._cp[x_id] = key
                 self._seen_ics.add(x_id)
 
-    def add_equation(self, n, i, eq, *, deps=None, nl_deps=None):
+    def add_equation(self, n, i, eq, *, deps=None, nl_deps=None, data=True):
         eq_deps = eq.dependencies()
         if deps is None:
             deps = eq_deps
@@ -187,8 +327,9 @@ class CheckpointStorage:
                     x_id=function_id(eq_dep), value=dep,
                     copy=function_is_checkpointed(eq_dep))
 
-        self._add_equation_data(
-            n, i, eq_deps, deps, eq.nonlinear_dependencies(), nl_deps)
+        if data:
+            self._add_equation_data(
+                n, i, eq_deps, deps, eq.nonlinear_dependencies(), nl_deps)
 
     def add_equation_data(self, n, i, eq, *, nl_deps=None):
         self.update_keys(n, i, eq)
@@ -236,6 +377,23 @@ class CheckpointStorage:
                 eq_data.append(key)
             self._data[(n, i)] = tuple(eq_data)
 
+    def nbytes(self):
+        """
+        Return a dictionary mapping function space IDs to the total size, in
+        bytes, of the data on this process held by this storage. Values
+        stored by reference are not included.
+        """
+
+        return dict(self._nbytes)
+
+    def total_nbytes(self):
+        """
+        Return the total size, in bytes, of the data on this process held by
+        this storage. Values stored by reference are not included.
+        """
+
+        return self._total_nbytes
+
     def checkpoint_data(self, *, ics=True, data=True, copy=True):
         if ics:
             cp_cp = tuple(self._cp.values())
@@ -289,8 +447,100 @@ class CheckpointStorage:
             self._data[(n, i)] = tuple(eq_data)
 
 
+def replay_next_use(dep_ids, thresholds, no_block):
+    """
+    Return an array containing, for each dependency occurrence, the minimum
+    threshold of all later occurrences of the same dependency, or no_block if
+    there are none. Thresholds are integers which must be at least -1 and at
+    most no_block.
+
+    Arguments:
+
+    dep_ids     An array of dependency IDs, in forward order.
+    thresholds  An array of thresholds for each dependency occurrence.
+    no_block    The threshold used to indicate no later occurrence.
+    """
+
+    if dep_ids.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Group occurrences by ID, retaining the forward order within each group
+    order = np.argsort(dep_ids, kind="stable")
+    ids = dep_ids[order]
+    group = np.zeros(ids.shape[0], dtype=np.int64)
+    group[1:] = np.cumsum(ids[1:] != ids[:-1])
+
+    # Reverse running minimum within each group. Offsetting by the group index
+    # ensures that values in later groups never affect earlier groups.
+    scale = np.int64(no_block + 2)
+    values = (np.minimum(thresholds[order], no_block) + 1) + group * scale
+    values = values[::-1]
+    running_min = np.minimum.accumulate(values)
+    next_use = np.full(ids.shape[0], no_block, dtype=np.int64)
+    group_r = group[::-1]
+    later = np.zeros(ids.shape[0], dtype=bool)
+    later[1:] = group_r[1:] == group_r[:-1]
+    next_use[later] = running_min[:-1][later[1:]] - group_r[later] * scale - 1
+
+    next_use_out = np.empty_like(next_use)
+    next_use_out[order] = next_use[::-1]
+    return next_use_out
+
+
 class ReplayStorage:
-    def __init__(self, blocks, N0, N1, *, transpose_deps=None):
+    """
+    Storage used for forward replay of blocks N0, ..., N1 - 1.
+
+    Arguments:
+
+    blocks          A sequence of blocks of equations.
+    N0              The first block.
+    N1              One past the last block.
+    transpose_deps  (Optional) Defines active adjoint equations, via its
+                    any_is_active method. If not supplied then all forward
+                    equations are replayed.
+    replay_data     (Optional) Precomputed replay data, as returned by
+                    DependencyGraphTranspose.replay_data. If supplied then
+                    transpose_deps is ignored.
+
+    Replay data is a tuple (replay_blocks, dep_ptr, dep_ids, dep_thresholds,
+    dep_next), where replay_blocks maps each block index to an array with an
+    element for each equation, such that an equation is replayed if this is
+    less than N1. dep_ptr maps each block index to an array of offsets, with
+    an element for each equation and an end offset, into the arrays dep_ids,
+    dep_thresholds, and dep_next. These contain, for each dependency of each
+    equation, the dependency ID, the smallest N1 for which the dependency is
+    needed by the equation, and the smallest N1 for which the dependency is
+    needed by a later equation. None of these depend upon N0 or N1, so that
+    replay data can be computed once and used for any range of blocks.
+    """
+
+    def __init__(self, blocks, N0, N1, *, transpose_deps=None,
+                 replay_data=None):
+        if replay_data is None:
+            replay_data = self._replay_data(blocks, N0, N1,
+                                            transpose_deps=transpose_deps)
+        (self._replay_blocks, self._dep_ptr, self._dep_ids,
+         self._dep_thresholds, self._dep_next) = replay_data
+
+        # Iteration state for pop
+        self._N1 = N1
+        self._n = N0
+        self._i = 0
+        self._next_equation()
+
+        if N1 > N0:
+            j0 = int(self._dep_ptr[N0][0])
+            j1 = int(self._dep_ptr[N1 - 1][-1])
+        else:
+            j0 = j1 = 0
+        self._map = dict.fromkeys(
+            self._dep_ids[j0:j1][self._dep_thresholds[j0:j1] < N1].tolist())
+
+    @staticmethod
+    def _replay_data(blocks, N0, N1, *, transpose_deps=None):
+        # Replay data for blocks N0, ..., N1 - 1 only, computed by traversing
+        # the equations
         if transpose_deps is None:
             active = {n: np.full(len(blocks[n]), True, dtype=bool)
                       for n in range(N0, N1)}
@@ -350,37 +600,35 @@ class ReplayStorage:
             assert len(last_eq) == 0
             del last_eq
 
-        # Map from dep (id) to (indices of) last equation which needs dep
-        last_eq = {}
+        replay_blocks = {n: np.where(active[n], N0, N1).astype(np.int64)
+                         for n in range(N0, N1)}
+        dep_ptr = {}
+        dep_ids = []
+        dep_thresholds = []
         for n in range(N0, N1):
             block = blocks[n]
+            dep_ptr[n] = np.zeros(len(block) + 1, dtype=np.int64)
+            dep_ptr[n][0] = len(dep_ids)
             for i, eq in enumerate(block):
                 if active[n][i]:
-                    for dep in eq.dependencies():
-                        last_eq[function_id(dep)] = (n, i)
+                    thresholds = {function_id(dep): N0
+                                  for dep in eq.dependencies()}
                 # transpose_deps cannot be None here
                 elif transpose_deps.any_is_active(n, i):
-                    for dep in eq.nonlinear_dependencies():
-                        last_eq[function_id(dep)] = (n, i)
-
-        # Ordered container, with each element containing a set of dep ids for
-        # which the corresponding equation is the last equation where dep is
-        # needed
-        eq_last_q = deque()
-        eq_last_d = {}
-        for n in range(N0, N1):
-            block = blocks[n]
-            for i in range(len(block)):
-                dep_ids = set()
-                eq_last_q.append((n, i, dep_ids))
-                eq_last_d[(n, i)] = dep_ids
-        for dep_id, (n, i) in last_eq.items():
-            eq_last_d[(n, i)].add(dep_id)
-        del eq_last_d
-
-        self._active = active
-        self._eq_last = eq_last_q
-        self._map = {dep_id: None for dep_id in last_eq.keys()}
+                    thresholds = {function_id(dep): N0
+                                  for dep in eq.nonlinear_dependencies()}
+                else:
+                    thresholds = {}
+                for dep in eq.dependencies():
+                    dep_id = function_id(dep)
+                    dep_ids.append(dep_id)
+                    dep_thresholds.append(thresholds.get(dep_id, N1))
+                dep_ptr[n][i + 1] = len(dep_ids)
+        dep_ids = np.array(dep_ids, dtype=np.int64)
+        dep_thresholds = np.array(dep_thresholds, dtype=np.int64)
+
+        return (replay_blocks, dep_ptr, dep_ids, dep_thresholds,
+                replay_next_use(dep_ids, dep_thresholds, N1))
 
     def __iter__(self):
         return iter(self._map)
@@ -417,17 +665,32 @@ class ReplayStorage:
         self._map[x_id] = y
 
     def is_active(self, n, i):
-        return self._active[n][i]
+        return self._replay_blocks[n][i] < self._N1
 
     def update(self, d, *, copy=True):
         for key, value in d.items():
             if key in self:
                 self[key] = function_copy(value) if copy else value
 
+    def _next_equation(self):
+        while self._n < self._N1 \
+                and self._i >= len(self._dep_ptr[self._n]) - 1:
+            self._n += 1
+            self._i = 0
+
     def pop(self):
-        n, i, dep_ids = self._eq_last.popleft()
-        for dep_id in dep_ids:
+        n, i = self._n, self._i
+        if n >= self._N1:
+            raise IndexError("No equations remaining")
+        # Remove dependencies which are not needed by later equations
+        s = slice(int(self._dep_ptr[n][i]), int(self._dep_ptr[n][i + 1]))
+        remove = ((self._dep_thresholds[s] < self._N1)
+                  & (self._dep_next[s] >= self._N1))
+        for dep_id in self._dep_ids[s][remove].tolist():
             del self._map[dep_id]
+
+        self._i += 1
+        self._next_equation()
         return (n, i)
 
 
@@ -60,7 +60,10 @@ from .interface import check_space_types, function_get_values, \
     is_function, space_comm, space_new, space_type_warning
 
 import functools
+import hashlib
 import numpy as np
+import os
+import pickle
 import warnings
 
 __all__ = \
@@ -124,10 +127,55 @@ def wrapped_action(space, space_type, action_type, action):
     return action
 
 
+class ActionRecord:
+    """
+    Records matrix actions to disk, so that the actions can be replayed when
+    an eigendecomposition is restarted. Each process appends records to its
+    own file. Actions are identified using a hash of the local input values,
+    and a recorded action is used only if it is available on all processes.
+    """
+
+    def __init__(self, filename, comm):
+        records = {}
+        if os.path.exists(filename):
+            with open(filename, "r+b") as h:
+                offset = 0
+                while True:
+                    try:
+                        key, y_a = pickle.load(h)
+                    except (EOFError, pickle.UnpicklingError):
+                        # End of file, or an incomplete final record, which
+                        # is discarded
+                        h.truncate(offset)
+                        break
+                    records[key] = y_a
+                    offset = h.tell()
+
+        self._filename = filename
+        self._comm = comm
+        self._records = records
+
+    def wrapped_action(self, action):
+        def wrapped_action(x_a):
+            key = hashlib.sha256(
+                np.ascontiguousarray(x_a).tobytes()).hexdigest()
+            if all(self._comm.allgather(key in self._records)):
+                return self._records.pop(key)
+
+            y_a = action(x_a)
+            with open(self._filename, "ab") as h:
+                pickle.dump((key, y_a), h, protocol=pickle.HIGHEST_PROTOCOL)
+                h.flush()
+                os.fsync(h.fileno())
+            return y_a
+
+        return wrapped_action
+
+
 def eigendecompose(space, A_action, *, B_action=None, space_type="primal",
                    action_type="dual", N_eigenvalues=None, solver_type=None,
                    problem_type=None, which=None, tolerance=1.0e-12,
-                   configure=None):
+                   configure=None, path=None, eigenpair_callback=None):
     # First written 2018-03-01
     """
     Matrix-free interface with SLEPc via slepc4py, loosely following
@@ -159,6 +207,22 @@ def eigendecompose(space, A_action, *, B_action=None, space_type="primal",
                    convergence criterion.
     configure      (Optional) Function handle accepting the EPS. Can be used
                    for manual configuration.
+    path           (Optional) A directory in which matrix actions are
+                   recorded. If an eigendecomposition is interrupted, then a
+                   restarted eigendecomposition with the same path and
+                   configuration, and using the same number of processes,
+                   replays the recorded actions in place of calling A_action
+                   and B_action. This relies on SLEPc repeating the same
+                   iterations, and in particular the default initial space
+                   should be used.
+    eigenpair_callback  (Optional) Callable accepting (i, lam_i, v_r, v_i),
+                   called for each eigenpair in turn, where lam_i is the
+                   eigenvalue and v_r and v_i contain the real and imaginary
+                   parts of the eigenvector. v_i is None for Hermitian
+                   problems or with complex PETSc. v_r and v_i are reused for
+                   subsequent eigenpairs. If supplied, eigenvectors are not
+                   stored, and can instead be written to disk as they are
+                   computed.
 
     Returns:
 
@@ -166,7 +230,8 @@ def eigendecompose(space, A_action, *, B_action=None, space_type="primal",
     problems or with complex PETSc V is a tuple of functions containing
     corresponding eigenvectors. Otherwise V is a tuple (V_r, V_i) where V_r and
     V_i are each tuples of functions containing the real and imaginary parts of
-    corresponding eigenvectors.
+    corresponding eigenvectors. If eigenpair_callback is supplied then V is
+    None.
     """
 
     import petsc4py.PETSc as PETSc
@@ -202,6 +267,18 @@ def eigendecompose(space, A_action, *, B_action=None, space_type="primal",
 
     comm = space_comm(space)
 
+    if path is not None:
+        if comm.rank == 0:
+            os.makedirs(path, exist_ok=True)
+        comm.barrier()
+        A_record = ActionRecord(
+            os.path.join(path, f"A_action_{comm.rank:d}.pickle"), comm)
+        A_action = A_record.wrapped_action(A_action)
+        if B_action is not None:
+            B_record = ActionRecord(
+                os.path.join(path, f"B_action_{comm.rank:d}.pickle"), comm)
+            B_action = B_record.wrapped_action(B_action)
+
     A_matrix = PETSc.Mat().createPython(((n, N), (n, N)),
                                         PythonMatrix(A_action),
                                         comm=comm)
@@ -242,9 +319,10 @@ def eigendecompose(space, A_action, *, B_action=None, space_type="primal",
     lam = np.full(N_ev, np.NAN,
                   dtype=PETSc.RealType if esolver.isHermitian()
                   else PETSc.ComplexType)
+    n_V = 1 if eigenpair_callback is not None else N_ev
     v_r = A_matrix.getVecRight()
     V_r = tuple(space_new(space, space_type=space_type)
-                for n in range(N_ev))
+                for n in range(n_V))
     if issubclass(PETSc.ScalarType, (complex, np.complexfloating)):
         v_i = None
         V_i = None
@@ -254,8 +332,9 @@ def eigendecompose(space, A_action, *, B_action=None, space_type="primal",
             V_i = None
         else:
             V_i = tuple(space_new(space, space_type=space_type)
-                        for n in range(N_ev))
+                        for n in range(n_V))
     for i in range(lam.shape[0]):
+        j = 0 if eigenpair_callback is not None else i
         lam_i = esolver.getEigenpair(i, v_r, v_i)
         if esolver.isHermitian():
             assert lam_i.imag == 0.0
@@ -267,16 +346,22 @@ def eigendecompose(space, A_action, *, B_action=None, space_type="primal",
             #     # Complex note: If v_i is None then v_r may be non-real
             #     pass
             with v_r as v_r_a:
-                function_set_values(V_r[i], v_r_a)
+                function_set_values(V_r[j], v_r_a)
         else:
             lam[i] = lam_i
             with v_r as v_r_a:
-                function_set_values(V_r[i], v_r_a)
+                function_set_values(V_r[j], v_r_a)
             if v_i is not None:
                 with v_i as v_i_a:
-                    function_set_values(V_i[i], v_i_a)
+                    function_set_values(V_i[j], v_i_a)
+
+        if eigenpair_callback is not None:
+            eigenpair_callback(i, lam[i], V_r[j],
+                               None if V_i is None else V_i[j])
 
-    if V_i is None:
+    if eigenpair_callback is not None:
+        return lam, None
+    elif V_i is None:
         return lam, V_r
     else:
         return lam, (V_r, V_i)
@@ -27,7 +27,7 @@ from .interface import check_space_types, check_space_types_conjugate_dual, \
     function_new, function_new_conjugate_dual, function_replacement, \
     function_set_values, function_space, function_space_type, function_sum, \
     function_update_caches, function_update_state, function_zero, \
-    is_function, no_space_type_checking, space_new, \
+    is_function, no_space_type_checking, space_id, space_new, \
     subtract_adjoint_derivative_action
 from .manager import paused_manager, restore_manager, set_manager
 
@@ -48,6 +48,7 @@ __all__ = \
         "EquationException",
 
         "AdjointBlockRHS",
+        "AdjointBufferPool",
         "AdjointEquationRHS",
         "AdjointModelRHS",
         "AdjointRHS",
@@ -64,6 +65,7 @@ __all__ = \
         "FixedPointSolver",
         "LinearCombination",
         "ZeroAssignment",
+        "fuse_linear_combinations",
 
         "LinearEquation",
         "Matrix",
@@ -102,11 +104,105 @@ class EquationException(Exception):  # noqa: N818
         super().__init__(*args, **kwargs)
 
 
+class AdjointBufferPool:
+    """
+    A pool of work functions used by adjoint calculations. Functions released
+    to the pool are retained in a free list for each (type, space, space type)
+    combination, and reused by later allocations, avoiding the construction of
+    new functions.
+
+    Only functions allocated by the pool may be returned to it -- releasing any
+    other function has no effect. A released function must not be accessed by
+    the caller after it has been released.
+    """
+
+    def __init__(self):
+        self._free = {}
+        self._allocated = {}
+        self._n_new = 0
+        self._n_reused = 0
+
+    def _new(self, key, new_fn):
+        free = self._free.get(key, None)
+        if free is None or len(free) == 0:
+            x = new_fn()
+            self._n_new += 1
+        else:
+            x = free.pop()
+            function_zero(x)
+            self._n_reused += 1
+        self._allocated[function_id(x)] = key
+        return x
+
+    def new(self, x, *, rel_space_type="primal"):
+        """
+        Return a function, with value zero, of the same type as the function
+        x and in the same space, with the given relative space type.
+        """
+
+        space_type = function_space_type(x, rel_space_type=rel_space_type)
+        return self._new(
+            (type(x), space_id(function_space(x)), space_type),
+            lambda: function_new(x, rel_space_type=rel_space_type))
+
+    def space_new(self, space, *, space_type="primal"):
+        """
+        Return a function, with value zero, in the given space and with the
+        given space type.
+        """
+
+        return self._new(
+            (None, space_id(space), space_type),
+            lambda: space_new(space, space_type=space_type))
+
+    def copy(self, x):
+        """
+        Return a copy of the function x.
+        """
+
+        y = self.new(x)
+        function_assign(y, x)
+        return y
+
+    def release(self, *X):
+        """
+        Return functions to the pool. Functions which were not allocated by the
+        pool, or which have already been released, are ignored.
+        """
+
+        for x in X:
+            key = self._allocated.pop(function_id(x), None)
+            if key is not None:
+                finalize_adjoint_derivative_action(x)
+                self._free.setdefault(key, []).append(x)
+
+    def clear(self):
+        """
+        Discard all functions in the free lists.
+        """
+
+        self._free.clear()
+
+    def info(self):
+        """
+        Return a dictionary containing the number of functions constructed,
+        the number of allocations which reused a released function, and the
+        number of functions currently held in the free lists.
+        """
+
+        return {"new": self._n_new,
+                "reused": self._n_reused,
+                "free": sum(map(len, self._free.values()))}
+
+
 class AdjointRHS:
-    def __init__(self, x):
+    __slots__ = ("_space", "_space_type", "_b", "_pool")
+
+    def __init__(self, x, *, pool=None):
         self._space = function_space(x)
         self._space_type = function_space_type(x, rel_space_type="conjugate_dual")  # noqa: E501
         self._b = None
+        self._pool = pool
 
     def b(self, copy=False):
         self.finalize()
@@ -117,7 +213,11 @@ class AdjointRHS:
 
     def initialize(self):
         if self._b is None:
-            self._b = space_new(self._space, space_type=self._space_type)
+            if self._pool is None:
+                self._b = space_new(self._space, space_type=self._space_type)
+            else:
+                self._b = self._pool.space_new(self._space,
+                                               space_type=self._space_type)
 
     def finalize(self):
         self.initialize()
@@ -131,10 +231,18 @@ class AdjointRHS:
     def is_empty(self):
         return self._b is None
 
+    def release(self):
+        if self._b is not None:
+            if self._pool is not None:
+                self._pool.release(self._b)
+            self._b = None
+
 
 class AdjointEquationRHS:
-    def __init__(self, eq):
-        self._B = tuple(AdjointRHS(x) for x in eq.X())
+    __slots__ = ("_B",)
+
+    def __init__(self, eq, *, pool=None):
+        self._B = tuple(AdjointRHS(x, pool=pool) for x in eq.X())
 
     def __getitem__(self, key):
         return self._B[key]
@@ -156,10 +264,16 @@ class AdjointEquationRHS:
                 return False
         return True
 
+    def release(self):
+        for b in self._B:
+            b.release()
+
 
 class AdjointBlockRHS:
-    def __init__(self, block):
-        self._B = [AdjointEquationRHS(eq) for eq in block]
+    __slots__ = ("_B",)
+
+    def __init__(self, block, *, pool=None):
+        self._B = [AdjointEquationRHS(eq, pool=pool) for eq in block]
 
     def __getitem__(self, key):
         if isinstance(key, int):
@@ -180,14 +294,17 @@ class AdjointBlockRHS:
 
 
 class AdjointModelRHS:
-    def __init__(self, blocks):
+    __slots__ = ("_blocks_n", "_B")
+
+    def __init__(self, blocks, *, pool=None):
         if isinstance(blocks, Sequence):
             # Sequence
             self._blocks_n = list(range(len(blocks)))
         else:
             # Mapping
             self._blocks_n = sorted(blocks.keys())
-        self._B = {n: AdjointBlockRHS(blocks[n]) for n in self._blocks_n}
+        self._B = {n: AdjointBlockRHS(blocks[n], pool=pool)
+                   for n in self._blocks_n}
         self._pop_empty()
 
     def __getitem__(self, key):
@@ -572,7 +689,10 @@ class Equation(Referrer):
                    self.dependencies()[dep_index].
 
         Returns the solution of the adjoint equation as a tuple of functions.
-        The result will not be modified by calling code.
+        The result will not be modified by calling code, unless it is a
+        function in adj_X or B. The functions in adj_X and B may be reused by
+        calling code after this method returns, and should not be referenced by
+        the equation.
         """
 
         function_update_caches(*self.nonlinear_dependencies(), value=nl_deps)
@@ -915,6 +1035,110 @@ class AxpySolver(Axpy):
         super().__init__(y_new, y_old, alpha, x)
 
 
+def fuse_linear_combinations(block, is_live):
+    """
+    A block pass which fuses chains of Assignment and LinearCombination
+    equations. An equation whose solution is used only by a later Assignment
+    or LinearCombination equation in the same block, and which is not
+    otherwise accessible, is eliminated, with its linear combination
+    substituted into the later equation. See EquationManager.add_block_pass.
+
+    Arguments:
+
+    block    A sequence of equations.
+    is_live  A callable accepting a function and returning whether the
+             function may still be accessed other than via the recorded
+             equations.
+
+    Equations are only eliminated if the equation manager does not hold
+    references to recorded equations -- with "memory" checkpointing this
+    requires drop_references to be True.
+    """
+
+    def is_candidate(eq):
+        return (isinstance(eq, (Assignment, LinearCombination))
+                and not hasattr(eq, "_tlm_adjoint__tlm_key"))
+
+    def terms(eq):
+        if isinstance(eq, Assignment):
+            _, y = eq.dependencies()
+            return ((1.0, y),)
+        else:
+            return tuple(zip(eq._alpha, eq.dependencies()[1:]))
+
+    # Record which equations access each value
+    version = {}
+    writers = {}
+    consumers = {}
+    for i, eq in enumerate(block):
+        X_ids = set(map(function_id, eq.X()))
+        ic_ids = set(map(function_id, eq.initial_condition_dependencies()))
+        for dep in eq.dependencies():
+            dep_id = function_id(dep)
+            if dep_id not in X_ids or dep_id in ic_ids:
+                key = (dep_id, version.get(dep_id, 0))
+                consumers.setdefault(key, set()).add(i)
+        for m, x in enumerate(eq.X()):
+            x_id = function_id(x)
+            version[x_id] = version.get(x_id, 0) + 1
+            writers[(x_id, version[x_id])] = (i, m)
+
+    # Substitute linear combinations
+    version = {}
+    expansions = {}
+    groups = {}
+    for i, eq in enumerate(block):
+        if is_candidate(eq):
+            x_id = function_id(eq.x())
+            expansion = {}
+            group = []
+            for alpha, y in terms(eq):
+                y_id = function_id(y)
+                y_key = (y_id, version.get(y_id, 0))
+                k, _ = writers.get(y_key, (None, None))
+                if k in expansions \
+                        and consumers[y_key] == {i} \
+                        and not is_live(y) \
+                        and all(version.get(dep_id, 0) == dep_version
+                                for dep_id, dep_version in expansions[k]) \
+                        and all(dep_id != x_id
+                                for dep_id, _ in expansions[k]):
+                    for dep_key, (beta, dep) in expansions.pop(k).items():
+                        if dep_key in expansion:
+                            expansion[dep_key][0] += alpha * beta
+                        else:
+                            expansion[dep_key] = [alpha * beta, dep]
+                    group.extend(groups.pop(k))
+                else:
+                    if y_key in expansion:
+                        expansion[y_key][0] += alpha
+                    else:
+                        expansion[y_key] = [alpha, y]
+            expansions[i] = expansion
+            groups[i] = sorted(group + [i])
+        else:
+            groups[i] = [i]
+
+        for x in eq.X():
+            x_id = function_id(x)
+            version[x_id] = version.get(x_id, 0) + 1
+
+    if all(len(group) == 1 for group in groups.values()):
+        return None
+
+    eqs = []
+    for i in sorted(groups.keys()):
+        group = groups[i]
+        if len(group) == 1:
+            eqs.append((block[i], tuple(group)))
+        else:
+            eqs.append((LinearCombination(
+                block[i].x(),
+                *((alpha, y) for alpha, y in expansions[i].values())),
+                tuple(group)))
+    return eqs
+
+
 @no_space_type_checking
 def l2_norm_sq(x):
     return function_inner(x, x)
@@ -950,34 +1174,214 @@ class CustomNormSq:
         self._norm_sqs = tuple(norm_sqs)
         self._adj_norm_sqs = tuple(adj_norm_sqs)
 
-    def _forward_norm_sq(self, eq_X):
-        norm_sq = 0.0
-        assert len(eq_X) == len(self._norm_sqs)
-        for X, X_norm_sq in zip(eq_X, self._norm_sqs):
-            assert len(X) == len(X_norm_sq)
-            for x, x_norm_sq in zip(X, X_norm_sq):
-                norm_sq_term = complex(x_norm_sq(x))
-                assert norm_sq_term.imag == 0.0
-                norm_sq_term = norm_sq_term.real
-                assert norm_sq_term >= 0.0
-                norm_sq += norm_sq_term
+    @staticmethod
+    def _l2_norm_sq_comm(norm_sqs, eq_Xs):
+        # The communicator, if the l2 squared norm is used for all components
+        # and all components are defined on a single communicator, and None
+        # otherwise
+        comm = None
+        for i, X_norm_sq in enumerate(norm_sqs):
+            for j, x_norm_sq in enumerate(X_norm_sq):
+                if x_norm_sq is not l2_norm_sq:
+                    return None
+                for eq_X in eq_Xs:
+                    x_comm = function_comm(eq_X[i][j])
+                    if comm is None:
+                        comm = x_comm
+                    elif x_comm.py2f() != comm.py2f():
+                        return None
+        return comm
+
+    @staticmethod
+    def _evaluate_norm_sqs(norm_sqs, *eq_Xs):
+        # Squared norms of each of eq_Xs. In parallel, if the l2 squared norm
+        # is used for all components on a single communicator, then local
+        # partial sums are combined using a single reduction. Otherwise the
+        # squared norm callables are called for each component.
+        for eq_X in eq_Xs:
+            assert len(eq_X) == len(norm_sqs)
+            for eq_X_i, X_norm_sq in zip(eq_X, norm_sqs):
+                assert len(eq_X_i) == len(X_norm_sq)
+
+        comm = CustomNormSq._l2_norm_sq_comm(norm_sqs, eq_Xs)
+        if comm is None or comm.size == 1:
+            norm_sqs_ = [0.0 for eq_X in eq_Xs]
+            for i, X_norm_sq in enumerate(norm_sqs):
+                for j, x_norm_sq in enumerate(X_norm_sq):
+                    for k, eq_X in enumerate(eq_Xs):
+                        norm_sq_term = complex(x_norm_sq(eq_X[i][j]))
+                        assert norm_sq_term.imag == 0.0
+                        norm_sq_term = norm_sq_term.real
+                        assert norm_sq_term >= 0.0
+                        norm_sqs_[k] += norm_sq_term
+        else:
+            norm_sqs_ = np.zeros(len(eq_Xs), dtype=np.float64)
+            for k, eq_X in enumerate(eq_Xs):
+                for eq_X_i in eq_X:
+                    for x in eq_X_i:
+                        x_values = function_get_values(x)
+                        norm_sqs_[k] += np.vdot(x_values, x_values).real
+            norm_sqs_ = comm.allreduce(norm_sqs_)
+            assert (norm_sqs_ >= 0.0).all()
+            norm_sqs_ = norm_sqs_.tolist()
+
+        return tuple(norm_sqs_)
 
+    def _forward_norm_sq(self, eq_X):
+        norm_sq, = self._evaluate_norm_sqs(self._norm_sqs, eq_X)
         return norm_sq
 
-    def _adjoint_norm_sq(self, eq_adj_X):
-        norm_sq = 0.0
-        assert len(eq_adj_X) == len(self._adj_norm_sqs)
-        for X, X_norm_sq in zip(eq_adj_X, self._adj_norm_sqs):
-            assert len(X) == len(X_norm_sq)
-            for x, x_norm_sq in zip(X, X_norm_sq):
-                norm_sq_term = complex(x_norm_sq(x))
-                assert norm_sq_term.imag == 0.0
-                norm_sq_term = norm_sq_term.real
-                assert norm_sq_term >= 0.0
-                norm_sq += norm_sq_term
+    def _forward_norm_sqs(self, *eq_Xs):
+        return self._evaluate_norm_sqs(self._norm_sqs, *eq_Xs)
 
+    def _adjoint_norm_sq(self, eq_adj_X):
+        norm_sq, = self._evaluate_norm_sqs(self._adj_norm_sqs, eq_adj_X)
         return norm_sq
 
+    def _adjoint_norm_sqs(self, *eq_adj_Xs):
+        return self._evaluate_norm_sqs(self._adj_norm_sqs, *eq_adj_Xs)
+
+
+class AndersonMixing:
+    # Anderson mixing for a fixed point iteration x -> g ( x ). See e.g.
+    #   H. F. Walker and P. Ni, "Anderson acceleration for fixed-point
+    #     iterations", SIAM Journal on Numerical Analysis, 49(4),
+    #     pp. 1715--1735, 2011
+    # Inner products are obtained from the squared norm via the polarization
+    # identity, and only the real part of the inner product is used.
+
+    def __init__(self, depth, mixing, norm_sq):
+        """
+        Anderson mixing. Work vectors are allocated on first use, reused for
+        later iterations, and released by the reset method.
+
+        Arguments:
+
+        depth    Maximum number of previous iterates used. Positive integer.
+        mixing   Mixing parameter. Positive float, at most one. One
+                 corresponds to no damping.
+        norm_sq  A callable, defining the squared norm of a sequence of
+                 sequences of functions.
+        """
+
+        if depth < 1:
+            raise ValueError("Invalid depth")
+        if mixing <= 0.0 or mixing > 1.0:
+            raise ValueError("Invalid mixing parameter")
+
+        self._depth = depth
+        self._mixing = mixing
+        self._norm_sq = norm_sq
+
+        self._G_0 = None
+        self._R_0 = None
+        self._S = None
+        self._dG = []
+        self._dR = []
+        self._free = []
+        self._initialized = False
+        self._gram = np.zeros((0, 0), dtype=np.float64)
+
+    def reset(self):
+        """
+        Discard the iteration history, and release all work vectors.
+        """
+
+        self._G_0 = None
+        self._R_0 = None
+        self._S = None
+        self._dG.clear()
+        self._dR.clear()
+        self._free.clear()
+        self._initialized = False
+        self._gram = np.zeros((0, 0), dtype=np.float64)
+
+    @staticmethod
+    def _new(X):
+        return tuple(tuple(function_new(x) for x in X_i) for X_i in X)
+
+    @staticmethod
+    def _assign(Y, X):
+        assert len(Y) == len(X)
+        for Y_i, X_i in zip(Y, X):
+            assert len(Y_i) == len(X_i)
+            for y, x in zip(Y_i, X_i):
+                function_assign(y, x)
+
+    @staticmethod
+    def _axpy(Y, alpha, X):
+        assert len(Y) == len(X)
+        for Y_i, X_i in zip(Y, X):
+            assert len(Y_i) == len(X_i)
+            for y, x in zip(Y_i, X_i):
+                function_axpy(y, alpha, x)
+
+    def _inner(self, X, Y):
+        if self._S is None:
+            self._S = self._new(X)
+        S = self._S
+        self._assign(S, X)
+        self._axpy(S, 1.0, Y)
+        norm_sq_p = self._norm_sq(S)
+        self._axpy(S, -2.0, Y)
+        norm_sq_m = self._norm_sq(S)
+        return 0.25 * (norm_sq_p - norm_sq_m)
+
+    def update(self, G, R, dX):
+        """
+        Compute the next iterate.
+
+        Arguments:
+
+        G   A sequence of sequences of functions, defining g ( x_k ).
+        R   A sequence of sequences of functions, defining x_k - g ( x_k ).
+        dX  A sequence of sequences of functions. Set equal to
+            x_{k + 1} - g ( x_k ) on output.
+        """
+
+        if self._G_0 is None:
+            self._G_0 = self._new(G)
+            self._R_0 = self._new(R)
+
+        if self._initialized:
+            if len(self._dR) == self._depth:
+                self._free.append((self._dG.pop(0), self._dR.pop(0)))
+                self._gram = self._gram[1:, 1:]
+            if len(self._free) > 0:
+                dG, dR = self._free.pop()
+            else:
+                dG, dR = self._new(G), self._new(R)
+            self._assign(dG, self._G_0)
+            self._axpy(dG, -1.0, G)
+            self._assign(dR, self._R_0)
+            self._axpy(dR, -1.0, R)
+            self._dG.append(dG)
+            self._dR.append(dR)
+
+            gram = np.zeros((len(self._dR), len(self._dR)), dtype=np.float64)
+            gram[:-1, :-1] = self._gram
+            for i, dR_i in enumerate(self._dR[:-1]):
+                gram[i, -1] = gram[-1, i] = self._inner(dR_i, dR)
+            gram[-1, -1] = self._norm_sq(dR)
+            self._gram = gram
+        self._assign(self._G_0, G)
+        self._assign(self._R_0, R)
+        self._initialized = True
+
+        for dX_i in dX:
+            for dx in dX_i:
+                function_zero(dx)
+        if self._mixing != 1.0:
+            self._axpy(dX, 1.0 - self._mixing, R)
+        if len(self._dR) > 0:
+            b = np.array([self._inner(dR_i, R) for dR_i in self._dR],
+                         dtype=np.float64)
+            gamma, _, _, _ = np.linalg.lstsq(self._gram, b, rcond=None)
+            for gamma_i, dG_i, dR_i in zip(gamma, self._dG, self._dR):
+                self._axpy(dX, -gamma_i, dG_i)
+                if self._mixing != 1.0:
+                    self._axpy(dX, -(1.0 - self._mixing) * gamma_i, dR_i)
+
 
 class FixedPointSolver(Equation, CustomNormSq):
     # Derives tangent-linear and adjoint information using the approach
@@ -1018,6 +1422,24 @@ class FixedPointSolver(Equation, CustomNormSq):
                     Start the adjoint fixed-point iteration at
                     eqs[(len(eqs) - 1 - adjoint_eqs_index_0) % len(eqs)].
                     Non-negative integer, optional, default 0.
+                anderson_depth
+                    Apply Anderson mixing to the forward and adjoint
+                    fixed-point iterations, using up to this many previous
+                    iterates. Inner products are defined by the squared norm
+                    callables. Zero disables Anderson mixing. Non-negative
+                    integer, optional, default 0.
+                anderson_mixing
+                    Anderson mixing parameter. Positive float, at most one,
+                    optional, default 1.0.
+
+        Work vectors are retained between solves, until references are
+        dropped. For each solution component this is one forward work vector,
+        or two with Anderson mixing, and up to four adjoint work vectors, or up
+        to six with Anderson mixing. Anderson mixing history, of up to
+        2 * anderson_depth + 3 vectors for each solution component, is released
+        at the end of each solve. Note that recorded equations are held by the
+        equation manager, and so retain these work vectors while the tape
+        exists unless references are dropped.
         """
 
         X_ids = set()
@@ -1045,8 +1467,15 @@ class FixedPointSolver(Equation, CustomNormSq):
         for key, default_value in [("maximum_iterations", 1000),
                                    ("nonzero_initial_guess", True),
                                    ("adjoint_nonzero_initial_guess", True),
-                                   ("adjoint_eqs_index_0", 0)]:
+                                   ("adjoint_eqs_index_0", 0),
+                                   ("anderson_depth", 0),
+                                   ("anderson_mixing", 1.0)]:
             solver_parameters.setdefault(key, default_value)
+        if solver_parameters["anderson_depth"] < 0:
+            raise ValueError("Invalid anderson_depth parameter")
+        if solver_parameters["anderson_mixing"] <= 0.0 \
+                or solver_parameters["anderson_mixing"] > 1.0:
+            raise ValueError("Invalid anderson_mixing parameter")
 
         nonzero_initial_guess = solver_parameters["nonzero_initial_guess"]
         adjoint_nonzero_initial_guess = \
@@ -1190,12 +1619,38 @@ class FixedPointSolver(Equation, CustomNormSq):
         self._dep_eq_index_map = dep_eq_index_map
         self._dep_B_indices = dep_B_indices
         self._solver_parameters = solver_parameters
+        self._work = {}
 
         self.add_referrer(*eqs)
 
     def drop_references(self):
         super().drop_references()
         self._eqs = tuple(WeakAlias(eq) for eq in self._eqs)
+        self._work = {}
+
+    def _work_vectors(self, key, new):
+        # Work vectors are retained between solves, until references are
+        # dropped
+        if self._references_dropped:
+            return new()
+        if key not in self._work:
+            self._work[key] = new()
+        return self._work[key]
+
+    def _new_forward_work(self):
+        X_0 = tuple(tuple(function_new(x) for x in eq.X())
+                    for eq in self._eqs)
+        anderson_depth = self._solver_parameters["anderson_depth"]
+        if anderson_depth > 0:
+            anderson_mixing = self._solver_parameters["anderson_mixing"]
+            anderson = AndersonMixing(anderson_depth, anderson_mixing,
+                                      self._forward_norm_sq)
+            dX = tuple(tuple(function_new(x) for x in eq.X())
+                       for eq in self._eqs)
+        else:
+            anderson = None
+            dX = None
+        return X_0, anderson, dX
 
     def forward_solve(self, X, deps=None):
         if is_function(X):
@@ -1222,9 +1677,16 @@ class FixedPointSolver(Equation, CustomNormSq):
                 function_zero(x)
             function_update_caches(*self.X(), value=X)
 
+        X_0, anderson, dX = self._work_vectors("forward",
+                                               self._new_forward_work)
+        if anderson is not None:
+            anderson.reset()
+
         it = 0
-        X_0 = tuple(tuple(function_copy(x) for x in eq_X[i])
-                    for i in range(len(self._eqs)))
+        for i in range(len(self._eqs)):
+            assert len(X_0[i]) == len(eq_X[i])
+            for x_0, x in zip(X_0[i], eq_X[i]):
+                function_assign(x_0, x)
         while True:
             it += 1
 
@@ -1232,16 +1694,15 @@ class FixedPointSolver(Equation, CustomNormSq):
                 eq.forward(eq_X[i], deps=eq_deps[i])
 
             R = X_0
-            del X_0
             for i in range(len(self._eqs)):
                 assert len(R[i]) == len(eq_X[i])
                 for r, x in zip(R[i], eq_X[i]):
                     function_axpy(r, -1.0, x)
-            R_norm_sq = self._forward_norm_sq(R)
             if relative_tolerance == 0.0:
+                R_norm_sq, = self._forward_norm_sqs(R)
                 tolerance_sq = absolute_tolerance ** 2
             else:
-                X_norm_sq = self._forward_norm_sq(eq_X)
+                R_norm_sq, X_norm_sq = self._forward_norm_sqs(R, eq_X)
                 tolerance_sq = max(absolute_tolerance ** 2,
                                    X_norm_sq * (relative_tolerance ** 2))
             if logger.isEnabledFor(logging.DEBUG):
@@ -1260,13 +1721,22 @@ class FixedPointSolver(Equation, CustomNormSq):
                     f"Fixed point iteration, forward iteration {it:d}, "
                     f"failed to converge")
 
-            X_0 = R
-            del R
+            if anderson is not None:
+                anderson.update(eq_X, R, dX)
+                for i in range(len(self._eqs)):
+                    assert len(eq_X[i]) == len(dX[i])
+                    for x, dx in zip(eq_X[i], dX[i]):
+                        function_axpy(x, 1.0, dx)
+
             for i in range(len(self._eqs)):
                 assert len(X_0[i]) == len(eq_X[i])
                 for x_0, x in zip(X_0[i], eq_X[i]):
                     function_assign(x_0, x)
 
+        if anderson is not None:
+            # Release the Anderson mixing history
+            anderson.reset()
+
     _reset_adjoint_warning = False
 
     def reset_adjoint(self):
@@ -1286,6 +1756,51 @@ class FixedPointSolver(Equation, CustomNormSq):
         for eq in self._eqs:
             eq.finalize_adjoint(J)
 
+    def _new_adjoint_work(self):
+        adj_B = AdjointModelRHS([self._eqs])
+        dep_Bs = tuple({} for eq in self._eqs)
+        for i, eq in enumerate(self._eqs):
+            for j, (k, m) in self._dep_B_indices[i].items():
+                dep_Bs[i][j] = adj_B[0][k][m]
+        # Copies of the right-hand-sides, as adjoint_jacobian_solve may
+        # modify or return the right-hand-side function itself
+        eq_B = [list(eq.new_adj_X()) for eq in self._eqs]
+        X_0 = tuple(eq.new_adj_X() for eq in self._eqs)
+
+        anderson_depth = self._solver_parameters["anderson_depth"]
+        if anderson_depth > 0:
+            anderson_mixing = self._solver_parameters["anderson_mixing"]
+            anderson = AndersonMixing(anderson_depth, anderson_mixing,
+                                      self._adjoint_norm_sq)
+            dX = tuple(eq.new_adj_X() for eq in self._eqs)
+
+            # After an adjoint iteration the right-hand-side for equation k
+            # includes terms associated with the adjoint solutions for
+            # equations i which are solved after equation k in the adjoint
+            # iteration. When the adjoint solutions are modified by Anderson
+            # mixing these terms are updated.
+            adjoint_i0 = self._solver_parameters["adjoint_eqs_index_0"]
+            eq_position = {}
+            for p, i in enumerate(range(len(self._eqs) - 1, -1, -1)):
+                eq_position[(i - adjoint_i0) % len(self._eqs)] = p
+            mixing_dep_Bs = tuple(
+                {j: dep_Bs[i][j]
+                 for j, (k, m) in self._dep_B_indices[i].items()
+                 if eq_position[k] < eq_position[i]}
+                for i in range(len(self._eqs)))
+            del eq_position
+        else:
+            anderson = None
+            dX = None
+            mixing_dep_Bs = None
+
+        # Additional work vectors, allocated when needed
+        eq_B_1 = [[None for x in eq.X()] for eq in self._eqs]
+        X_1 = [[None for x in eq.X()] for eq in self._eqs]
+
+        return (adj_B, dep_Bs, eq_B, eq_B_1, X_0, X_1,
+                anderson, dX, mixing_dep_Bs)
+
     def adjoint_jacobian_solve(self, adj_X, nl_deps, B):
         if is_function(B):
             B = (B,)
@@ -1309,15 +1824,16 @@ class FixedPointSolver(Equation, CustomNormSq):
                     for i in range(len(self._eqs))]
         eq_nl_deps = tuple(tuple(nl_deps[j] for j in nl_dep_indices)
                            for nl_dep_indices in self._eq_nl_dep_indices)
-        adj_B = AdjointModelRHS([self._eqs])
+        (adj_B, dep_Bs, eq_B, eq_B_1, X_0, X_1,
+         anderson, dX, mixing_dep_Bs) = self._work_vectors(
+            "adjoint", self._new_adjoint_work)
+        if anderson is not None:
+            anderson.reset()
 
-        dep_Bs = tuple({} for eq in self._eqs)
         for i, eq in enumerate(self._eqs):
-            eq_B = adj_B[0][i].B()
+            adj_B_i = adj_B[0][i].B()
             for j, k in enumerate(self._eq_X_indices[i]):
-                function_assign(eq_B[j], B[k])
-            for j, (k, m) in self._dep_B_indices[i].items():
-                dep_Bs[i][j] = adj_B[0][k][m]
+                function_assign(adj_B_i[j], B[k])
 
         if nonzero_initial_guess:
             for i, eq in enumerate(self._eqs):
@@ -1329,21 +1845,22 @@ class FixedPointSolver(Equation, CustomNormSq):
                 function_zero(adj_x)
 
         it = 0
-        X_0 = tuple(tuple(function_copy(x) for x in eq_adj_X[i])
-                    for i in range(len(self._eqs)))
+        for i in range(len(self._eqs)):
+            assert len(X_0[i]) == len(eq_adj_X[i])
+            for x_0, x in zip(X_0[i], eq_adj_X[i]):
+                function_assign(x_0, x)
         while True:
             it += 1
 
             for i in range(len(self._eqs) - 1, - 1, -1):
                 i = (i - adjoint_i0) % len(self._eqs)
-                # Copy required here, as adjoint_jacobian_solve may return the
-                # RHS function itself
-                eq_B = adj_B[0][i].B(copy=True)
+                for b, adj_b in zip(eq_B[i], adj_B[0][i].B()):
+                    function_assign(b, adj_b)
 
                 eq_adj_X[i] = self._eqs[i].adjoint_jacobian_solve(
                     eq_adj_X[i][0] if len(eq_adj_X[i]) == 1 else eq_adj_X[i],
                     eq_nl_deps[i],
-                    eq_B[0] if len(eq_B) == 1 else eq_B)
+                    eq_B[i][0] if len(eq_B[i]) == 1 else tuple(eq_B[i]))
 
                 if eq_adj_X[i] is None:
                     eq_adj_X[i] = self._eqs[i].new_adj_X()
@@ -1354,25 +1871,34 @@ class FixedPointSolver(Equation, CustomNormSq):
                         eq_adj_X[i][0] if len(eq_adj_X[i]) == 1 else eq_adj_X[i],  # noqa: E501
                         eq_nl_deps[i], dep_Bs[i])
 
+                    # If the right-hand-side work vector is returned then
+                    # switch to a second work vector, so that the adjoint
+                    # solution is not overwritten in the next iteration
+                    for j, x in enumerate(eq_adj_X[i]):
+                        if x is eq_B[i][j]:
+                            if eq_B_1[i][j] is None:
+                                eq_B_1[i][j] = function_new(x)
+                            eq_B[i][j], eq_B_1[i][j] = \
+                                eq_B_1[i][j], eq_B[i][j]
+
                 assert len(self._eq_X_indices[i]) == len(eq_adj_X[i])
                 for j, x in zip(self._eq_X_indices[i], eq_adj_X[i]):
                     adj_X[j] = x
 
-                eq_B = adj_B[0][i].B()
+                adj_B_i = adj_B[0][i].B()
                 for j, k in enumerate(self._eq_X_indices[i]):
-                    function_assign(eq_B[j], B[k])
+                    function_assign(adj_B_i[j], B[k])
 
             R = X_0
-            del X_0
             for i in range(len(self._eqs)):
                 assert len(R[i]) == len(eq_adj_X[i])
                 for r, x in zip(R[i], eq_adj_X[i]):
                     function_axpy(r, -1.0, x)
-            R_norm_sq = self._adjoint_norm_sq(R)
             if relative_tolerance == 0.0:
+                R_norm_sq, = self._adjoint_norm_sqs(R)
                 tolerance_sq = absolute_tolerance ** 2
             else:
-                X_norm_sq = self._adjoint_norm_sq(eq_adj_X)
+                R_norm_sq, X_norm_sq = self._adjoint_norm_sqs(R, eq_adj_X)
                 tolerance_sq = max(absolute_tolerance ** 2,
                                    X_norm_sq * (relative_tolerance ** 2))
             if logger.isEnabledFor(logging.DEBUG):
@@ -1391,13 +1917,48 @@ class FixedPointSolver(Equation, CustomNormSq):
                     f"Fixed point iteration, adjoint iteration {it:d}, "
                     f"failed to converge")
 
-            X_0 = R
-            del R
+            if anderson is not None:
+                anderson.update(eq_adj_X, R, dX)
+                for i, eq in enumerate(self._eqs):
+                    eq.subtract_adjoint_derivative_actions(
+                        dX[i][0] if len(dX[i]) == 1 else dX[i],
+                        eq_nl_deps[i], mixing_dep_Bs[i])
+
+                    # The adjoint solution may have been returned by
+                    # adjoint_jacobian_solve, and so is only modified if it
+                    # is a work vector
+                    eq_adj_X_i = list(eq_adj_X[i])
+                    for j, (x, dx) in enumerate(zip(eq_adj_X_i, dX[i])):
+                        if x is not eq_B_1[i][j] and x is not X_1[i][j]:
+                            if X_1[i][j] is None:
+                                X_1[i][j] = function_new(x)
+                            function_assign(X_1[i][j], x)
+                            x = eq_adj_X_i[j] = X_1[i][j]
+                        function_axpy(x, 1.0, dx)
+                    eq_adj_X[i] = tuple(eq_adj_X_i)
+                    del eq_adj_X_i
+                    for j, x in zip(self._eq_X_indices[i], eq_adj_X[i]):
+                        adj_X[j] = x
+
             for i in range(len(self._eqs)):
                 assert len(X_0[i]) == len(eq_adj_X[i])
                 for x_0, x in zip(X_0[i], eq_adj_X[i]):
                     function_assign(x_0, x)
 
+        if anderson is not None:
+            # Release the Anderson mixing history
+            anderson.reset()
+
+        if not self._references_dropped:
+            # Work vectors may be modified by later solves
+            work_ids = set()
+            for eq_B_work in (eq_B, eq_B_1, X_1):
+                for X_work in eq_B_work:
+                    work_ids.update(id(x) for x in X_work if x is not None)
+            for j, x in enumerate(adj_X):
+                if id(x) in work_ids:
+                    adj_X[j] = function_copy(x)
+
         return adj_X
 
     def subtract_adjoint_derivative_actions(self, adj_X, nl_deps, dep_Bs):
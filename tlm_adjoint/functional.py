@@ -18,14 +18,17 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
 
-from .interface import check_space_type, function_is_scalar, function_name, \
-    function_new, function_scalar_value, function_space, functional_term_eq, \
-    is_function, space_id, space_new
+from .interface import check_space_type, function_id, function_is_scalar, \
+    function_name, function_new, function_scalar_value, function_space, \
+    functional_term_eq, is_function, space_id, space_new
 
-from .equations import Assignment, Axpy
+from .equations import Assignment, Axpy, LinearCombination
 from .manager import manager as _manager
 from .overloaded_float import FloatSpace
 
+from collections.abc import Sequence
+import functools
+import operator
 import warnings
 
 __all__ = \
@@ -101,10 +104,13 @@ class Functional:
 
         Arguments:
 
-        term      (Optional) A Form or function, which is added to the
-                  functional. If not supplied then the functional is copied
-                  into a new function (useful for avoiding long range
-                  cross-block dependencies).
+        term      (Optional) A Form or function, or a sequence of these, which
+                  is added to the functional. If a sequence is supplied then
+                  the Form terms are summed and evaluated using a single
+                  equation, and the sum of all terms is recorded using a
+                  single LinearCombination equation. If not supplied then
+                  the functional is copied into a new function (useful for
+                  avoiding long range cross-block dependencies).
         manager   (Optional) The equation manager.
         annotate  (Optional) Whether the equations should be annotated.
         tlm       (Optional) Whether to derive (and solve) associated
@@ -114,18 +120,49 @@ class Functional:
         if manager is None:
             manager = _manager()
 
-        new_fn = function_new(self._fn, name=self._name)
         if term is None:
+            terms = ()
+        elif isinstance(term, Sequence):
+            terms = tuple(term)
+        else:
+            terms = (term,)
+
+        new_fn = function_new(self._fn, name=self._name)
+        if len(terms) == 0:
             new_fn_eq = Assignment(new_fn, self._fn)
             new_fn_eq.solve(manager=manager, annotate=annotate, tlm=tlm)
         else:
-            if is_function(term) and function_is_scalar(term):
-                term_fn = term
-            else:
+            term_fns = []
+            form_terms = []
+            for term in terms:
+                if is_function(term) and function_is_scalar(term):
+                    term_fns.append(term)
+                else:
+                    form_terms.append(term)
+
+            if len(form_terms) > 0:
+                # Sum the remaining terms, and evaluate the sum using a single
+                # equation
                 term_fn = function_new(self._fn, name=f"{self._name:s}_term")
-                term_eq = functional_term_eq(term_fn, term)
+                term_eq = functional_term_eq(
+                    term_fn, functools.reduce(operator.add, form_terms))
                 term_eq.solve(manager=manager, annotate=annotate, tlm=tlm)
-            new_fn_eq = Axpy(new_fn, self._fn, 1.0, term_fn)
+                term_fns.append(term_fn)
+
+            if len(term_fns) == 1:
+                term_fn, = term_fns
+                new_fn_eq = Axpy(new_fn, self._fn, 1.0, term_fn)
+            else:
+                # Combine repeated terms, as dependencies must be distinct
+                args = {function_id(self._fn): [1.0, self._fn]}
+                for term_fn in term_fns:
+                    term_fn_id = function_id(term_fn)
+                    if term_fn_id in args:
+                        args[term_fn_id][0] += 1.0
+                    else:
+                        args[term_fn_id] = [1.0, term_fn]
+                new_fn_eq = LinearCombination(
+                    new_fn, *(tuple(arg) for arg in args.values()))
             new_fn_eq.solve(manager=manager, annotate=annotate, tlm=tlm)
         self._fn = new_fn
 
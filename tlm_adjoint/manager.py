@@ -23,7 +23,9 @@ import warnings
 
 __all__ = \
     [
+        "add_block_pass",
         "annotation_enabled",
+        "calibrate_checkpointing",
         "compute_gradient",
         "configure_checkpointing",
         "configure_tlm",
@@ -34,7 +36,9 @@ __all__ = \
         "new_block",
         "reset_manager",
         "restore_manager",
+        "set_garbage_cleanup_policy",
         "set_manager",
+        "set_tape_profile",
         "start_annotating",
         "start_manager",
         "start_tlm",
@@ -80,6 +84,32 @@ def configure_checkpointing(cp_method, cp_parameters, manager=None):
     manager.configure_checkpointing(cp_method, cp_parameters=cp_parameters)
 
 
+def calibrate_checkpointing(forward, *M, disk_bandwidth=None,
+                            path="checkpoints~", manager=None):
+    if manager is None:
+        manager = globals()["manager"]()
+    return manager.calibrate_checkpointing(
+        forward, *M, disk_bandwidth=disk_bandwidth, path=path)
+
+
+def add_block_pass(block_pass, manager=None):
+    if manager is None:
+        manager = globals()["manager"]()
+    manager.add_block_pass(block_pass)
+
+
+def set_garbage_cleanup_policy(policy, manager=None):
+    if manager is None:
+        manager = globals()["manager"]()
+    manager.set_garbage_cleanup_policy(policy)
+
+
+def set_tape_profile(profile, manager=None):
+    if manager is None:
+        manager = globals()["manager"]()
+    manager.set_tape_profile(profile)
+
+
 def manager_info(info=print, manager=None):
     if manager is None:
         manager = globals()["manager"]()
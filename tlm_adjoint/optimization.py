@@ -18,10 +18,12 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
 
-from .interface import comm_dup, function_axpy, function_copy, \
-    function_get_values, function_is_cached, function_is_checkpointed, \
-    function_is_static, function_linf_norm, function_local_size, \
-    function_new, function_set_values, garbage_cleanup, is_function, space_comm
+from .interface import comm_dup, function_assign, function_axpy, \
+    function_copy, function_get_values, function_inner, \
+    function_is_cached, function_is_checkpointed, function_is_static, \
+    function_linf_norm, function_local_size, function_new, \
+    function_new_conjugate_dual, function_set_values, garbage_cleanup, \
+    is_function, space_comm
 
 from .caches import clear_caches, local_caches
 from .functional import Functional
@@ -29,7 +31,9 @@ from .manager import manager as _manager
 from .manager import compute_gradient, reset_manager, restore_manager, \
     set_manager, start_manager, stop_manager
 
+from collections import OrderedDict, deque
 from collections.abc import Sequence
+import hashlib
 import numpy as np
 import warnings
 
@@ -37,6 +41,7 @@ __all__ = \
     [
         "OptimizationException",
 
+        "minimize_l_bfgs",
         "minimize_scipy"
     ]
 
@@ -50,7 +55,8 @@ class OptimizationException(Exception):  # noqa: N818
 
 @local_caches
 @restore_manager
-def minimize_scipy(forward, M0, *, manager=None, **kwargs):
+def minimize_scipy(forward, M0, *, manager=None, cache_size=1,
+                   jac_with_fun=False, **kwargs):
     """
     Gradient-based minimization using scipy.optimize.minimize.
 
@@ -61,6 +67,13 @@ def minimize_scipy(forward, M0, *, manager=None, **kwargs):
     M0       A function, or a sequence of functions. Control parameters initial
              guess.
     manager  (Optional) The equation manager.
+    cache_size  (Optional) The maximum number of functional and derivative
+             values to retain, keyed on a hash of the control value. The least
+             recently used values are discarded first.
+    jac_with_fun  (Optional) Whether to compute the derivative whenever the
+             functional is computed, so that a later derivative evaluation at
+             the same point does not require an additional forward
+             calculation.
 
     Any remaining keyword arguments are passed directly to
     scipy.optimize.minimize.
@@ -73,9 +86,18 @@ def minimize_scipy(forward, M0, *, manager=None, **kwargs):
 
     if not isinstance(M0, Sequence):
         (M,), return_value = minimize_scipy(forward, [M0],
-                                            manager=manager, **kwargs)
+                                            manager=manager,
+                                            cache_size=cache_size,
+                                            jac_with_fun=jac_with_fun,
+                                            **kwargs)
         return M, return_value
 
+    if cache_size < 0:
+        raise ValueError("Invalid cache size")
+    if jac_with_fun and cache_size == 0:
+        raise ValueError("Cache required when computing the derivative with "
+                         "the functional")
+
     if manager is None:
         manager = _manager().new()
     set_manager(manager)
@@ -125,25 +147,46 @@ def minimize_scipy(forward, M0, *, manager=None, **kwargs):
                       checkpoint=function_is_checkpointed(m0))
          for m0 in M0]
     J = [None]
-    J_M = [None, None]
+    J_key = [None]
+    cache = OrderedDict()
 
-    def fun(x, *, force=False):
-        set(M, x)
+    def key(x):
+        if comm.rank == 0:
+            x = np.ascontiguousarray(x, dtype=np.float64)
+            x_key = hashlib.sha256(x.tobytes()).hexdigest()
+        else:
+            assert x is None
+            x_key = None
+        return comm.bcast(x_key, root=0)
+
+    def cache_get(x_key):
+        if x_key in cache:
+            cache.move_to_end(x_key)
+            return cache[x_key]
+        else:
+            return None, None
+
+    def cache_add(x_key, J_val, dJ):
+        if cache_size > 0:
+            cache[x_key] = (J_val, dJ)
+            cache.move_to_end(x_key)
+            while len(cache) > cache_size:
+                cache.popitem(last=False)
+
+    def gradient(x_key):
+        dJ = compute_gradient(J[0], M)
+        if manager._cp_schedule.is_exhausted():
+            J_key[0] = None
+        cache_add(x_key, J[0].value(), dJ)
+        return dJ
 
-        if not force and J[0] is not None:
-            change_norm = 0.0
-            assert len(M) == len(J_M[0])
-            for m, m0 in zip(M, J_M[0]):
-                change = function_copy(m)
-                function_axpy(change, -1.0, m0)
-                change_norm = max(change_norm, function_linf_norm(change))
-            if change_norm == 0.0:
-                J_val = J[0].value()
-                if not isinstance(J_val, (float, np.floating)):
-                    raise TypeError("Unexpected type")
-                return J_val
-
-        J_M[0] = tuple(function_copy(m) for m in M)
+    def fun(x):
+        x_key = key(x)
+        J_val, _ = cache_get(x_key)
+        if J_val is not None:
+            return J_val
+
+        set(M, x)
 
         reset_manager()
         stop_manager()
@@ -156,11 +199,15 @@ def minimize_scipy(forward, M0, *, manager=None, **kwargs):
         garbage_cleanup(space_comm(J[0].space()))
         stop_manager()
 
-        J_M[1] = M
+        J_key[0] = x_key
 
         J_val = J[0].value()
         if not isinstance(J_val, (float, np.floating)):
             raise TypeError("Unexpected type")
+        if jac_with_fun:
+            gradient(x_key)
+        else:
+            cache_add(x_key, J_val, None)
         return J_val
 
     def fun_bcast(x):
@@ -169,10 +216,18 @@ def minimize_scipy(forward, M0, *, manager=None, **kwargs):
         return fun(x)
 
     def jac(x):
-        fun(x, force=J_M[1] is None)
-        dJ = compute_gradient(J[0], J_M[1])
-        if manager._cp_schedule.is_exhausted():
-            J_M[1] = None
+        x_key = key(x)
+        _, dJ = cache_get(x_key)
+        if dJ is None:
+            if J_key[0] != x_key:
+                # Forward calculation not recorded at this point, or adjoint
+                # no longer available
+                cache.pop(x_key, None)
+                fun(x)
+                if jac_with_fun:
+                    _, dJ = cache_get(x_key)
+            if dJ is None:
+                dJ = gradient(x_key)
         return get(dJ)
 
     def jac_bcast(x):
@@ -205,3 +260,340 @@ def minimize_scipy(forward, M0, *, manager=None, **kwargs):
         set(M, None)
 
     return M, return_value
+
+
+def _scalar_search_wolfe1(*args, **kwargs):
+    try:
+        from scipy.optimize._linesearch import scalar_search_wolfe1
+    except ImportError:
+        from scipy.optimize.linesearch import scalar_search_wolfe1
+    return scalar_search_wolfe1(*args, **kwargs)
+
+
+@local_caches
+@restore_manager
+def minimize_l_bfgs(forward, M0, *, m=10, maxiter=15000,
+                    ftol=2.220446049250313e-9, gtol=1.0e-5, c1=1.0e-4,
+                    c2=0.9, H_0_action=None, bounds=None, manager=None):
+    """
+    Gradient-based minimization using a limited memory
+    Broyden-Fletcher-Goldfarb-Shanno (L-BFGS) approach, with optional bound
+    constraints. Unlike minimize_scipy all operations are applied to the
+    (possibly distributed) control functions, and the control is never
+    gathered onto a single process.
+
+    Without bound constraints a line search satisfying the strong Wolfe
+    conditions is applied, using the line search algorithm of
+    scipy.optimize.minimize. With bound constraints a masked projected L-BFGS
+    approach is applied: components at a bound, with the derivative directed
+    out of the feasible region, are removed from the search direction, and a
+    backtracking line search is applied along the projected search path. This
+    is not L-BFGS-B -- no generalized Cauchy point is computed, and the update
+    history is not restricted to the free variables.
+
+    Arguments:
+
+    forward  A callable which takes as input the control and returns the
+             Functional to be minimized.
+    M0       A function, or a sequence of functions. Control parameters initial
+             guess.
+    m        (Optional) The maximum number of stored update pairs.
+    maxiter  (Optional) The maximum number of iterations.
+    ftol     (Optional) Iteration stops when the relative reduction in the
+             functional is less than or equal to ftol.
+    gtol     (Optional) Iteration stops when the maximum absolute value of
+             the (projected) derivative is less than or equal to gtol.
+    c1, c2   (Optional) Line search parameters.
+    H_0_action  (Optional) A callable defining the initial inverse Hessian
+             approximation. Accepts the derivative as arguments, and returns a
+             function or a sequence of functions, which may be modified by
+             the calling code. Scaled after each update by y^T s / y^T H_0 y.
+             Defaults to the identity with the l2 Riesz map, as used by
+             minimize_scipy.
+    bounds   (Optional) A (lower, upper) pair, or a sequence of (lower, upper)
+             pairs, one for each control. Each bound may be None, a scalar, or
+             a function.
+    manager  (Optional) The equation manager.
+
+    Returns a tuple
+        (M, return_value)
+    where M is the value of the control parameters obtained, and return_value
+    is a scipy.optimize.OptimizeResult.
+    """
+
+    if not isinstance(M0, Sequence):
+        (M,), return_value = minimize_l_bfgs(
+            forward, [M0], m=m, maxiter=maxiter, ftol=ftol, gtol=gtol,
+            c1=c1, c2=c2, H_0_action=H_0_action,
+            bounds=None if bounds is None else [bounds],
+            manager=manager)
+        return M, return_value
+
+    for m0 in M0:
+        if not np.can_cast(function_get_values(m0), np.float64):
+            raise ValueError("Invalid dtype")
+    if m < 0:
+        raise ValueError("Invalid number of stored update pairs")
+
+    if manager is None:
+        manager = _manager().new()
+    set_manager(manager)
+
+    if bounds is not None:
+        if len(bounds) != len(M0):
+            raise ValueError("Invalid bounds")
+
+        def bound_values(m0, b):
+            if b is None:
+                return None
+            elif is_function(b):
+                return function_get_values(b)
+            else:
+                return np.full(function_local_size(m0), b, dtype=np.float64)
+
+        bounds = tuple((bound_values(m0, lb), bound_values(m0, ub))
+                       for m0, (lb, ub) in zip(M0, bounds))
+        if all(lb is None and ub is None for lb, ub in bounds):
+            bounds = None
+
+    def inner(X, Y):
+        return sum(function_inner(x, y) for x, y in zip(X, Y))
+
+    def linf_norm(X):
+        return max(function_linf_norm(x) for x in X)
+
+    if H_0_action is None:
+        def H_0_action(*G):
+            H_0_G = tuple(function_new_conjugate_dual(g) for g in G)
+            for h_0_g, g in zip(H_0_G, G):
+                function_set_values(h_0_g, function_get_values(g))
+            return H_0_G
+
+    def H_0(G, *, gamma=1.0):
+        H_0_G = H_0_action(*G)
+        if is_function(H_0_G):
+            H_0_G = (H_0_G,)
+        if len(H_0_G) != len(G):
+            raise ValueError("Invalid initial inverse Hessian action")
+        if gamma != 1.0:
+            for h_0_g in H_0_G:
+                function_set_values(h_0_g,
+                                    gamma * function_get_values(h_0_g))
+        return tuple(H_0_G)
+
+    def project(X):
+        if bounds is not None:
+            for x, (lb, ub) in zip(X, bounds):
+                if lb is not None or ub is not None:
+                    function_set_values(
+                        x, np.clip(function_get_values(x), lb, ub))
+
+    def active(X, G):
+        # Components at a bound, with the derivative directed out of the
+        # feasible region
+        if bounds is None:
+            return None
+        A = []
+        for x, g, (lb, ub) in zip(X, G, bounds):
+            x_vals = function_get_values(x)
+            g_vals = function_get_values(g)
+            a = np.zeros(x_vals.shape, dtype=bool)
+            if lb is not None:
+                a |= np.logical_and(x_vals <= lb, g_vals > 0.0)
+            if ub is not None:
+                a |= np.logical_and(x_vals >= ub, g_vals < 0.0)
+            A.append(a)
+        return A
+
+    def mask(X, A):
+        if A is not None:
+            for x, a in zip(X, A):
+                x_vals = function_get_values(x).copy()
+                x_vals[a] = 0.0
+                function_set_values(x, x_vals)
+
+    def projected_gradient_linf_norm(X, G):
+        if bounds is None:
+            return linf_norm(G)
+        PG = tuple(function_new_conjugate_dual(g) for g in G)
+        for pg, x, g, (lb, ub) in zip(PG, X, G, bounds):
+            x_vals = function_get_values(x)
+            pg_vals = x_vals - function_get_values(g)
+            if lb is not None or ub is not None:
+                pg_vals = np.clip(pg_vals, lb, ub)
+            function_set_values(pg, x_vals - pg_vals)
+        return linf_norm(PG)
+
+    M = [function_new(m0, static=function_is_static(m0),
+                      cache=function_is_cached(m0),
+                      checkpoint=function_is_checkpointed(m0))
+         for m0 in M0]
+    n_evaluations = [0]
+
+    def fun_jac(X):
+        for m0, x in zip(M, X):
+            function_assign(m0, x)
+
+        reset_manager()
+        stop_manager()
+        clear_caches()
+
+        start_manager()
+        J = forward(*M)
+        if is_function(J):
+            J = Functional(_fn=J)
+        garbage_cleanup(space_comm(J.space()))
+        stop_manager()
+        n_evaluations[0] += 1
+
+        J_val = J.value()
+        if not isinstance(J_val, (float, np.floating)):
+            raise TypeError("Unexpected type")
+        dJ = compute_gradient(J, M)
+        return J_val, dJ
+
+    X = tuple(function_copy(m0) for m0 in M0)
+    project(X)
+    J_val, G = fun_jac(X)
+
+    # Compact update history -- a deque of (s, y, rho) tuples
+    history = deque(maxlen=m)
+    gamma = 1.0
+
+    n_its = 0
+    success = False
+    message = "Maximum number of iterations reached"
+    while n_its < maxiter:
+        if projected_gradient_linf_norm(X, G) <= gtol:
+            success = True
+            message = "Projected derivative tolerance reached"
+            break
+
+        # Two-loop recursion
+        A = active(X, G)
+        Q = tuple(function_copy(g) for g in G)
+        mask(Q, A)
+        alphas = []
+        for s, y, rho in reversed(history):
+            alpha = rho * inner(Q, s)
+            for q, y_i in zip(Q, y):
+                function_axpy(q, -alpha, y_i)
+            alphas.append(alpha)
+        P = H_0(Q, gamma=gamma)
+        del Q
+        for (s, y, rho), alpha in zip(history, reversed(alphas)):
+            beta = rho * inner(y, P)
+            for p, s_i in zip(P, s):
+                function_axpy(p, alpha - beta, s_i)
+        del alphas
+        for p in P:
+            function_set_values(p, -function_get_values(p))
+        mask(P, A)
+        del A
+
+        derphi0 = inner(G, P)
+        if derphi0 >= 0.0:
+            if len(history) > 0:
+                # Not a descent direction -- restart
+                history.clear()
+                gamma = 1.0
+                continue
+            else:
+                message = "Not a descent direction"
+                break
+
+        if len(history) == 0:
+            # Initial step length as in scipy.optimize.minimize, with BFGS
+            old_phi0 = J_val + 0.5 * np.sqrt(-derphi0)
+        else:
+            old_phi0 = None
+
+        evaluations = {}
+
+        def evaluate(alpha):
+            if alpha not in evaluations:
+                X_alpha = tuple(function_copy(x) for x in X)
+                for x_alpha, p in zip(X_alpha, P):
+                    function_axpy(x_alpha, alpha, p)
+                project(X_alpha)
+                evaluations.clear()
+                evaluations[alpha] = (X_alpha, *fun_jac(X_alpha))
+            return evaluations[alpha]
+
+        if bounds is None:
+            def phi(alpha):
+                _, J_alpha, _ = evaluate(alpha)
+                return J_alpha
+
+            def derphi(alpha):
+                _, _, G_alpha = evaluate(alpha)
+                return inner(G_alpha, P)
+
+            alpha, _, _ = _scalar_search_wolfe1(
+                phi, derphi, phi0=J_val, old_phi0=old_phi0, derphi0=derphi0,
+                c1=c1, c2=c2)
+        else:
+            if old_phi0 is None:
+                alpha = 1.0
+            else:
+                alpha = min(1.0, 1.01 / np.sqrt(-derphi0))
+            for _ in range(50):
+                X_alpha, J_alpha, _ = evaluate(alpha)
+                S = tuple(function_copy(x_alpha) for x_alpha in X_alpha)
+                for s, x in zip(S, X):
+                    function_axpy(s, -1.0, x)
+                if J_alpha <= J_val + c1 * inner(G, S):
+                    break
+                alpha *= 0.5
+            else:
+                alpha = None
+            del S
+
+        if alpha is None:
+            if len(history) > 0:
+                # Line search failure -- restart
+                history.clear()
+                gamma = 1.0
+                continue
+            else:
+                message = "Line search failure"
+                break
+
+        X_alpha, J_alpha, G_alpha = evaluate(alpha)
+        del evaluations
+
+        S = tuple(function_copy(x_alpha) for x_alpha in X_alpha)
+        for s, x in zip(S, X):
+            function_axpy(s, -1.0, x)
+        Y = tuple(function_copy(g_alpha) for g_alpha in G_alpha)
+        for y, g in zip(Y, G):
+            function_axpy(y, -1.0, g)
+        n_its += 1
+
+        J_val_0, J_val = J_val, J_alpha
+        X, G = X_alpha, G_alpha
+        del X_alpha, G_alpha
+
+        if m > 0:
+            ys = inner(Y, S)
+            yHy = inner(Y, H_0(Y))
+            if ys > np.finfo(np.float64).eps * yHy:
+                history.append((S, Y, 1.0 / ys))
+                gamma = ys / yHy
+        del S, Y
+
+        if J_val_0 - J_val <= ftol * max(abs(J_val_0), abs(J_val), 1.0):
+            success = True
+            message = "Relative reduction tolerance reached"
+            break
+
+    for m0, x in zip(M, X):
+        function_assign(m0, x)
+
+    from scipy.optimize import OptimizeResult
+    return_value = OptimizeResult(
+        fun=J_val, jac=G, nit=n_its, nfev=n_evaluations[0],
+        njev=n_evaluations[0], success=success,
+        status=0 if success else 1, message=message)
+
+    return M, return_value
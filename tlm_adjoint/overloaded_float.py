@@ -30,6 +30,7 @@ from .caches import Caches
 from .equations import Assignment, Equation, ZeroAssignment, get_tangent_linear
 from .manager import annotation_enabled, tlm_enabled
 
+from collections import OrderedDict
 from collections.abc import Sequence
 import contextlib
 import functools
@@ -51,6 +52,8 @@ __all__ = \
 
         "Float",
         "FloatEquation",
+        "VectorizedFloatEquation",
+        "vectorize_float_equations",
 
         "no_float_overloading",
         "paused_float_overloading"
@@ -347,9 +350,8 @@ class _tlm_adjoint__SymbolicFloat(sp.Symbol):  # noqa: N801
                 function_assign(self, y)
             elif isinstance(y, sp.Expr):
                 deps = expr_dependencies(y)
-                function_assign(
-                    self,
-                    lambdify(y, deps)(*(dep.value() for dep in deps)))
+                _, F, _, _, _ = compile_expr(y, deps)
+                function_assign(self, F(*(dep.value() for dep in deps)))
             else:
                 raise TypeError(f"Unexpected type: {type(y)}")
 
@@ -550,6 +552,72 @@ def lambdify(expr, deps):
     return F
 
 
+_expr_symbols = []
+
+
+def expr_symbols(n):
+    while len(_expr_symbols) < n:
+        _expr_symbols.append(
+            sp.Symbol(f"_tlm_adjoint__arg_{len(_expr_symbols):d}"))
+    return tuple(_expr_symbols[:n])
+
+
+_compiled_exprs = OrderedDict()
+_compiled_exprs_max_size = 1024
+
+
+@no_float_overloading
+def compile_expr(expr, deps):
+    """
+    Compile an expression and its derivatives. The expression is
+    canonicalized by replacing its dependencies with positional symbols, and
+    the result cached, so that expressions with the same structure are
+    differentiated and compiled only once.
+
+    Arguments:
+
+    expr  A SymPy expression.
+    deps  A sequence of SymbolicFloat objects. The dependencies of expr, as
+          returned by expr_dependencies.
+
+    Returns a tuple (args, F, dF_expr, nl_dep_indices, dF), where args is a
+    tuple of positional symbols corresponding to deps, F is the compiled
+    expression, taking the values of deps as arguments, dF_expr is a
+    dictionary mapping the index of each dependency to the derivative of the
+    canonical expression, nl_dep_indices is a tuple of the indices of
+    non-linear dependencies, and dF is a dictionary mapping the index of each
+    dependency to the compiled derivative, taking the values of the
+    non-linear dependencies as arguments.
+    """
+
+    args = expr_symbols(len(deps))
+    expr = expr.xreplace(dict(zip(deps, args)))
+    value = _compiled_exprs.get(expr, None)
+    if value is None:
+        F = lambdify(expr, args)
+        dF_expr = {}
+        nl_dep_indices = set()
+        for dep_index, arg in enumerate(args):
+            expr_diff = dF_expr[dep_index] = expr.diff(arg)
+            arg_indices = [arg_index
+                           for arg_index, diff_arg in enumerate(args)
+                           if diff_arg in expr_diff.free_symbols]
+            if len(arg_indices) > 0:
+                nl_dep_indices.add(dep_index)
+                nl_dep_indices.update(arg_indices)
+        nl_dep_indices = tuple(sorted(nl_dep_indices))
+        nl_args = tuple(args[dep_index] for dep_index in nl_dep_indices)
+        dF = {dep_index: lambdify(expr_diff, nl_args)
+              for dep_index, expr_diff in dF_expr.items()}
+
+        value = _compiled_exprs[expr] = (F, dF_expr, nl_dep_indices, dF)
+        while len(_compiled_exprs) > _compiled_exprs_max_size:
+            _compiled_exprs.popitem(last=False)
+    else:
+        _compiled_exprs.move_to_end(expr)
+    return (args,) + value
+
+
 class FloatEquation(Equation):
     @no_float_overloading
     def __init__(self, x, expr):
@@ -559,31 +627,26 @@ class FloatEquation(Equation):
             check_space_type(dep, "primal")
         if function_id(x) in {function_id(dep) for dep in deps}:
             raise ValueError("Invalid dependency")
-        deps.insert(0, x)
 
-        dF_expr = {}
-        nl_deps = {}
-        for dep_index, dep in enumerate(deps[1:], start=1):
-            expr_diff = dF_expr[dep_index] = expr.diff(dep)
-            for dep2 in expr_dependencies(expr_diff):
-                nl_deps.setdefault(function_id(dep), dep)
-                nl_deps.setdefault(function_id(dep2), dep2)
-        nl_deps = sorted(nl_deps.values(), key=lambda dep: function_id(dep))
-        dF = {}
-        for dep_index, expr_diff in dF_expr.items():
-            dF[dep_index] = lambdify(expr_diff, nl_deps)
+        args, F, dF_expr, nl_dep_indices, dF = compile_expr(expr, deps)
+        nl_deps = [deps[dep_index] for dep_index in nl_dep_indices]
+        dF_expr = {dep_index + 1: expr_diff
+                   for dep_index, expr_diff in dF_expr.items()}
+        dF = {dep_index + 1: dF_dep for dep_index, dF_dep in dF.items()}
+        deps.insert(0, x)
 
         super().__init__(x, deps, nl_deps=nl_deps,
                          ic=False, adj_ic=False)
         self._F_expr = expr
-        self._F = lambdify(expr, deps)
+        self._F = F
+        self._args = args
         self._dF_expr = dF_expr
         self._dF = dF
 
     def forward_solve(self, x, deps=None):
         if deps is None:
             deps = self.dependencies()
-        dep_vals = tuple(dep.value() for dep in deps)
+        dep_vals = tuple(dep.value() for dep in deps[1:])
         x_val = self._F(*dep_vals)
         function_assign(x, x_val)
 
@@ -606,16 +669,251 @@ class FloatEquation(Equation):
         x = self.x()
         expr = 0
         deps = self.dependencies()
+        arg_map = dict(zip(self._args, deps[1:]))
         for dep_index, dF_expr in self._dF_expr.items():
             tau_dep = get_tangent_linear(deps[dep_index], M, dM, tlm_map)
             if tau_dep is not None:
-                expr += dF_expr * tau_dep
+                expr += dF_expr.xreplace(arg_map) * tau_dep
         if isinstance(expr, int) and expr == 0:
             return ZeroAssignment(tlm_map[x])
         else:
             return FloatEquation(tlm_map[x], expr)
 
 
+class VectorizedFloatEquation(Equation):
+    @no_float_overloading
+    def __init__(self, X, expr, deps):
+        """
+        A batch of scalar equations, each applying the same expression to
+        different scalar dependencies. The equations are
+            X[n] = expr(deps[n][0], deps[n][1], ...),
+        and are evaluated using vectorized NumPy operations.
+
+        Each solution and dependency is a separate scalar object, and so the
+        values of the distinct dependencies are gathered, and solution values
+        are set, with one Python-level access for each scalar. Only the
+        expression and derivative evaluations are vectorized.
+
+        Arguments:
+
+        X     A sequence of SymbolicFloat objects. The solutions.
+        expr  A SymPy expression, expressed in terms of the elements of
+              deps[0].
+        deps  A sequence of sequences of SymbolicFloat objects, with the same
+              length as X. deps[n] defines the dependencies for the equation
+              for X[n]. Each element of deps must have the same length as
+              deps[0], and the elements of deps[0] must be distinct.
+        """
+
+        X = tuple(X)
+        deps = tuple(map(tuple, deps))
+        if len(X) == 0:
+            raise ValueError("Require at least one solution")
+        if len(deps) != len(X):
+            raise ValueError("Invalid dependencies")
+        for x in X:
+            check_space_type(x, "primal")
+        for eq_deps in deps:
+            if len(eq_deps) != len(deps[0]):
+                raise ValueError("Invalid dependencies")
+            for dep in eq_deps:
+                if not isinstance(dep, SymbolicFloat):
+                    raise ValueError("Invalid dependency")
+                check_space_type(dep, "primal")
+        if len(set(map(function_id, deps[0]))) != len(deps[0]):
+            raise ValueError("Duplicate dependency")
+        expr_dep_ids = set(map(function_id, expr_dependencies(expr)))
+        if not expr_dep_ids.issubset(set(map(function_id, deps[0]))):
+            raise ValueError("Invalid dependency")
+        X_ids = set(map(function_id, X))
+        if len(X_ids) != len(X):
+            raise ValueError("Duplicate solution")
+
+        args, F, dF_expr, nl_dep_indices, dF = compile_expr(expr, deps[0])
+
+        # Map from equation and argument to dependency index
+        eq_deps = list(X)
+        eq_dep_ids = {function_id(x): n for n, x in enumerate(X)}
+        dep_indices = np.zeros((len(X), len(args)), dtype=np.int64)
+        for n, row_deps in enumerate(deps):
+            for j, dep in enumerate(row_deps):
+                dep_id = function_id(dep)
+                if dep_id in X_ids:
+                    raise ValueError("Invalid dependency")
+                if dep_id not in eq_dep_ids:
+                    eq_dep_ids[dep_id] = len(eq_deps)
+                    eq_deps.append(dep)
+                dep_indices[n, j] = eq_dep_ids[dep_id]
+
+        # Map from equation and non-linear argument to non-linear dependency
+        # index
+        nl_deps = []
+        nl_dep_ids = {}
+        nl_dep_indices_ = np.zeros((len(X), len(nl_dep_indices)),
+                                   dtype=np.int64)
+        for n, row_deps in enumerate(deps):
+            for k, j in enumerate(nl_dep_indices):
+                dep = row_deps[j]
+                dep_id = function_id(dep)
+                if dep_id not in nl_dep_ids:
+                    nl_dep_ids[dep_id] = len(nl_deps)
+                    nl_deps.append(dep)
+                nl_dep_indices_[n, k] = nl_dep_ids[dep_id]
+
+        super().__init__(X, eq_deps, nl_deps=nl_deps,
+                         ic=False, adj_ic=False)
+        self._F_expr = expr
+        self._F = F
+        self._args = args
+        self._dF_expr = dF_expr
+        self._dF = dF
+        self._dep_indices = dep_indices
+        self._nl_dep_indices = nl_dep_indices_
+        self._dtype = np.result_type(*set(map(function_dtype, eq_deps)))
+
+    def _values(self, X):
+        return np.fromiter((x.value() for x in X), dtype=self._dtype,
+                           count=len(X))
+
+    def forward_solve(self, X, deps=None):
+        if deps is None:
+            deps = self.dependencies()
+        # Gather each distinct dependency value once. The solution entries are
+        # not used.
+        dep_vals = self._values(deps)
+        dep_vals = tuple(dep_vals[self._dep_indices.T])
+        X_val = np.broadcast_to(self._F(*dep_vals), (len(X),))
+        for x, x_val in zip(X, X_val.tolist()):
+            function_assign(x, x_val)
+
+    def adjoint_jacobian_solve(self, adj_X, nl_deps, B):
+        return B
+
+    def subtract_adjoint_derivative_actions(self, adj_X, nl_deps, dep_Bs):
+        if is_function(adj_X):
+            adj_X = (adj_X,)
+        deps = self.dependencies()
+        nl_dep_vals = self._values(nl_deps)
+        nl_dep_vals = tuple(nl_dep_vals[self._nl_dep_indices.T])
+        adj_X_val = self._values(adj_X)
+
+        F_vals = []
+        for j, dep_indices in enumerate(self._dep_indices.T):
+            F_vals.append(
+                -np.broadcast_to(self._dF[j](*nl_dep_vals),
+                                 (len(adj_X),)).conjugate()
+                * adj_X_val)
+        F_val = np.zeros(len(deps), dtype=np.result_type(*F_vals))
+        for dep_indices, F_val_j in zip(self._dep_indices.T, F_vals):
+            np.add.at(F_val, dep_indices, F_val_j)
+
+        for dep_index, dep_B in dep_Bs.items():
+            # Scalar adjoint right-hand-side terms, avoiding construction of a
+            # new function for each dependency
+            dep_B.sub(F_val[dep_index].item())
+
+    @no_float_overloading
+    def tangent_linear(self, M, dM, tlm_map):
+        X = self.X()
+        deps = self.dependencies()
+        rows = [[deps[dep_index] for dep_index in dep_indices]
+                for dep_indices in self._dep_indices.tolist()]
+        tau_rows = [[get_tangent_linear(dep, M, dM, tlm_map) for dep in row]
+                    for row in rows]
+        tau_js = [j for j in range(len(self._args))
+                  if any(tau_row[j] is not None for tau_row in tau_rows)]
+        if len(tau_js) == 0:
+            return ZeroAssignment([tlm_map[x] for x in X])
+
+        # The expression is defined in terms of the dependencies of the first
+        # equation, which must be distinct
+        for n, (row, tau_row) in enumerate(zip(rows, tau_rows)):
+            row_ids = list(map(function_id, row))
+            row_ids.extend(function_id(tau_row[j]) for j in tau_js
+                           if tau_row[j] is not None)
+            if len(set(row_ids)) == len(row_ids):
+                break
+        else:
+            raise RuntimeError("Unable to derive tangent-linear")
+        order = [n] + [p for p in range(len(X)) if p != n]
+
+        zero = None
+        tlm_X = []
+        tlm_deps = []
+        for p in order:
+            tlm_X.append(tlm_map[X[p]])
+            tlm_row = list(rows[p])
+            for j in tau_js:
+                tau_dep = tau_rows[p][j]
+                if tau_dep is None:
+                    if p == n:
+                        tau_dep = X[p].new(static=True)
+                    else:
+                        if zero is None:
+                            zero = X[p].new(static=True)
+                        tau_dep = zero
+                tlm_row.append(tau_dep)
+            tlm_deps.append(tlm_row)
+
+        arg_map = dict(zip(self._args, tlm_deps[0]))
+        expr = 0
+        for k, j in enumerate(tau_js):
+            expr += (self._dF_expr[j].xreplace(arg_map)
+                     * tlm_deps[0][len(self._args) + k])
+        return VectorizedFloatEquation(tlm_X, expr, tlm_deps)
+
+
+@no_float_overloading
+def vectorize_float_equations(block, is_live=None):
+    """
+    A block pass which fuses runs of consecutive, structurally identical,
+    FloatEquation objects into VectorizedFloatEquation objects. See
+    EquationManager.add_block_pass.
+
+    Arguments:
+
+    block    A sequence of equations.
+    is_live  Unused.
+    """
+
+    def is_candidate(eq):
+        return (isinstance(eq, FloatEquation)
+                and not hasattr(eq, "_tlm_adjoint__tlm_key"))
+
+    runs = []
+    for i, eq in enumerate(block):
+        if is_candidate(eq):
+            eq_X_id = function_id(eq.x())
+            eq_dep_ids = set(map(function_id, eq.dependencies()[1:]))
+            if len(runs) > 0 and runs[-1][0] is not None:
+                eq0, run, X_ids, dep_ids = runs[-1]
+                if eq0._F is eq._F \
+                        and eq_X_id not in X_ids \
+                        and eq_X_id not in dep_ids \
+                        and X_ids.isdisjoint(eq_dep_ids):
+                    run.append(i)
+                    X_ids.add(eq_X_id)
+                    dep_ids.update(eq_dep_ids)
+                    continue
+            runs.append((eq, [i], {eq_X_id}, eq_dep_ids))
+        else:
+            runs.append((None, [i], None, None))
+
+    if all(len(run) == 1 for _, run, _, _ in runs):
+        return None
+
+    eqs = []
+    for eq0, run, _, _ in runs:
+        if len(run) == 1:
+            eqs.append((block[run[0]], tuple(run)))
+        else:
+            eqs.append((VectorizedFloatEquation(
+                [block[i].x() for i in run], eq0._F_expr,
+                [block[i].dependencies()[1:] for i in run]),
+                tuple(run)))
+    return eqs
+
+
 def _subtract_adjoint_derivative_action(x, y):
     if isinstance(x, SymbolicFloat):
         if is_function(y) and function_is_scalar(y):
@@ -629,6 +927,10 @@ def _subtract_adjoint_derivative_action(x, y):
                 and is_function(y[1]) and function_is_scalar(y[1]):
             check_space_types(x, y[1])
             function_axpy(x, -y[0], y[1])
+        elif isinstance(y, (int, np.integer,
+                            float, np.floating,
+                            complex, np.complexfloating)):
+            function_assign(x, x.value() - y)
         else:
             return NotImplemented
     else:
@@ -24,13 +24,16 @@ from .interface import DEFAULT_COMM, check_space_types, comm_dup, \
 
 from .alias import WeakAlias, gc_disabled
 from .checkpoint_schedules import Clear, Configure, Forward, Reverse, Read, \
-    Write, EndForward, EndReverse
+    Write, Delete, EndForward, EndReverse
 from .checkpoint_schedules import MemoryCheckpointSchedule, \
-    MultistageCheckpointSchedule, NoneCheckpointSchedule, \
-    PeriodicDiskCheckpointSchedule
+    MultistageCheckpointSchedule, MultitierCheckpointSchedule, \
+    NoneCheckpointSchedule, OnlineCheckpointSchedule, \
+    PeriodicDiskCheckpointSchedule, select_checkpoint_schedule
 from .checkpointing import CheckpointStorage, HDF5Checkpoints, \
-    PickleCheckpoints, ReplayStorage
-from .equations import AdjointModelRHS, ControlsMarker, Equation, \
+    PickleCheckpoints, ReplayStorage, add_nbytes, function_nbytes, \
+    nbytes_by_space, replay_next_use
+from .equations import AdjointBufferPool, AdjointModelRHS, ControlsMarker, \
+    Equation, \
     FunctionalMarker, ZeroAssignment
 from .functional import Functional
 from .manager import restore_manager, set_manager
@@ -50,12 +53,15 @@ except ImportError:
 import numpy as np
 from operator import itemgetter
 import os
+import time
 import warnings
 import weakref
 
 __all__ = \
     [
-        "EquationManager"
+        "EquationManager",
+        "GarbageCleanupPolicy",
+        "TapeProfile"
     ]
 
 
@@ -178,6 +184,113 @@ class TangentLinearMap:
         return x._tlm_adjoint__tangent_linears[self]
 
 
+class BlockIndex:
+    """
+    Array representation of the dependency structure of a block of equations,
+    used by DependencyGraphTranspose for dependency graph traversals and to
+    compute forward replay data. Function IDs are stored in typed NumPy arrays
+    in a compressed sparse row layout, with flags indicating the role of each
+    dependency packed into a single byte per dependency.
+
+    Block indices are temporary, and exist only for the lifetime of the
+    DependencyGraphTranspose.
+
+    Arguments:
+
+    block  A sequence of equations.
+    """
+
+    __slots__ = ("_X_ids", "_X_ptr", "_adj_ic",
+                 "_dep_ids", "_dep_ptr", "_dep_flags")
+
+    _NL_DEP = np.uint8(1)
+    _IC_DEP = np.uint8(2)
+    _X_DEP = np.uint8(4)
+
+    def __init__(self, block):
+        X_ptr = np.zeros(len(block) + 1, dtype=np.int64)
+        dep_ptr = np.zeros(len(block) + 1, dtype=np.int64)
+        X_ids = []
+        adj_ic = []
+        dep_ids = []
+        dep_flags = []
+        for i, eq in enumerate(block):
+            eq_X_ids = tuple(map(function_id, eq.X()))
+            eq_dep_ids = tuple(map(function_id, eq.dependencies()))
+            X_ptr[i + 1] = X_ptr[i] + len(eq_X_ids)
+            dep_ptr[i + 1] = dep_ptr[i] + len(eq_dep_ids)
+
+            adj_ic_ids = set(map(function_id,
+                                 eq.adjoint_initial_condition_dependencies()))
+            X_ids.extend(eq_X_ids)
+            adj_ic.extend(x_id in adj_ic_ids for x_id in eq_X_ids)
+            del adj_ic_ids
+
+            nl_dep_ids = set(map(function_id, eq.nonlinear_dependencies()))
+            ic_dep_ids = set(map(function_id,
+                                 eq.initial_condition_dependencies()))
+            eq_X_ids = set(eq_X_ids)
+            dep_ids.extend(eq_dep_ids)
+            dep_flags.extend(
+                (self._NL_DEP if dep_id in nl_dep_ids else 0)
+                | (self._IC_DEP if dep_id in ic_dep_ids else 0)
+                | (self._X_DEP if dep_id in eq_X_ids else 0)
+                for dep_id in eq_dep_ids)
+            del nl_dep_ids, ic_dep_ids
+
+        self._X_ids = np.array(X_ids, dtype=np.int64)
+        self._X_ptr = X_ptr
+        self._adj_ic = np.array(adj_ic, dtype=bool)
+        self._dep_ids = np.array(dep_ids, dtype=np.int64)
+        self._dep_ptr = dep_ptr
+        self._dep_flags = np.array(dep_flags, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self._X_ptr) - 1
+
+    def n_X(self):
+        return len(self._X_ids)
+
+    def n_dependencies(self):
+        return len(self._dep_ids)
+
+    def X_slice(self, i):
+        return slice(int(self._X_ptr[i]), int(self._X_ptr[i + 1]))
+
+    def dependencies_slice(self, i):
+        return slice(int(self._dep_ptr[i]), int(self._dep_ptr[i + 1]))
+
+    def X_ids(self, i):
+        return self._X_ids[self.X_slice(i)].tolist()
+
+    def adjoint_initial_condition_ids(self, i):
+        s = self.X_slice(i)
+        return self._X_ids[s][self._adj_ic[s]].tolist()
+
+    def dependency_ids(self, i):
+        return self._dep_ids[self.dependencies_slice(i)].tolist()
+
+    def dependency_equations(self):
+        # Equation index for each dependency
+        return np.repeat(np.arange(len(self), dtype=np.int64),
+                         np.diff(self._dep_ptr))
+
+    def dependencies_ptr(self):
+        return self._dep_ptr
+
+    def dependency_ids_array(self):
+        return self._dep_ids
+
+    def nonlinear_dependency_mask(self):
+        return (self._dep_flags & self._NL_DEP) != 0
+
+    def initial_condition_mask(self):
+        return (self._dep_flags & self._IC_DEP) != 0
+
+    def solution_dependency_mask(self):
+        return (self._dep_flags & self._X_DEP) != 0
+
+
 class DependencyGraphTranspose:
     def __init__(self, Js, M, blocks, *,
                  prune_forward=True, prune_adjoint=True):
@@ -187,23 +300,34 @@ class DependencyGraphTranspose:
         else:
             # Mapping
             blocks_n = tuple(sorted(blocks.keys()))
+        block_indices = {n: BlockIndex(blocks[n]) for n in blocks_n}
 
-        # Transpose dependency graph
+        # Transpose dependency graph, stored as rows (p, k, m) for each
+        # dependency, with k = -1 indicating no transpose dependency. Rows
+        # (p, k) for the previous equation solving for a dependency which is
+        # also solved for by the equation are stored separately, for use in
+        # forward replay.
         last_eq = {}
-        transpose_deps = {n: tuple([None for dep in eq.dependencies()]
-                                   for eq in blocks[n])
+        transpose_deps = {n: np.full((block_indices[n].n_dependencies(), 3),
+                                     -1, dtype=np.int64)
                           for n in blocks_n}
+        previous_X_deps = {n: np.full((block_indices[n].n_dependencies(), 2),
+                                      -1, dtype=np.int64)
+                           for n in blocks_n}
         for n in blocks_n:
-            block = blocks[n]
-            for i, eq in enumerate(block):
-                for m, x in enumerate(eq.X()):
-                    last_eq[function_id(x)] = (n, i, m)
-                for j, dep in enumerate(eq.dependencies()):
-                    dep_id = function_id(dep)
+            block_index = block_indices[n]
+            for i in range(len(block_index)):
+                X_ids = block_index.X_ids(i)
+                j0 = block_index.dependencies_slice(i).start
+                for j, dep_id in enumerate(block_index.dependency_ids(i)):
                     if dep_id in last_eq:
                         p, k, m = last_eq[dep_id]
-                        if p < n or k < i:
-                            transpose_deps[n][i][j] = (p, k, m)
+                        if dep_id in X_ids:
+                            previous_X_deps[n][j0 + j, :] = (p, k)
+                        else:
+                            transpose_deps[n][j0 + j, :] = (p, k, m)
+                for m, x_id in enumerate(X_ids):
+                    last_eq[x_id] = (n, i, m)
         del last_eq
 
         if prune_forward:
@@ -212,20 +336,18 @@ class DependencyGraphTranspose:
             last_eq = {}
             transpose_deps_ics = copy.deepcopy(transpose_deps)
             for p in reversed(blocks_n):
-                block = blocks[p]
-                for k in range(len(block) - 1, -1, -1):
-                    eq = block[k]
-                    dep_map = {function_id(dep): j
-                               for j, dep in enumerate(eq.dependencies())}
-                    for dep in eq.adjoint_initial_condition_dependencies():
-                        dep_id = function_id(dep)
+                block_index = block_indices[p]
+                for k in range(len(block_index) - 1, -1, -1):
+                    dep_map = {dep_id: j for j, dep_id
+                               in enumerate(block_index.dependency_ids(k))}
+                    for dep_id in block_index.adjoint_initial_condition_ids(k):
                         if dep_id in last_eq:
                             n, i, m = last_eq[dep_id]
                             assert n > p or (n == p and i > k)
-                            transpose_deps_ics[n][i][m] \
+                            j0 = block_indices[n].dependencies_slice(i).start
+                            transpose_deps_ics[n][j0 + m, :] \
                                 = (p, k, dep_map[dep_id])
-                    for m, x in enumerate(eq.X()):
-                        x_id = function_id(x)
+                    for m, x_id in enumerate(block_index.X_ids(k)):
                         last_eq[x_id] = (p, k, m)
             del last_eq
 
@@ -234,20 +356,20 @@ class DependencyGraphTranspose:
             active_forward = {n: np.full(len(blocks[n]), False, dtype=bool)
                               for n in blocks_n}
             for n in blocks_n:
-                block = blocks[n]
-                for i, eq in enumerate(block):
+                block_index = block_indices[n]
+                for i in range(len(block_index)):
                     if len(active_M) > 0:
-                        X_ids = set(map(function_id, eq.X()))
+                        X_ids = set(block_index.X_ids(i))
                         if not X_ids.isdisjoint(active_M):
                             active_M.difference_update(X_ids)
                             active_forward[n][i] = True
                     if not active_forward[n][i]:
-                        for j, dep in enumerate(eq.dependencies()):
-                            if transpose_deps_ics[n][i][j] is not None:
-                                p, k, m = transpose_deps_ics[n][i][j]
-                                if active_forward[p][k]:
-                                    active_forward[n][i] = True
-                                    break
+                        s = block_index.dependencies_slice(i)
+                        for p, k, m in transpose_deps_ics[n][s].tolist():
+                            if k >= 0 and active_forward[p][k]:
+                                active_forward[n][i] = True
+                                break
+            del transpose_deps_ics
         else:
             active_forward = {n: np.full(len(blocks[n]), True, dtype=bool)
                               for n in blocks_n}
@@ -262,58 +384,62 @@ class DependencyGraphTranspose:
                 active_adjoint = {n: np.full(len(blocks[n]), False, dtype=bool)
                                   for n in blocks_n}
                 for n in reversed(blocks_n):
-                    block = blocks[n]
-                    for i in range(len(block) - 1, -1, -1):
-                        eq = block[i]
-                        if active_J:
-                            for x in eq.X():
-                                if function_id(x) == J_id:
-                                    active_J = False
-                                    active_adjoint[n][i] = True
-                                    break
+                    block_index = block_indices[n]
+                    for i in range(len(block_index) - 1, -1, -1):
+                        if active_J and J_id in block_index.X_ids(i):
+                            active_J = False
+                            active_adjoint[n][i] = True
                         if active_adjoint[n][i]:
-                            for j, dep in enumerate(eq.dependencies()):
-                                if transpose_deps[n][i][j] is not None:
-                                    p, k, m = transpose_deps[n][i][j]
+                            s = block_index.dependencies_slice(i)
+                            for p, k, m in transpose_deps[n][s].tolist():
+                                if k >= 0:
                                     active_adjoint[p][k] = True
                         else:
                             active[J_i][n][i] = False
 
         solved = copy.deepcopy(active)
 
-        stored_adj_ics = {J_i: {n: tuple([None for x in eq.X()]
-                                         for eq in blocks[n])
-                                for n in blocks_n} for J_i in range(len(Js))}
-        adj_ics = {J_i: {} for J_i in range(len(Js))}
-        for J_i in range(len(Js)):
-            for n in blocks_n:
-                block = blocks[n]
-                for i, eq in enumerate(block):
-                    adj_ic_ids = set(map(function_id,
-                                         eq.adjoint_initial_condition_dependencies()))  # noqa: E501
-                    for m, x in enumerate(eq.X()):
-                        x_id = function_id(x)
-
-                        stored_adj_ics[J_i][n][i][m] = adj_ics[J_i].get(x_id, None)  # noqa: E501
-
-                        if x_id in adj_ic_ids:
-                            adj_ics[J_i][x_id] = (n, i)
-                        elif x_id in adj_ics[J_i]:
-                            del adj_ics[J_i][x_id]
-
+        # Stored adjoint initial conditions, stored as rows (p, k) for each
+        # solution, with k = -1 indicating no stored adjoint initial condition.
+        # These are independent of the functional.
+        stored_adj_ics = {n: np.full((block_indices[n].n_X(), 2), -1,
+                                     dtype=np.int64)
+                          for n in blocks_n}
+        adj_ics = {}
+        for n in blocks_n:
+            block_index = block_indices[n]
+            for i in range(len(block_index)):
+                adj_ic_ids = set(block_index.adjoint_initial_condition_ids(i))
+                m0 = block_index.X_slice(i).start
+                for m, x_id in enumerate(block_index.X_ids(i)):
+                    if x_id in adj_ics:
+                        stored_adj_ics[n][m0 + m, :] = adj_ics[x_id]
+
+                    if x_id in adj_ic_ids:
+                        adj_ics[x_id] = (n, i)
+                    elif x_id in adj_ics:
+                        del adj_ics[x_id]
+
+        self._block_indices = block_indices
         self._transpose_deps = transpose_deps
+        self._previous_X_deps = previous_X_deps
         self._active = active
+        self._replay_data = None
         self._solved = solved
         self._stored_adj_ics = stored_adj_ics
         self._adj_ics = adj_ics
 
     def __contains__(self, key):
         n, i, j = key
-        return self._transpose_deps[n][i][j] is not None
+        j0 = self._block_indices[n].dependencies_slice(i).start
+        return self._transpose_deps[n][j0 + j, 1] >= 0
 
     def __getitem__(self, key):
         n, i, j = key
-        p, k, m = self._transpose_deps[n][i][j]
+        j0 = self._block_indices[n].dependencies_slice(i).start
+        p, k, m = self._transpose_deps[n][j0 + j, :].tolist()
+        if k < 0:
+            raise KeyError(f"No transpose dependency for {key}")
         return p, k, m
 
     def is_active(self, J_i, n, i):
@@ -337,30 +463,111 @@ class DependencyGraphTranspose:
         else:
             x_id = function_id(x)
 
-        if x_id in self._adj_ics[J_i]:
-            n, i = self._adj_ics[J_i][x_id]
+        if x_id in self._adj_ics:
+            n, i = self._adj_ics[x_id]
             return self.is_solved(J_i, n, i)
         else:
             return False
 
     def is_stored_adj_ic(self, J_i, n, i, m):
-        stored_adj_ics = self._stored_adj_ics[J_i][n][i][m]
-        if stored_adj_ics is None:
+        m0 = self._block_indices[n].X_slice(i).start
+        p, k = self._stored_adj_ics[n][m0 + m, :].tolist()
+        if k < 0:
             return False
         else:
-            p, k = stored_adj_ics
             return self.is_solved(J_i, p, k)
 
     def adj_Bs(self, J_i, n, i, eq, B):
         dep_Bs = {}
-        for j, dep in enumerate(eq.dependencies()):
-            if (n, i, j) in self:
-                p, k, m = self[(n, i, j)]
-                if self.is_solved(J_i, p, k):
-                    dep_Bs[j] = B[p][k][m]
+        s = self._block_indices[n].dependencies_slice(i)
+        for j, (p, k, m) in enumerate(self._transpose_deps[n][s].tolist()):
+            if k >= 0 and self.is_solved(J_i, p, k):
+                dep_Bs[j] = B[p][k][m]
 
         return dep_Bs
 
+    def _compute_replay_data(self):
+        # For each forward equation, the smallest block containing an active
+        # adjoint equation whose non-linear dependencies require, directly or
+        # indirectly, the solution of the forward equation. A forward replay
+        # of blocks N0, ..., N1 - 1 needs exactly the equations in these
+        # blocks for which this is less than N1. Computed using a single
+        # reverse traversal of the forward dependency graph.
+        blocks_n = tuple(sorted(self._block_indices.keys()))
+        no_block = blocks_n[-1] + 1 if len(blocks_n) > 0 else 0
+        any_active = {}
+        for n in blocks_n:
+            any_active[n] = np.full(len(self._block_indices[n]), False,
+                                    dtype=bool)
+            for J_i in self._active:
+                any_active[n] |= self._active[J_i][n]
+        replay_blocks = {n: np.full(len(self._block_indices[n]), no_block,
+                                    dtype=np.int64)
+                         for n in blocks_n}
+        for n in reversed(blocks_n):
+            block_index = self._block_indices[n]
+            nl_mask = block_index.nonlinear_dependency_mask()
+            ic_mask = block_index.initial_condition_mask()
+            X_mask = block_index.solution_dependency_mask()
+            transpose_deps = self._transpose_deps[n]
+            previous_X_deps = self._previous_X_deps[n]
+            for i in range(len(block_index) - 1, -1, -1):
+                s = block_index.dependencies_slice(i)
+                if any_active[n][i]:
+                    # Forward equations solving for non-linear dependencies
+                    if (nl_mask[s] & X_mask[s]).any():
+                        replay_blocks[n][i] = min(replay_blocks[n][i], n)
+                    deps = transpose_deps[s, :2][nl_mask[s] & ~X_mask[s]]
+                    for p, k in deps[deps[:, 1] >= 0].tolist():
+                        replay_blocks[p][k] = min(replay_blocks[p][k], n)
+
+                replay_block = replay_blocks[n][i]
+                if replay_block != no_block:
+                    # Forward equations solving for dependencies
+                    deps = np.concatenate(
+                        (transpose_deps[s, :2][~X_mask[s]],
+                         previous_X_deps[s][X_mask[s] & ic_mask[s]]))
+                    for p, k in deps[deps[:, 1] >= 0].tolist():
+                        replay_blocks[p][k] = min(replay_blocks[p][k],
+                                                  replay_block)
+
+        # For each dependency of each equation, the smallest N1 for which the
+        # dependency is needed by the equation in a replay of blocks
+        # N0, ..., N1 - 1. All dependencies are needed by a replayed equation,
+        # and non-linear dependencies are needed by an equation with an active
+        # adjoint.
+        dep_ptr = {}
+        dep_ids = []
+        dep_thresholds = []
+        offset = 0
+        for n in blocks_n:
+            block_index = self._block_indices[n]
+            eqs = block_index.dependency_equations()
+            thresholds = replay_blocks[n][eqs]
+            thresholds[any_active[n][eqs]
+                       & block_index.nonlinear_dependency_mask()] = n
+            dep_ptr[n] = block_index.dependencies_ptr() + offset
+            dep_ids.append(block_index.dependency_ids_array())
+            dep_thresholds.append(thresholds)
+            offset += block_index.n_dependencies()
+        dep_ids = np.concatenate(dep_ids + [np.zeros(0, dtype=np.int64)])
+        dep_thresholds = np.concatenate(
+            dep_thresholds + [np.zeros(0, dtype=np.int64)])
+
+        return (replay_blocks, dep_ptr, dep_ids, dep_thresholds,
+                replay_next_use(dep_ids, dep_thresholds, no_block))
+
+    def replay_data(self):
+        """
+        Return forward replay data, for use with ReplayStorage. The data is
+        independent of the range of blocks to be replayed, and is computed on
+        the first call.
+        """
+
+        if self._replay_data is None:
+            self._replay_data = self._compute_replay_data()
+        return self._replay_data
+
 
 def distinct_combinations_indices(iterable, r):
     class Comparison:
@@ -469,6 +676,11 @@ class AdjointCache:
         self._cache = {}
         self._keys = {}
         self._cache_key = None
+        # Cached adjoint solutions may be shared between keys. Reference
+        # counts and sizes are maintained for each distinct function.
+        self._functions = {}
+        self._nbytes = {}
+        self._total_nbytes = 0
 
     def __len__(self):
         return len(self._cache)
@@ -481,6 +693,9 @@ class AdjointCache:
         self._cache.clear()
         self._keys.clear()
         self._cache_key = None
+        self._functions.clear()
+        self._nbytes.clear()
+        self._total_nbytes = 0
 
     def get(self, J_i, n, i, *, copy=True):
         adj_X = self._cache[(J_i, n, i)]
@@ -489,28 +704,61 @@ class AdjointCache:
         return adj_X
 
     def pop(self, J_i, n, i, *, copy=True):
-        adj_X = self._cache.pop((J_i, n, i))
+        adj_X = self._pop((J_i, n, i))
         if copy:
             adj_X = tuple(function_copy(adj_x) for adj_x in adj_X)
         return adj_X
 
     def remove(self, J_i, n, i):
-        del self._cache[(J_i, n, i)]
+        self._pop((J_i, n, i))
+
+    def nbytes(self):
+        return dict(self._nbytes)
+
+    def total_nbytes(self):
+        return self._total_nbytes
+
+    def _set(self, key, adj_X):
+        if key in self._cache:
+            if self._cache[key] is adj_X:
+                return
+            self._pop(key)
+        self._cache[key] = adj_X
+        for adj_x in adj_X:
+            adj_x_id = id(adj_x)
+            if adj_x_id in self._functions:
+                self._functions[adj_x_id][1] += 1
+            else:
+                self._functions[adj_x_id] = [adj_x, 1]
+                self._total_nbytes += add_nbytes(self._nbytes, adj_x, 1)
+
+    def _pop(self, key):
+        adj_X = self._cache.pop(key)
+        for adj_x in adj_X:
+            adj_x_id = id(adj_x)
+            self._functions[adj_x_id][1] -= 1
+            if self._functions[adj_x_id][1] == 0:
+                del self._functions[adj_x_id]
+                self._total_nbytes += add_nbytes(self._nbytes, adj_x, -1)
+        return adj_X
 
-    def cache(self, J_i, n, i, adj_X, *, copy=True, store=False):
+    def cache(self, J_i, n, i, adj_X, *, copy=True, store=False, pool=None):
         if (J_i, n, i) in self._keys \
                 and (store or len(self._keys[(J_i, n, i)]) > 0):
             if (J_i, n, i) in self._cache:
                 adj_X = self._cache[(J_i, n, i)]
             elif copy:
-                adj_X = tuple(function_copy(adj_x) for adj_x in adj_X)
+                if pool is None:
+                    adj_X = tuple(function_copy(adj_x) for adj_x in adj_X)
+                else:
+                    adj_X = tuple(pool.copy(adj_x) for adj_x in adj_X)
             else:
                 adj_X = tuple(adj_X)
 
             if store:
-                self._cache[(J_i, n, i)] = adj_X
+                self._set((J_i, n, i), adj_X)
             for J_j, p, k in self._keys[(J_i, n, i)]:
-                self._cache[(J_j, p, k)] = adj_X
+                self._set((J_j, p, k), adj_X)
 
     def initialize(self, Js, blocks, transpose_deps, *,
                    cache_degree=None):
@@ -569,7 +817,8 @@ class AdjointCache:
                             self._keys[eq_root[adj_key]].append((J_j, p, k))
                             if (J_j, p, k) in self._cache \
                                     and eq_root[adj_key] not in self._cache:
-                                self._cache[eq_root[adj_key]] = self._cache[(J_j, p, k)]  # noqa: E501
+                                self._set(eq_root[adj_key],
+                                          self._cache[(J_j, p, k)])
                         else:
                             eq_root[adj_key] = (J_j, p, k)
                             self._keys[eq_root[adj_key]] = []
@@ -582,6 +831,183 @@ class AdjointCache:
                 transpose_deps.set_not_solved(J_i, n, i)
 
 
+def _resident_set_size():
+    # Resident set size in bytes, read from /proc/self/statm, or None if
+    # unavailable
+    try:
+        with open("/proc/self/statm", "r") as h:
+            _, rss_pages = h.read().split()[:2]
+        return int(rss_pages) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class GarbageCleanupPolicy:
+    """
+    Controls when an EquationManager calls garbage_cleanup. garbage_cleanup
+    is called when a block ends, after each block of equations is replayed or
+    loaded from a checkpoint, and after each block in an adjoint calculation.
+    It is collective, and calls PETSc.garbage_cleanup, which synchronizes.
+
+    Arguments:
+
+    interval       (Optional) Call garbage_cleanup at every interval th
+                   opportunity. If None then garbage_cleanup is not called
+                   periodically.
+    rss_threshold  (Optional) If supplied, additionally call garbage_cleanup
+                   at any opportunity at which the resident set size, read
+                   from /proc/self/statm, exceeds this number of bytes on any
+                   process. Requires a reduction at each opportunity.
+    enabled        (Optional) If False then garbage_cleanup is never called.
+
+    Opportunities at which the equation manager is reset, and at the end of an
+    adjoint calculation, are always used unless the policy is disabled.
+    Decisions are consistent across processes.
+
+    The default policy, with interval 1, calls garbage_cleanup at every
+    opportunity.
+    """
+
+    def __init__(self, *, interval=1, rss_threshold=None, enabled=True):
+        if interval is not None and interval < 1:
+            raise ValueError("interval must be positive")
+        if rss_threshold is not None and _resident_set_size() is None:
+            raise RuntimeError("Unable to determine the resident set size")
+
+        self._interval = interval
+        self._rss_threshold = rss_threshold
+        self._enabled = enabled
+
+        self._n = 0
+        self._n_cleanup = 0
+        self._time = 0.0
+
+    def __call__(self, comm, *, force=False):
+        """
+        An opportunity to call garbage_cleanup. Must be called collectively on
+        comm.
+
+        Arguments:
+
+        comm   Communicator.
+        force  Whether garbage_cleanup should be called unless the policy is
+               disabled.
+
+        Returns whether garbage_cleanup was called.
+        """
+
+        if not self._enabled:
+            return False
+
+        self._n += 1
+        if force:
+            cleanup = True
+        elif self._interval is not None and self._n % self._interval == 0:
+            cleanup = True
+        elif self._rss_threshold is not None:
+            rss = _resident_set_size()
+            cleanup = comm.allreduce(int(rss > self._rss_threshold)) > 0
+        else:
+            cleanup = False
+
+        if cleanup:
+            t0 = time.perf_counter()
+            garbage_cleanup(comm)
+            self._time += time.perf_counter() - t0
+            self._n_cleanup += 1
+        return cleanup
+
+    def info(self):
+        """
+        Return a dictionary containing the number of opportunities, the number
+        of calls to garbage_cleanup, and the total time in seconds spent in
+        garbage_cleanup on this process.
+        """
+
+        return {"opportunities": self._n,
+                "cleanups": self._n_cleanup,
+                "time": self._time}
+
+
+class TapeProfile:
+    """
+    Records which equations are active in adjoint calculations, accumulated
+    over multiple calls to EquationManager.compute_gradient. When a tape
+    profile is set for an equation manager using the "memory" checkpointing
+    method, non-linear dependency data is not stored when annotating
+    equations which were inactive in all earlier adjoint calculations.
+
+    Equations are identified by their block and equation indices, and
+    profile information for a block is discarded if the structure of the
+    block changes. If non-linear dependency data which was not stored is
+    later required, e.g. if the functionals or controls change, then the
+    data is recomputed via a forward replay.
+    """
+
+    def __init__(self):
+        self._blocks = {}
+
+    @staticmethod
+    def _signature(eq):
+        return (len(eq.X()), len(eq.dependencies()),
+                len(eq.nonlinear_dependencies()))
+
+    def clear(self):
+        """
+        Discard all profile information.
+        """
+
+        self._blocks.clear()
+
+    def is_inactive(self, n, i, eq):
+        """
+        Return whether equation i in block n was inactive in all recorded
+        adjoint calculations.
+
+        Arguments:
+
+        n   The block index.
+        i   The equation index.
+        eq  The equation.
+        """
+
+        if n not in self._blocks:
+            return False
+        signatures, active = self._blocks[n]
+        return (i < len(signatures)
+                and signatures[i] == self._signature(eq)
+                and not active[i])
+
+    def update(self, blocks, transpose_deps):
+        """
+        Record which equations are active in an adjoint calculation.
+
+        Arguments:
+
+        blocks          A sequence of blocks of equations.
+        transpose_deps  A DependencyGraphTranspose.
+        """
+
+        for n, block in enumerate(blocks):
+            signatures = tuple(map(self._signature, block))
+            active = np.array([transpose_deps.any_is_active(n, i)
+                               for i in range(len(block))], dtype=bool)
+            if n in self._blocks and self._blocks[n][0] == signatures:
+                active |= self._blocks[n][1]
+            self._blocks[n] = (signatures, active)
+        for n in list(self._blocks.keys()):
+            if n >= len(blocks):
+                del self._blocks[n]
+
+
+class _ActiveEquations:
+    def __init__(self, active):
+        self._active = active
+
+    def any_is_active(self, n, i):
+        return (n, i) in self._active
+
+
 class AnnotationState(enum.Enum):
     STOPPED = "stopped"
     ANNOTATING = "annotating"
@@ -625,6 +1051,10 @@ class EquationManager:
                                 for optimal offline checkpointing", SIAM
                                 Journal on Scientific Computing, 31(3),
                                 pp. 1946--1967, 2009
+                online
+                    Online checkpointing with a fixed number of snapshots,
+                    for use when the number of blocks is not known in advance.
+                    See OnlineCheckpointSchedule.
         cp_method may alternatively be a callable, used to construct a
         CheckpointSchedule.
 
@@ -660,6 +1090,17 @@ class EquationManager:
                                integer, optional, default 0.
                 snaps_on_disk  Number of "snaps" to store on disk. Non-negative
                                integer, optional, default 0.
+
+            Parameters for "online" method
+                path           Directory in which disk checkpoint data should
+                               be stored. String, optional, default
+                               "checkpoints~".
+                format         Disk checkpointing format. One of {"pickle",
+                               "hdf5"}, optional, default "hdf5".
+                snapshots      Maximum number of snapshots. Positive integer,
+                               required.
+                storage        Snapshot storage. One of {"RAM", "disk"},
+                               optional, default "disk".
         """
         # "multistage" name, and "snaps_in_ram", and "snaps_on_disk" in
         # "multistage" method, are similar to adj_checkpointing arguments in
@@ -675,6 +1116,10 @@ class EquationManager:
         self._comm = comm
         self._to_drop_references = []
         self._finalizes = {}
+        self._block_passes = []
+        self._block_live_warning = False
+        self._tape_profile = None
+        self._garbage_cleanup = GarbageCleanupPolicy()
 
         @gc_disabled
         def finalize_callback(to_drop_references, finalizes):
@@ -755,12 +1200,44 @@ class EquationManager:
             info("  Method: custom")
         else:
             info(f"  Method: {self._cp_method:s}")
+        if self._cp_auto is not None:
+            name, parameters, auto_info = self._cp_auto
+            info(f"  Selected schedule: {name:s} {parameters}")
+            info(f'  Predicted time: {auto_info["predicted"]["time"]:.6e}s')
+        usage = self.memory_usage()
+        info("Memory usage (bytes, this process):")
+        for storage, cp_nbytes in usage["snapshots"].items():
+            info(f'  Snapshots, {storage:s}: '
+                 f'{sum(usage["tiers"][storage].values()):d} in '
+                 f'{len(cp_nbytes):d} snapshot(s), peak '
+                 f'{usage["peak"]["tiers"][storage]:d}')
+            for n, n_nbytes in cp_nbytes.items():
+                info(f"    Snapshot {n:d}: {sum(n_nbytes.values()):d}")
+        info(f'  Storage: {sum(usage["storage"].values()):d}, peak '
+             f'{usage["peak"]["storage"]:d}')
+        info(f'  Adjoint cache: {sum(usage["adjoint_cache"].values()):d}, '
+             f'peak {usage["peak"]["adjoint_cache"]:d}')
+        info(f'  Memory: {usage["memory"]:d}, peak '
+             f'{usage["peak"]["memory"]:d}')
+        spaces = {}
+        for x_nbytes in itertools.chain(usage["tiers"].values(),
+                                        (usage["storage"],
+                                         usage["adjoint_cache"])):
+            for x_space_id, nbytes in x_nbytes.items():
+                spaces[x_space_id] = spaces.get(x_space_id, 0) + nbytes
+        for x_space_id in sorted(spaces):
+            info(f"  Function space {x_space_id:d}: {spaces[x_space_id]:d}")
+        gc_info = self._garbage_cleanup.info()
+        info("Garbage cleanup:")
+        info(f'  Opportunities: {gc_info["opportunities"]:d}')
+        info(f'  Cleanups: {gc_info["cleanups"]:d}')
+        info(f'  Time: {gc_info["time"]:.6e}s')
 
     def new(self, cp_method=None, cp_parameters=None):
         """
-        Return a new equation manager sharing the communicator of this
-        equation manager. Optionally a new checkpointing configuration can be
-        provided.
+        Return a new equation manager sharing the communicator, block passes,
+        and tape profile of this equation manager. Optionally a new
+        checkpointing configuration can be provided.
         """
 
         if cp_method is None:
@@ -773,8 +1250,13 @@ class EquationManager:
             raise TypeError("cp_parameters must be supplied if cp_method is "
                             "supplied")
 
-        return EquationManager(comm=self._comm, cp_method=cp_method,
-                               cp_parameters=cp_parameters)
+        manager = EquationManager(comm=self._comm, cp_method=cp_method,
+                                  cp_parameters=cp_parameters)
+        for block_pass in self._block_passes:
+            manager.add_block_pass(block_pass)
+        manager.set_tape_profile(self._tape_profile)
+        manager.set_garbage_cleanup_policy(self._garbage_cleanup)
+        return manager
 
     @gc_disabled
     def reset(self, cp_method=None, cp_parameters=None):
@@ -794,13 +1276,16 @@ class EquationManager:
                             "supplied")
 
         self.drop_references()
-        garbage_cleanup(self._comm)
+        self._garbage_cleanup(self._comm, force=True)
 
         self._annotation_state = AnnotationState.ANNOTATING
         self._tlm_state = TangentLinearState.DERIVING
         self._eqs = {}
         self._blocks = []
         self._block = []
+        self._block_X_refs = {}
+        self._block_eq_counts = {}
+        self._tape_profile_skipped = set()
 
         self._tlm = TangentLinear()
         self._tlm_map = {}
@@ -834,12 +1319,15 @@ class EquationManager:
         else:
             alias_eqs = True
 
+        cp_auto = None
         if callable(cp_method):
             cp_schedule_kwargs = copy.copy(cp_parameters)
             if "path" in cp_schedule_kwargs:
                 del cp_schedule_kwargs["path"]
             if "format" in cp_schedule_kwargs:
                 del cp_schedule_kwargs["format"]
+            if "storage_tiers" in cp_schedule_kwargs:
+                del cp_schedule_kwargs["storage_tiers"]
             cp_schedule = cp_method(**cp_schedule_kwargs)
         elif cp_method == "none":
             cp_schedule = NoneCheckpointSchedule()
@@ -854,6 +1342,31 @@ class EquationManager:
                 cp_parameters.get("snaps_in_ram", 0),
                 cp_parameters.get("snaps_on_disk", 0),
                 trajectory="maximum")
+        elif cp_method == "multitier":
+            cp_schedule = MultitierCheckpointSchedule(
+                cp_parameters["blocks"],
+                cp_parameters["tiers"],
+                trajectory="maximum")
+        elif cp_method == "online":
+            cp_schedule = OnlineCheckpointSchedule(
+                cp_parameters["snapshots"],
+                storage=cp_parameters.get("storage", "disk"),
+                trajectory="maximum")
+        elif cp_method == "auto":
+            calibration = cp_parameters.get("calibration", {})
+            select_kwargs = {}
+            for key in ["forward_cost", "adjoint_cost", "snapshot_size",
+                        "data_size", "disk_bandwidth", "ram_bandwidth",
+                        "disk_snapshots"]:
+                if key in cp_parameters:
+                    select_kwargs[key] = cp_parameters[key]
+                elif key in calibration:
+                    select_kwargs[key] = calibration[key]
+            name, parameters, cp_schedule, info = select_checkpoint_schedule(
+                cp_parameters["blocks"],
+                memory_limit=cp_parameters["memory_limit"],
+                **select_kwargs)
+            cp_auto = (name, parameters, info)
         else:
             raise ValueError(f"Unrecognized checkpointing method: "
                              f"{cp_method:s}")
@@ -861,41 +1374,139 @@ class EquationManager:
         if cp_schedule.uses_disk_storage():
             cp_path = cp_parameters.get("path", "checkpoints~")
             cp_format = cp_parameters.get("format", "hdf5")
-
-            self._comm.barrier()
-            if self._comm.rank == 0:
-                if not os.path.exists(cp_path):
-                    os.makedirs(cp_path)
-            self._comm.barrier()
-
-            if cp_format == "pickle":
-                cp_disk = PickleCheckpoints(
-                    os.path.join(cp_path, f"checkpoint_{self._id:d}_"),
-                    comm=self._comm)
-            elif cp_format == "hdf5":
-                cp_disk = HDF5Checkpoints(
-                    os.path.join(cp_path, f"checkpoint_{self._id:d}_"),
-                    comm=self._comm)
-            else:
-                raise ValueError(f"Unrecognized checkpointing format: "
-                                 f"{cp_format:s}")
+            cp_storage_tiers = {"disk": (cp_path, cp_format)}
+            for storage, tier_parameters in cp_parameters.get("storage_tiers", {}).items():  # noqa: E501
+                if storage == "RAM":
+                    raise ValueError("Invalid storage tier")
+                cp_storage_tiers[storage] = \
+                    (tier_parameters.get("path", cp_path),
+                     tier_parameters.get("format", cp_format))
+            for _, tier_format in cp_storage_tiers.values():
+                if tier_format not in ["pickle", "hdf5"]:
+                    raise ValueError(f"Unrecognized checkpointing format: "
+                                     f"{tier_format:s}")
         else:
             cp_path = None
-            cp_disk = None
+            cp_storage_tiers = {}
 
         self._cp_method = cp_method
         self._cp_parameters = cp_parameters
+        self._cp_auto = cp_auto
         self._alias_eqs = alias_eqs
         self._cp_schedule = cp_schedule
         self._cp_memory = {}
         self._cp_path = cp_path
-        self._cp_disk = cp_disk
+        self._cp_storage_tiers = cp_storage_tiers
+        self._cp_disk = {}
+        self._cp_nbytes = {}
+        self._cp_tier_nbytes = {}
+        self._cp_peak = {"tiers": {}, "storage": 0, "adjoint_cache": 0,
+                         "memory": 0}
 
         self._cp = CheckpointStorage(store_ics=False,
                                      store_data=False)
         assert len(self._blocks) == 0
         self._checkpoint()
 
+    def calibrate_checkpointing(self, forward, *M, disk_bandwidth=None,
+                                path="checkpoints~"):
+        """
+        Run a short calibration, measuring costs for use with the "auto"
+        checkpointing method. The forward is annotated using "memory"
+        checkpointing and an adjoint calculation is performed. The equation
+        manager is then reset, restoring the previous checkpointing
+        configuration. Returns a dictionary with keys
+
+        blocks          The number of blocks in the calibration.
+        forward_cost    The mean forward wall time per block, in seconds,
+                        including annotation.
+        adjoint_cost    The mean adjoint wall time per block, in seconds.
+        snapshot_size   The size, in bytes, of the forward restart data.
+        data_size       The mean size, in bytes, of the stored data per block.
+        disk_bandwidth  The disk bandwidth, in bytes per second.
+
+        Timings are maximums, and sizes are sums, over processes.
+
+        Arguments:
+
+        forward         A callable, accepting the controls as arguments, and
+                        returning a Functional or function defining a
+                        functional. Should run a small number of blocks of the
+                        forward, indicating the start of each new block using
+                        new_block.
+        M               The controls.
+        disk_bandwidth  (Optional) The disk bandwidth, in bytes per second. If
+                        not supplied then the bandwidth is measured by writing
+                        and reading a file of snapshot size in path.
+        path            (Optional) Directory used for the disk bandwidth
+                        measurement.
+        """
+
+        if len(self._block) > 0 or len(self._blocks) > 0:
+            raise RuntimeError("Cannot calibrate after equations have been "
+                               "recorded")
+
+        def max_time(t):
+            return max(self._comm.allgather(t))
+
+        def sum_size(size):
+            return sum(self._comm.allgather(size))
+
+        cp_method, cp_parameters = self._cp_method, self._cp_parameters
+        self.reset("memory", {"drop_references": False})
+        try:
+            self.start()
+            t0 = time.perf_counter()
+            J = forward(*M)
+            t1 = time.perf_counter()
+            self.stop()
+            blocks = len(self._blocks) + (1 if len(self._block) > 0 else 0)
+            if blocks == 0:
+                raise RuntimeError("No equations recorded")
+
+            cp_cp, _, cp_storage = self._cp.checkpoint_data(copy=False)
+            snapshot_size = sum_size(sum(function_nbytes(cp_storage[key])
+                                         for key in cp_cp))
+            data_size = sum_size(sum(map(function_nbytes,
+                                         cp_storage.values())))
+            data_size = max(data_size / blocks, 1.0)
+            if snapshot_size == 0:
+                snapshot_size = data_size
+
+            t2 = time.perf_counter()
+            self.compute_gradient(J, M)
+            t3 = time.perf_counter()
+        finally:
+            self.reset(cp_method, cp_parameters)
+
+        if disk_bandwidth is None:
+            self._comm.barrier()
+            if self._comm.rank == 0:
+                if not os.path.exists(path):
+                    os.makedirs(path)
+            self._comm.barrier()
+            filename = os.path.join(
+                path, f"calibration_{self._id:d}_{self._comm.rank:d}")
+            buffer = np.zeros(max(int(snapshot_size // self._comm.size), 1),
+                              dtype=np.uint8)
+            t4 = time.perf_counter()
+            with open(filename, "wb") as h:
+                h.write(buffer.tobytes())
+                h.flush()
+                os.fsync(h.fileno())
+            with open(filename, "rb") as h:
+                h.read()
+            t5 = time.perf_counter()
+            os.remove(filename)
+            disk_bandwidth = 2.0 * sum_size(buffer.nbytes) / max(max_time(t5 - t4), 1.0e-9)  # noqa: E501
+
+        return {"blocks": blocks,
+                "forward_cost": max_time(t1 - t0) / blocks,
+                "adjoint_cost": max_time(t3 - t2) / blocks,
+                "snapshot_size": snapshot_size,
+                "data_size": data_size,
+                "disk_bandwidth": disk_bandwidth}
+
     def configure_tlm(self, *args, annotate=None, tlm=True):
         """
         Configure the tangent-linear tree.
@@ -1129,8 +1740,29 @@ class EquationManager:
                 if eq_id not in self._eqs:
                     self._eqs[eq_id] = eq
                 self._block.append(eq)
-            self._cp.add_equation(
-                len(self._blocks), len(self._block) - 1, eq)
+            n, i = len(self._blocks), len(self._block) - 1
+            if self._tape_profile is not None \
+                    and len(self._block_passes) == 0 \
+                    and isinstance(self._cp_schedule,
+                                   MemoryCheckpointSchedule) \
+                    and self._tape_profile.is_inactive(n, i, eq):
+                self._cp.add_equation(n, i, eq, data=False)
+                self._tape_profile_skipped.add((n, i))
+            else:
+                self._cp.add_equation(n, i, eq)
+            del n, i
+            if len(self._block_passes) > 0:
+                self._block_eq_counts[eq_id] = \
+                    self._block_eq_counts.get(eq_id, 0) + 1
+                if self._alias_eqs:
+                    # Used by block passes to determine whether a function may
+                    # still be accessed
+                    for x in eq.X():
+                        try:
+                            self._block_X_refs[function_id(x)] = \
+                                weakref.ref(x)
+                        except TypeError:
+                            pass
 
         if tlm is None:
             tlm = self.tlm_enabled()
@@ -1207,6 +1839,235 @@ class EquationManager:
                 finalize.atexit = False
                 self._finalizes[referrer_id] = finalize
 
+    def add_block_pass(self, block_pass):
+        """
+        Add a tape optimization pass, applied to each block of equations when
+        the block ends.
+
+        Arguments:
+
+        block_pass  A callable of the form
+                        def block_pass(block, is_live):
+                    where block is a sequence of equations, and is_live is a
+                    callable accepting a function and returning whether the
+                    function may still be accessed other than via the
+                    recorded equations. Returns None if no changes are to be
+                    made, or otherwise a sequence of (eq, indices) pairs,
+                    defining the rewritten block. Here eq is an equation, and
+                    indices is an ordered sequence of the indices of the
+                    equations in the original block which it replaces. Each
+                    index must appear exactly once, and the pairs must be
+                    ordered by their last index. A rewritten equation is
+                    solved in place of the equation with its last index. It
+                    must solve for the last values computed by the equations
+                    it replaces, with the same values of its dependencies.
+                    Intermediate values computed by the replaced equations
+                    must not be needed by other equations.
+
+        is_live can only identify functions which are no longer accessible if
+        the equation manager does not itself hold references to recorded
+        equations, i.e. with "memory" checkpointing and drop_references True,
+        or with other checkpointing methods. Otherwise all functions are
+        considered live, and a warning is issued when is_live is called.
+        """
+
+        if not callable(block_pass):
+            raise TypeError("block_pass must be callable")
+        if len(self._block_passes) == 0:
+            # Record equation counts, used to determine when replaced
+            # equations may be removed
+            assert len(self._block_eq_counts) == 0
+            for block in itertools.chain(self._blocks, (self._block,)):
+                for eq in block:
+                    eq_id = eq.id()
+                    self._block_eq_counts[eq_id] = \
+                        self._block_eq_counts.get(eq_id, 0) + 1
+        self._block_passes.append(block_pass)
+
+    def set_tape_profile(self, profile):
+        """
+        Set a tape profile, used to avoid storing non-linear dependency data
+        for equations which were inactive in earlier adjoint calculations.
+        Only used with the "memory" checkpointing method, and if no block
+        passes have been added.
+
+        Arguments:
+
+        profile  A TapeProfile, or None to disable.
+        """
+
+        if profile is not None and not isinstance(profile, TapeProfile):
+            raise TypeError("profile must be a TapeProfile")
+        self._tape_profile = profile
+
+    def set_garbage_cleanup_policy(self, policy):
+        """
+        Set the policy controlling calls to garbage_cleanup.
+
+        Arguments:
+
+        policy  A GarbageCleanupPolicy.
+        """
+
+        if not isinstance(policy, GarbageCleanupPolicy):
+            raise TypeError("policy must be a GarbageCleanupPolicy")
+        self._garbage_cleanup = policy
+
+    def _restore_tape_profile_data(self, transpose_deps):
+        # Recompute non-linear dependency data which was not stored due to the
+        # tape profile, but which is needed in the adjoint calculation
+        missing = {(n, i) for n, i in self._tape_profile_skipped
+                   if transpose_deps.any_is_active(n, i)}
+        if len(missing) == 0:
+            return
+        logger = logging.getLogger("tlm_adjoint.checkpointing")
+        logger.debug(f"reverse: forward replay to restore non-linear "
+                     f"dependency data for {len(missing):d} equation(s)")
+
+        storage = ReplayStorage(self._blocks, 0, len(self._blocks),
+                                transpose_deps=_ActiveEquations(missing))
+        storage.update(self._cp.initial_conditions(cp=True, refs=False,
+                                                   copy=False),
+                       copy=True)
+        storage.update(self._cp.initial_conditions(cp=False, refs=True,
+                                                   copy=False),
+                       copy=False)
+
+        store_ics, store_data = self._cp.store_ics(), self._cp.store_data()
+        self._cp.configure(store_ics=False, store_data=True)
+        self._cp.clear_keys()
+        try:
+            for n, block in enumerate(self._blocks):
+                for i, eq in enumerate(block):
+                    if storage.is_active(n, i):
+                        X = tuple(storage[eq_x] for eq_x in eq.X())
+                        deps = tuple(storage[eq_dep]
+                                     for eq_dep in eq.dependencies())
+                        eq.forward(X, deps=deps)
+                    if (n, i) in missing:
+                        nl_deps = tuple(storage[eq_dep]
+                                        for eq_dep in eq.nonlinear_dependencies())  # noqa: E501
+                        self._cp.add_equation_data(
+                            n, i, eq, nl_deps=nl_deps)
+                        self._tape_profile_skipped.remove((n, i))
+                    else:
+                        self._cp.update_keys(n, i, eq)
+
+                    storage_state = storage.pop()
+                    assert storage_state == (n, i)
+                self._garbage_cleanup(self._comm)
+            assert len(storage) == 0
+        finally:
+            self._cp.configure(store_ics=store_ics, store_data=store_data)
+
+    def _apply_block_passes(self):
+        if len(self._block_passes) == 0:
+            return
+        n = len(self._blocks) - 1
+
+        if self._alias_eqs:
+            def is_live(x):
+                x_ref = self._block_X_refs.get(function_id(x), None)
+                return x_ref is None or x_ref() is not None
+        else:
+            def is_live(x):
+                # Recorded equations hold references to their solutions
+                if not self._block_live_warning:
+                    warnings.warn("Equation manager holds references to "
+                                  "recorded equations, and so all functions "
+                                  "are considered live. Use drop_references "
+                                  "to allow block passes to eliminate "
+                                  "equations.", stacklevel=2)
+                    self._block_live_warning = True
+                return True
+
+        for block_pass in self._block_passes:
+            block = self._blocks[n]
+            eqs = block_pass(block, is_live)
+            if eqs is not None:
+                self._rewrite_block(n, eqs)
+        self._block_X_refs.clear()
+
+    @gc_disabled
+    def _rewrite_block(self, n, eqs):
+        block = self._blocks[n]
+        eqs = tuple((eq, tuple(indices)) for eq, indices in eqs)
+        if sorted(i for _, indices in eqs for i in indices) \
+                != list(range(len(block))):
+            raise RuntimeError("Invalid block pass")
+        for _, indices in eqs:
+            if len(indices) == 0 or list(indices) != sorted(indices):
+                raise RuntimeError("Invalid block pass")
+        if [indices[-1] for _, indices in eqs] \
+                != sorted(indices[-1] for _, indices in eqs):
+            raise RuntimeError("Invalid block pass")
+
+        def is_tlm_eq(eq):
+            return (hasattr(eq, "_tlm_adjoint__tlm_key")
+                    or len(self._tlm_eqs.get(eq.id(), {})) > 0)
+
+        new_block = []
+        labels = {}
+        data = {}
+
+        def add_equation(eq, indices):
+            i_new = len(new_block)
+            last_X = {}
+            for i in indices:
+                for m, x in enumerate(block[i].X()):
+                    x_id = function_id(x)
+                    labels[(i, m)] = (x_id, None)
+                    last_X[x_id] = (i, m)
+            for m_new, x in enumerate(eq.X()):
+                x_id = function_id(x)
+                if x_id not in last_X:
+                    raise RuntimeError("Invalid block pass")
+                labels[last_X[x_id]] = (x_id, (i_new, m_new))
+            data[i_new] = (
+                tuple(map(function_id, eq.nonlinear_dependencies())),
+                tuple((i, tuple(map(function_id,
+                                    block[i].nonlinear_dependencies())))
+                      for i in indices))
+            new_block.append(eq)
+
+        changed = False
+        for eq, indices in eqs:
+            if len(indices) == 1 and eq is block[indices[0]]:
+                add_equation(eq, indices)
+            elif any(is_tlm_eq(block[i]) for i in indices):
+                # Tangent-linear equations, and equations with
+                # tangent-linear equations, are not rewritten
+                for i in indices:
+                    add_equation(block[i], (i,))
+            else:
+                changed = True
+                if self._alias_eqs:
+                    self._add_equation_finalizes(eq)
+                    eq_alias = WeakAlias(eq)
+                    self._eqs.setdefault(eq.id(), eq_alias)
+                    add_equation(eq_alias, indices)
+                else:
+                    self._eqs.setdefault(eq.id(), eq)
+                    add_equation(eq, indices)
+                self._block_eq_counts[eq.id()] = \
+                    self._block_eq_counts.get(eq.id(), 0) + 1
+
+        if changed:
+            self._cp.rewrite_block(n, labels, data)
+            self._blocks[n] = new_block
+
+            new_ids = {eq.id() for eq in new_block}
+            for eq in block:
+                eq_id = eq.id()
+                if eq_id not in new_ids:
+                    count = self._block_eq_counts[eq_id] - 1
+                    if count == 0:
+                        # Replaced equation not recorded elsewhere
+                        del self._block_eq_counts[eq_id]
+                        del self._eqs[eq_id]
+                    else:
+                        self._block_eq_counts[eq_id] = count
+
     @gc_disabled
     def drop_references(self):
         while len(self._to_drop_references) > 0:
@@ -1218,18 +2079,19 @@ class EquationManager:
                     del self._tlm_eqs[referrer_id]
 
     def _write_memory_checkpoint(self, n, *, ics=True, data=True):
-        if n in self._cp_memory or \
-                (self._cp_disk is not None and n in self._cp_disk):
+        if self._has_checkpoint(n):
             raise RuntimeError("Duplicate checkpoint")
 
         self._cp_memory[n] = self._cp.checkpoint_data(
             ics=ics, data=data, copy=True)
+        self._add_snapshot_nbytes(n, "RAM", self._cp_memory[n][2].values())
 
     def _read_memory_checkpoint(self, n, *, ic_ids=None, ics=True, data=True,
                                 delete=False):
         read_cp, read_data, read_storage = self._cp_memory[n]
         if delete:
             del self._cp_memory[n]
+            self._remove_snapshot_nbytes(n, "RAM")
 
         if ics or data:
             if ics:
@@ -1249,28 +2111,175 @@ class EquationManager:
             self._cp.update(read_cp, read_data, read_storage,
                             copy=not delete)
 
-    def _write_disk_checkpoint(self, n, *, ics=True, data=True):
-        if n in self._cp_memory or n in self._cp_disk:
+    def _has_checkpoint(self, n):
+        return (n in self._cp_memory
+                or any(n in cp_disk for cp_disk in self._cp_disk.values()))
+
+    def _disk_checkpoints(self, storage):
+        if storage not in self._cp_disk:
+            if storage not in self._cp_storage_tiers:
+                raise ValueError(f"Unrecognized checkpointing storage: "
+                                 f"{storage:s}")
+            cp_path, cp_format = self._cp_storage_tiers[storage]
+
+            self._comm.barrier()
+            if self._comm.rank == 0:
+                if not os.path.exists(cp_path):
+                    os.makedirs(cp_path)
+            self._comm.barrier()
+
+            if storage == "disk":
+                cp_prefix = f"checkpoint_{self._id:d}_"
+            else:
+                cp_prefix = f"checkpoint_{storage:s}_{self._id:d}_"
+            if cp_format == "pickle":
+                cp_disk = PickleCheckpoints(
+                    os.path.join(cp_path, cp_prefix), comm=self._comm)
+            elif cp_format == "hdf5":
+                cp_disk = HDF5Checkpoints(
+                    os.path.join(cp_path, cp_prefix), comm=self._comm)
+            else:
+                raise ValueError(f"Unrecognized checkpointing format: "
+                                 f"{cp_format:s}")
+            self._cp_disk[storage] = cp_disk
+        return self._cp_disk[storage]
+
+    def _write_disk_checkpoint(self, n, storage="disk", *, ics=True,
+                               data=True):
+        if self._has_checkpoint(n):
             raise RuntimeError("Duplicate checkpoint")
 
-        self._cp_disk.write(
-            n, *self._cp.checkpoint_data(ics=ics, data=data, copy=False))
+        cp_cp, cp_data, cp_storage = self._cp.checkpoint_data(
+            ics=ics, data=data, copy=False)
+        self._disk_checkpoints(storage).write(n, cp_cp, cp_data, cp_storage)
+        self._add_snapshot_nbytes(n, storage, cp_storage.values())
 
-    def _read_disk_checkpoint(self, n, *, ic_ids=None, ics=True, data=True,
-                              delete=False):
+    def _read_disk_checkpoint(self, n, storage="disk", *, ic_ids=None,
+                              ics=True, data=True, delete=False):
+        cp_disk = self._disk_checkpoints(storage)
         if ics or data:
             read_cp, read_data, read_storage = \
-                self._cp_disk.read(n, ics=ics, data=data, ic_ids=ic_ids)
+                cp_disk.read(n, ics=ics, data=data, ic_ids=ic_ids)
 
             self._cp.update(read_cp, read_data, read_storage,
                             copy=False)
 
         if delete:
-            self._cp_disk.delete(n)
+            cp_disk.delete(n)
+            self._remove_snapshot_nbytes(n, storage)
+
+    def _delete_checkpoint(self, n, storage):
+        if storage == "RAM":
+            del self._cp_memory[n]
+        else:
+            self._disk_checkpoints(storage).delete(n)
+        self._remove_snapshot_nbytes(n, storage)
+
+    def _add_snapshot_nbytes(self, n, storage, X):
+        n_nbytes = nbytes_by_space(X)
+        self._cp_nbytes.setdefault(storage, {})[n] = n_nbytes
+        self._cp_tier_nbytes[storage] = \
+            self._cp_tier_nbytes.get(storage, 0) + sum(n_nbytes.values())
+
+    def _remove_snapshot_nbytes(self, n, storage):
+        n_nbytes = self._cp_nbytes[storage].pop(n)
+        self._cp_tier_nbytes[storage] -= sum(n_nbytes.values())
+
+    def memory_usage(self):
+        """
+        Return a dictionary describing the size of the data held by the
+        equation manager on this process, containing the keys
+
+        snapshots      A dictionary with storage keys, "RAM" and any disk
+                       tiers. Each value is a dictionary mapping snapshot
+                       locations to a dictionary mapping function space IDs
+                       to sizes in bytes.
+        tiers          A dictionary with storage keys. Each value is a
+                       dictionary mapping function space IDs to the total
+                       size in bytes of all snapshots in the storage.
+        storage        A dictionary mapping function space IDs to the size
+                       in bytes of forward restart and non-linear dependency
+                       data held outside of snapshots. Values stored by
+                       reference are not included.
+        adjoint_cache  A dictionary mapping function space IDs to the size in
+                       bytes of cached adjoint solutions.
+        memory         The total size in bytes of the data held in memory,
+                       i.e. of snapshots in RAM, of the storage, and of the
+                       adjoint cache.
+        peak           A dictionary containing the peak values of the totals
+                       since the checkpointing configuration was last set,
+                       with keys "tiers", a dictionary with storage keys,
+                       "storage", "adjoint_cache", and "memory". Peak values
+                       are sampled on entry to each new block, after each
+                       checkpointing step, and after each adjoint block.
+
+        Disk snapshot sizes are the sizes of the stored function data, and
+        exclude file format overheads.
+        """
+
+        snapshots = {"RAM": {}}
+        for storage in self._cp_storage_tiers:
+            snapshots[storage] = {}
+        for storage, cp_nbytes in self._cp_nbytes.items():
+            snapshots[storage] = {n: dict(cp_nbytes[n])
+                                  for n in sorted(cp_nbytes)}
+
+        tiers = {}
+        for storage, cp_nbytes in snapshots.items():
+            tiers[storage] = {}
+            for n_nbytes in cp_nbytes.values():
+                for x_space_id, nbytes in n_nbytes.items():
+                    tiers[storage][x_space_id] = \
+                        tiers[storage].get(x_space_id, 0) + nbytes
+
+        memory = self._update_memory_usage(log=False)
+        peak = self._cp_peak
+
+        return {"snapshots": snapshots,
+                "tiers": tiers,
+                "storage": self._cp.nbytes(),
+                "adjoint_cache": self._adj_cache.nbytes(),
+                "memory": memory,
+                "peak": {"tiers": {storage: peak["tiers"].get(storage, 0)
+                                   for storage in tiers},
+                         "storage": peak["storage"],
+                         "adjoint_cache": peak["adjoint_cache"],
+                         "memory": peak["memory"]}}
+
+    def _update_memory_usage(self, *, log=True):
+        # Update peak values using running totals, at a cost independent of
+        # the amount of data stored
+        storage_nbytes = self._cp.total_nbytes()
+        adj_cache_nbytes = self._adj_cache.total_nbytes()
+        memory = (self._cp_tier_nbytes.get("RAM", 0)
+                  + storage_nbytes + adj_cache_nbytes)
+
+        peak = self._cp_peak
+        for storage, tier_nbytes in self._cp_tier_nbytes.items():
+            peak["tiers"][storage] = max(peak["tiers"].get(storage, 0),
+                                         tier_nbytes)
+        peak["storage"] = max(peak["storage"], storage_nbytes)
+        peak["adjoint_cache"] = max(peak["adjoint_cache"], adj_cache_nbytes)
+        peak["memory"] = max(peak["memory"], memory)
+
+        if log:
+            logger = logging.getLogger("tlm_adjoint.checkpointing")
+            if logger.isEnabledFor(logging.DEBUG):
+                tiers = ", ".join(
+                    f"{storage:s} {tier_nbytes:d}"
+                    for storage, tier_nbytes in self._cp_tier_nbytes.items())
+                logger.debug(f"memory: snapshots {tiers:s}, "
+                             f"storage {storage_nbytes:d}, "
+                             f"adjoint cache {adj_cache_nbytes:d}, "
+                             f"memory {memory:d}, "
+                             f"peak memory {peak['memory']:d} bytes")
+
+        return memory
 
     def _checkpoint(self, final=False):
         assert len(self._block) == 0
         n = len(self._blocks)
+        self._update_memory_usage()
         if final:
             self._cp_schedule.finalize(n)
         if n < self._cp_schedule.n():
@@ -1304,17 +2313,20 @@ class EquationManager:
         def action_write(cp_action):
             if cp_action.n >= n:
                 raise RuntimeError("Invalid checkpointing state")
-            if cp_action.storage == "disk":
-                logger.debug(f"forward: save snapshot at {cp_action.n:d} "
-                             f"on disk")
-                self._write_disk_checkpoint(cp_action.n)
-            elif cp_action.storage == "RAM":
+            if cp_action.storage == "RAM":
                 logger.debug(f"forward: save snapshot at {cp_action.n:d} "
                              f"in RAM")
                 self._write_memory_checkpoint(cp_action.n)
             else:
-                raise ValueError(f"Unrecognized checkpointing storage: "
-                                 f"{cp_action.storage:s}")
+                logger.debug(f"forward: save snapshot at {cp_action.n:d} "
+                             f"on {cp_action.storage:s}")
+                self._write_disk_checkpoint(cp_action.n, cp_action.storage)
+
+        @action.register(Delete)
+        def action_delete(cp_action):
+            logger.debug(f"forward: delete snapshot at {cp_action.n:d} from "
+                         f"{cp_action.storage:s}")
+            self._delete_checkpoint(cp_action.n, cp_action.storage)
 
         @action.register(EndForward)
         def action_end_forward(cp_action):
@@ -1334,6 +2346,8 @@ class EquationManager:
                 pass
         del action
 
+        self._update_memory_usage()
+
     def _restore_checkpoint(self, n, transpose_deps=None):
         if self._cp_schedule.max_n() is None:
             raise RuntimeError("Invalid checkpointing state")
@@ -1413,7 +2427,7 @@ class EquationManager:
 
                     storage_state = storage.pop()
                     assert storage_state == (n1, i)
-                garbage_cleanup(self._comm)
+                self._garbage_cleanup(self._comm)
             cp_n = cp_action.n1
             if cp_n == n + 1:
                 assert len(storage) == 0
@@ -1438,40 +2452,45 @@ class EquationManager:
                          f'{cp_action.storage:s} and '
                          f'{"delete" if cp_action.delete else "keep":s}')
 
-            storage = ReplayStorage(self._blocks, cp_n, n + 1,
-                                    transpose_deps=transpose_deps)
-            garbage_cleanup(self._comm)
+            if transpose_deps is None:
+                storage = ReplayStorage(self._blocks, cp_n, n + 1)
+            else:
+                storage = ReplayStorage(
+                    self._blocks, cp_n, n + 1,
+                    replay_data=transpose_deps.replay_data())
+            self._garbage_cleanup(self._comm)
             initialize_storage_cp = True
             storage.update(self._cp.initial_conditions(cp=False,
                                                        refs=True,
                                                        copy=False),
                            copy=False)
 
-            if cp_action.storage == "disk":
-                self._read_disk_checkpoint(cp_n, ic_ids=set(storage),
-                                           delete=cp_action.delete)
-            elif cp_action.storage == "RAM":
+            if cp_action.storage == "RAM":
                 self._read_memory_checkpoint(cp_n, ic_ids=set(storage),
                                              delete=cp_action.delete)
             else:
-                raise ValueError(f"Unrecognized checkpointing storage: "
-                                 f"{cp_action.storage:s}")
+                self._read_disk_checkpoint(cp_n, cp_action.storage,
+                                           ic_ids=set(storage),
+                                           delete=cp_action.delete)
 
         @action.register(Write)
         def action_write(cp_action):
             if cp_action.n >= n:
                 raise RuntimeError("Invalid checkpointing state")
-            if cp_action.storage == "disk":
-                logger.debug(f"reverse: save snapshot at {cp_action.n:d} "
-                             f"on disk")
-                self._write_disk_checkpoint(cp_action.n)
-            elif cp_action.storage == "RAM":
+            if cp_action.storage == "RAM":
                 logger.debug(f"reverse: save snapshot at {cp_action.n:d} "
                              f"in RAM")
                 self._write_memory_checkpoint(cp_action.n)
             else:
-                raise ValueError(f"Unrecognized checkpointing storage: "
-                                 f"{cp_action.storage:s}")
+                logger.debug(f"reverse: save snapshot at {cp_action.n:d} "
+                             f"on {cp_action.storage:s}")
+                self._write_disk_checkpoint(cp_action.n, cp_action.storage)
+
+        @action.register(Delete)
+        def action_delete(cp_action):
+            logger.debug(f"reverse: delete snapshot at {cp_action.n:d} from "
+                         f"{cp_action.storage:s}")
+            self._delete_checkpoint(cp_action.n, cp_action.storage)
 
         while True:
             cp_action = next(self._cp_schedule)
@@ -1485,13 +2504,15 @@ class EquationManager:
                 pass
         del action
 
+        self._update_memory_usage()
+
     def new_block(self):
         """
         End the current block equation and begin a new block.
         """
 
         self.drop_references()
-        garbage_cleanup(self._comm)
+        self._garbage_cleanup(self._comm)
 
         if self._annotation_state in [AnnotationState.STOPPED,
                                       AnnotationState.FINAL]:
@@ -1507,6 +2528,7 @@ class EquationManager:
 
         self._blocks.append(self._block)
         self._block = []
+        self._apply_block_passes()
         self._checkpoint(final=False)
 
     def finalize(self):
@@ -1515,7 +2537,7 @@ class EquationManager:
         """
 
         self.drop_references()
-        garbage_cleanup(self._comm)
+        self._garbage_cleanup(self._comm)
 
         if self._annotation_state == AnnotationState.FINAL:
             return
@@ -1525,6 +2547,7 @@ class EquationManager:
 
         self._blocks.append(self._block)
         self._block = []
+        self._apply_block_passes()
         if self._cp_schedule.max_n() is not None \
                 and len(self._blocks) < self._cp_schedule.max_n():
             warnings.warn(
@@ -1632,8 +2655,12 @@ class EquationManager:
         blocks[blocks_N] = [FunctionalMarker(J) for J in Js]
         J_markers = tuple(eq.x() for eq in blocks[blocks_N])
 
+        # Work functions for adjoint right-hand-sides and adjoint initial
+        # conditions, reused within this call
+        pool = AdjointBufferPool()
+
         # Adjoint equation right-hand-sides
-        Bs = tuple(AdjointModelRHS(blocks) for J in Js)
+        Bs = tuple(AdjointModelRHS(blocks, pool=pool) for J in Js)
         # Adjoint initial condition
         for J_i in range(len(Js)):
             function_assign(Bs[J_i][blocks_N][J_i].b(), 1.0)
@@ -1643,6 +2670,12 @@ class EquationManager:
             J_markers, M, blocks,
             prune_forward=prune_forward, prune_adjoint=prune_adjoint)
 
+        # Tape profile
+        self._restore_tape_profile_data(transpose_deps)
+        if self._tape_profile is not None \
+                and isinstance(self._cp_schedule, MemoryCheckpointSchedule):
+            self._tape_profile.update(self._blocks, transpose_deps)
+
         # Initialize the adjoint cache
         self._adj_cache.initialize(J_markers, blocks, transpose_deps,
                                    cache_degree=cache_adjoint_degree)
@@ -1655,7 +2688,7 @@ class EquationManager:
                     if not isinstance(x_id, int):
                         x_id = function_id(x_id)
                     if transpose_deps.has_adj_ic(J_i, x_id):
-                        adj_Xs[J_i][x_id] = function_copy(adj_x)
+                        adj_Xs[J_i][x_id] = pool.copy(adj_x)
 
         # Reverse (blocks)
         for n in range(blocks_N, -2, -1):
@@ -1692,6 +2725,7 @@ class EquationManager:
                         for adj_x_ic in adj_X_ic:
                             assert adj_x_ic is None
 
+                    adj_X_0 = None
                     if transpose_deps.is_solved(J_i, n, i):
                         assert (J_i, n, i) not in self._adj_cache
 
@@ -1702,7 +2736,9 @@ class EquationManager:
                             adj_X = []
                             for m, adj_x_ic in enumerate(adj_X_ic):
                                 if adj_x_ic is None:
-                                    adj_X.append(eq.new_adj_X(m))
+                                    adj_X.append(pool.new(
+                                        eq.X(m),
+                                        rel_space_type=eq.adj_X_type(m)))
                                 else:
                                     adj_X.append(adj_x_ic)
 
@@ -1711,6 +2747,7 @@ class EquationManager:
 
                         # Solve adjoint equation, add terms to adjoint
                         # equations
+                        adj_X_0 = adj_X
                         adj_X = eq.adjoint(
                             J, adj_X, nl_deps,
                             eq_B.B(),
@@ -1744,11 +2781,12 @@ class EquationManager:
                         assert len(eq_X) == len(adj_X)
                         for m, (x, adj_x) in enumerate(zip(eq_X, adj_X)):
                             if transpose_deps.is_stored_adj_ic(J_i, n, i, m):
-                                adj_Xs[J_i][function_id(x)] = function_copy(adj_x)  # noqa: E501
+                                adj_Xs[J_i][function_id(x)] = pool.copy(adj_x)  # noqa: E501
 
                         # Store adjoint solution in the cache
                         self._adj_cache.cache(J_i, n, i, adj_X,
-                                              copy=True, store=store_adjoint)
+                                              copy=True, store=store_adjoint,
+                                              pool=pool)
 
                     if callback is not None:
                         # Diagnostic callback
@@ -1775,7 +2813,16 @@ class EquationManager:
                         # Finalize right-hand-sides in the control block
                         Bs[J_i][-1].finalize()
 
-            garbage_cleanup(self._comm)
+                    # Return work functions to the pool. The adjoint solution
+                    # may be a right-hand-side or initial guess function, and
+                    # has been copied where it is retained.
+                    eq_B.release()
+                    if adj_X_0 is not None:
+                        pool.release(*adj_X_0)
+                    del eq_B, adj_X_ic, adj_X, adj_X_0
+
+            self._update_memory_usage()
+            self._garbage_cleanup(self._comm)
 
         for B in Bs:
             assert B.is_empty()
@@ -1813,7 +2860,7 @@ class EquationManager:
                 pass
         del action
 
-        garbage_cleanup(self._comm)
+        self._garbage_cleanup(self._comm, force=True)
         return tuple(dJ)
 
 
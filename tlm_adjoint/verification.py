@@ -18,8 +18,8 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with tlm_adjoint.  If not, see <https://www.gnu.org/licenses/>.
 
-from .interface import function_assign, function_axpy, function_copy, \
-    function_dtype, function_inner, function_is_cached, \
+from .interface import function_assign, function_axpy, function_comm, \
+    function_copy, function_dtype, function_inner, function_is_cached, \
     function_is_checkpointed, function_is_static, function_linf_norm, \
     function_local_size, function_name, function_new, function_set_values, \
     garbage_cleanup, is_function, space_comm
@@ -33,13 +33,17 @@ from .manager import configure_tlm, paused_manager, reset_manager, \
 from collections.abc import Sequence
 import functools
 import logging
+import numbers
 import numpy as np
+import sys
 
 __all__ = \
     [
         "taylor_test",
+        "taylor_test_all",
         "taylor_test_tlm",
-        "taylor_test_tlm_adjoint"
+        "taylor_test_tlm_adjoint",
+        "taylor_test_tlm_adjoint_orders"
     ]
 
 
@@ -55,10 +59,143 @@ def wrapped_forward(forward):
     return wrapped_forward
 
 
+def functions_inner(X, Y):
+    inner = 0.0
+    assert len(X) == len(Y)
+    for x, y in zip(X, Y):
+        inner += function_inner(x, y)
+    return inner
+
+
+def functions_linf_norm(X):
+    norm = 0.0
+    for x in X:
+        norm = max(norm, function_linf_norm(x))
+    return norm
+
+
+def control_copy(M):
+    return tuple(function_copy(m, name=function_name(m),
+                               static=function_is_static(m),
+                               cache=function_is_cached(m),
+                               checkpoint=function_is_checkpointed(m))
+                 for m in M)
+
+
+def control_new(M):
+    return tuple(function_new(m, static=function_is_static(m),
+                              cache=function_is_cached(m),
+                              checkpoint=function_is_checkpointed(m))
+                 for m in M)
+
+
+def perturbation_scales(M0, seed, size):
+    # This combination seems to reproduce dolfin-adjoint behaviour
+    eps = np.array([2 ** -p for p in range(size)], dtype=np.float64)
+    return seed * eps * max(1.0, functions_linf_norm(M0))
+
+
+def random_direction(M):
+    dM = tuple(function_new(m, static=True) for m in M)
+    for dm in dM:
+        dm_arr = np.random.random(function_local_size(dm))
+        if issubclass(function_dtype(dm), (complex, np.complexfloating)):
+            dm_arr = dm_arr + 1.0j * np.random.random(function_local_size(dm))
+        function_set_values(dm, dm_arr)
+        del dm_arr
+    return dM
+
+
+_J_value = None
+
+
+def _J_value_pool(i):
+    return np.array(_J_value(i), dtype=np.complex128)
+
+
+def _mpi_initialized():
+    MPI = sys.modules.get("mpi4py.MPI", None)
+    if MPI is not None and MPI.Is_initialized():
+        return True
+    PETSc = sys.modules.get("petsc4py.PETSc", None)
+    if PETSc is not None and PETSc.Sys.isInitialized():
+        return True
+    return False
+
+
+def perturbed_J_values(J_value, size, *, processes=None, comm=None):
+    """
+    Evaluate perturbed functional values J_value(i) for 0 <= i < size,
+    optionally concurrently. J_value may return a scalar or a sequence of
+    scalars.
+
+    If processes is an integer then the values are evaluated in a pool of this
+    many processes, started using the 'fork' method, and so J_value need not be
+    picklable. Forking a process after MPI has been initialized is unsafe, and
+    so this is supported only if MPI has not been initialized.
+
+    Otherwise processes is an MPI communicator, which is partitioned into
+    groups, one for each distinct model communicator comm, and the values are
+    distributed between the groups. Each rank of processes must participate,
+    and J_value must compute the same values on each group -- in particular any
+    perturbation directions must be identical on each group.
+    """
+
+    if processes is None:
+        J_vals = np.array([J_value(i) for i in range(size)],
+                          dtype=np.complex128)
+    elif isinstance(processes, numbers.Integral):
+        if comm is not None and comm.size > 1:
+            raise RuntimeError("Concurrent evaluation using a process pool "
+                               "requires a serial calculation")
+        if _mpi_initialized():
+            raise RuntimeError("Concurrent evaluation using a process pool "
+                               "is not supported when MPI has been "
+                               "initialized -- supply an MPI communicator "
+                               "instead")
+
+        global _J_value
+        if _J_value is not None:
+            raise RuntimeError("Concurrent evaluation already in progress")
+        import multiprocessing
+        _J_value = J_value
+        try:
+            with multiprocessing.get_context("fork").Pool(
+                    processes=processes) as pool:
+                J_vals = np.array(pool.map(_J_value_pool, range(size)),
+                                  dtype=np.complex128)
+        finally:
+            _J_value = None
+    else:
+        if comm is None:
+            raise TypeError("Model communicator required")
+        pool_comm = processes
+
+        # Identify each group by the rank, on the pool communicator, of rank 0
+        # on the model communicator
+        root = comm.bcast(pool_comm.rank, root=0)
+        roots = sorted(set(pool_comm.allgather(root)))
+        n_groups, group = len(roots), roots.index(root)
+
+        J_vals = {i: np.array(J_value(i), dtype=np.complex128)
+                  for i in range(group, size, n_groups)}
+        J_vals_global = {}
+        for J_vals_p in pool_comm.allgather(J_vals if comm.rank == 0 else {}):
+            J_vals_global.update(J_vals_p)
+        if sorted(J_vals_global.keys()) != list(range(size)):
+            raise RuntimeError("Invalid communicator")
+        J_vals = np.array([J_vals_global[i] for i in range(size)],
+                          dtype=np.complex128)
+
+    if abs(J_vals.imag).max() == 0.0:
+        J_vals = J_vals.real
+    return J_vals
+
+
 @local_caches
 @restore_manager
 def taylor_test(forward, M, J_val, dJ=None, ddJ=None, seed=1.0e-2, dM=None,
-                M0=None, size=5, manager=None):
+                M0=None, size=5, manager=None, *, processes=None):
     # Aims for similar behaviour to the dolfin-adjoint taylor_test function in
     # dolfin-adjoint 2017.1.0. Arguments based on dolfin-adjoint taylor_test
     # arguments
@@ -93,6 +230,12 @@ def taylor_test(forward, M, J_val, dJ=None, ddJ=None, seed=1.0e-2, dM=None,
     M0       (Optional) The reference value of the control.
     size     (Optional) The number of perturbed forward runs used in the test.
     manager  (Optional) The equation manager.
+    processes  (Optional) If supplied then the perturbed forward runs are
+             performed concurrently. Either an integer, in which case a pool of
+             this many processes is used, supported only in serial and if MPI
+             has not been initialized, or an MPI communicator, in which case
+             the runs are distributed between groups of processes, one group
+             for each copy of the model. See perturbed_J_values.
     """
 
     if not isinstance(M, Sequence):
@@ -103,7 +246,8 @@ def taylor_test(forward, M, J_val, dJ=None, ddJ=None, seed=1.0e-2, dM=None,
         if M0 is not None:
             M0 = (M0,)
         return taylor_test(forward, (M,), J_val, dJ=dJ, ddJ=ddJ, seed=seed,
-                           dM=dM, M0=M0, size=size, manager=manager)
+                           dM=dM, M0=M0, size=size, manager=manager,
+                           processes=processes)
 
     logger = logging.getLogger("tlm_adjoint.verification")
     forward = wrapped_forward(forward)
@@ -112,40 +256,13 @@ def taylor_test(forward, M, J_val, dJ=None, ddJ=None, seed=1.0e-2, dM=None,
 
     if M0 is None:
         M0 = tuple(map(function_copy, M))
-    M1 = tuple(function_new(m, static=function_is_static(m),
-                            cache=function_is_cached(m),
-                            checkpoint=function_is_checkpointed(m))
-               for m in M)
-
-    def functions_inner(X, Y):
-        inner = 0.0
-        assert len(X) == len(Y)
-        for x, y in zip(X, Y):
-            inner += function_inner(x, y)
-        return inner
-
-    def functions_linf_norm(X):
-        norm = 0.0
-        for x in X:
-            norm = max(norm, function_linf_norm(x))
-        return norm
+    M1 = control_new(M)
 
-    # This combination seems to reproduce dolfin-adjoint behaviour
-    eps = np.array([2 ** -p for p in range(size)], dtype=np.float64)
-    eps = seed * eps * max(1.0, functions_linf_norm(M0))
+    eps = perturbation_scales(M0, seed, size)
     if dM is None:
-        dM = tuple(function_new(m1, static=True) for m1 in M1)
-        for dm in dM:
-            dm_arr = np.random.random(function_local_size(dm))
-            if issubclass(function_dtype(dm),
-                          (complex, np.complexfloating)):
-                dm_arr = dm_arr \
-                    + 1.0j * np.random.random(function_local_size(dm))
-            function_set_values(dm, dm_arr)
-            del dm_arr
-
-    J_vals = np.full(eps.shape, np.NAN, dtype=np.complex128)
-    for i in range(eps.shape[0]):
+        dM = random_direction(M1)
+
+    def J_value(i):
         assert len(M0) == len(M1)
         assert len(M0) == len(dM)
         for m0, m1, dm in zip(M0, M1, dM):
@@ -153,9 +270,10 @@ def taylor_test(forward, M, J_val, dJ=None, ddJ=None, seed=1.0e-2, dM=None,
             function_axpy(m1, eps[i], dm)
         clear_caches()
         with paused_manager():
-            J_vals[i] = forward(*M1).value()
-    if abs(J_vals.imag).max() == 0.0:
-        J_vals = J_vals.real
+            return forward(*M1).value()
+
+    J_vals = perturbed_J_values(J_value, eps.shape[0], processes=processes,
+                                comm=function_comm(M1[0]))
 
     error_norms_0 = abs(J_vals - J_val)
     orders_0 = np.log(error_norms_0[1:] / error_norms_0[:-1]) / np.log(0.5)
@@ -186,12 +304,13 @@ def taylor_test(forward, M, J_val, dJ=None, ddJ=None, seed=1.0e-2, dM=None,
 
 @local_caches
 def taylor_test_tlm(forward, M, tlm_order, seed=1.0e-2, dMs=None, size=5,
-                    manager=None):
+                    manager=None, *, processes=None):
     if not isinstance(M, Sequence):
         if dMs is not None:
             dMs = tuple((dM,) for dM in dMs)
         return taylor_test_tlm(forward, (M,), tlm_order, seed=seed, dMs=dMs,
-                               size=size, manager=manager)
+                               size=size, manager=manager,
+                               processes=processes)
 
     logger = logging.getLogger("tlm_adjoint.verification")
     forward = wrapped_forward(forward)
@@ -200,35 +319,12 @@ def taylor_test_tlm(forward, M, tlm_order, seed=1.0e-2, dMs=None, size=5,
     tlm_manager = manager.new("memory", {})
     tlm_manager.stop()
 
-    M = tuple(function_copy(m, name=function_name(m),
-                            static=function_is_static(m),
-                            cache=function_is_cached(m),
-                            checkpoint=function_is_checkpointed(m)) for m in M)
-    M1 = tuple(function_new(m, static=function_is_static(m),
-                            cache=function_is_cached(m),
-                            checkpoint=function_is_checkpointed(m))
-               for m in M)
-
-    def functions_linf_norm(X):
-        norm = 0.0
-        for x in X:
-            norm = max(norm, function_linf_norm(x))
-        return norm
+    M = control_copy(M)
+    M1 = control_new(M)
 
-    eps = np.array([2 ** -p for p in range(size)], dtype=np.float64)
-    eps = seed * eps * max(1.0, functions_linf_norm(M))
+    eps = perturbation_scales(M, seed, size)
     if dMs is None:
-        dMs = tuple(tuple(function_new(m, static=True) for m in M)
-                    for i in range(tlm_order))
-        for dM in dMs:
-            for dm in dM:
-                dm_arr = np.random.random(function_local_size(dm))
-                if issubclass(function_dtype(dm),
-                              (complex, np.complexfloating)):
-                    dm_arr = dm_arr \
-                        + 1.0j * np.random.random(function_local_size(dm))
-                function_set_values(dm, dm_arr)
-                del dm_arr
+        dMs = tuple(random_direction(M) for i in range(tlm_order))
 
     @restore_manager
     def forward_tlm(dMs, *M):
@@ -248,16 +344,16 @@ def taylor_test_tlm(forward, M, tlm_order, seed=1.0e-2, dMs=None, size=5,
     J_val = forward_tlm(dMs[:-1], *M).value()
     dJ = forward_tlm(dMs, *M).value()
 
-    J_vals = np.full(eps.shape, np.NAN, dtype=np.complex128)
-    for i in range(eps.shape[0]):
+    def J_value(i):
         assert len(M) == len(M1)
         assert len(M) == len(dMs[-1])
         for m0, m1, dm in zip(M, M1, dMs[-1]):
             function_assign(m1, m0)
             function_axpy(m1, eps[i], dm)
-        J_vals[i] = forward_tlm(dMs[:-1], *M1).value()
-    if abs(J_vals.imag).max() == 0.0:
-        J_vals = J_vals.real
+        return forward_tlm(dMs[:-1], *M1).value()
+
+    J_vals = perturbed_J_values(J_value, eps.shape[0], processes=processes,
+                                comm=function_comm(M1[0]))
 
     error_norms_0 = abs(J_vals - J_val)
     orders_0 = np.log(error_norms_0[1:] / error_norms_0[:-1]) / np.log(0.5)
@@ -273,13 +369,13 @@ def taylor_test_tlm(forward, M, tlm_order, seed=1.0e-2, dMs=None, size=5,
 
 @local_caches
 def taylor_test_tlm_adjoint(forward, M, adjoint_order, seed=1.0e-2, dMs=None,
-                            size=5, manager=None):
+                            size=5, manager=None, *, processes=None):
     if not isinstance(M, Sequence):
         if dMs is not None:
             dMs = tuple((dM,) for dM in dMs)
         return taylor_test_tlm_adjoint(
             forward, (M,), adjoint_order, seed=seed, dMs=dMs, size=size,
-            manager=manager)
+            manager=manager, processes=processes)
 
     forward = wrapped_forward(forward)
     if manager is None:
@@ -287,24 +383,11 @@ def taylor_test_tlm_adjoint(forward, M, adjoint_order, seed=1.0e-2, dMs=None,
     tlm_manager = manager.new()
     tlm_manager.stop()
 
-    M = tuple(function_copy(m, name=function_name(m),
-                            static=function_is_static(m),
-                            cache=function_is_cached(m),
-                            checkpoint=function_is_checkpointed(m)) for m in M)
+    M = control_copy(M)
 
     if dMs is None:
         dM_test = None
-        dMs = tuple(tuple(function_new(m, static=True) for m in M)
-                    for i in range(adjoint_order - 1))
-        for dM in dMs:
-            for dm in dM:
-                dm_arr = np.random.random(function_local_size(dm))
-                if issubclass(function_dtype(dm),
-                              (complex, np.complexfloating)):
-                    dm_arr = dm_arr \
-                        + 1.0j * np.random.random(function_local_size(dm))
-                function_set_values(dm, dm_arr)
-                del dm_arr
+        dMs = tuple(random_direction(M) for i in range(adjoint_order - 1))
     else:
         dM_test = dMs[-1]
         dMs = dMs[:-1]
@@ -330,4 +413,217 @@ def taylor_test_tlm_adjoint(forward, M, adjoint_order, seed=1.0e-2, dMs=None,
     dJ = tlm_manager.compute_gradient(J, M)
 
     return taylor_test(forward_tlm, M, J_val, dJ=dJ, seed=seed, dM=dM_test,
-                       size=size, manager=tlm_manager)
+                       size=size, manager=tlm_manager, processes=processes)
+
+
+@local_caches
+def taylor_test_all(forward, M, *, seed=1.0e-2, dM=None, size=5,
+                    processes=None, manager=None):
+    """
+    Perform Taylor remainder verification tests for the forward, the
+    tangent-linear, the adjoint, and Hessian actions. The forward is recorded
+    once, and all tests use the same set of perturbed forward runs.
+
+    Arguments:
+
+    forward  A callable which takes as input one or more functions defining the
+             value of the control, and returns the functional.
+    M        A function, or a sequence of functions. The control parameters.
+    seed     (Optional) The maximum scaling for the perturbation is seed
+             multiplied by the inf norm of the reference value (degrees of
+             freedom inf norm) of the control (or 1 if this is less than 1).
+    dM       A perturbation direction. Values generated using
+             numpy.random.random are used if not supplied.
+    size     (Optional) The number of perturbed forward runs used in the test.
+    processes  (Optional) If supplied then the perturbed forward runs are
+             performed concurrently. Either an integer, in which case a pool of
+             this many processes is used, supported only in serial and if MPI
+             has not been initialized, or an MPI communicator, in which case
+             the runs are distributed between groups of processes, one group
+             for each copy of the model. See perturbed_J_values.
+    manager  (Optional) The equation manager.
+
+    Returns a dictionary with keys "forward", "tlm", "adjoint", and "hessian",
+    with values equal to the minimum orders of convergence obtained for each
+    test.
+    """
+
+    if not isinstance(M, Sequence):
+        if dM is not None:
+            dM = (dM,)
+        return taylor_test_all(forward, (M,), seed=seed, dM=dM, size=size,
+                               processes=processes, manager=manager)
+
+    logger = logging.getLogger("tlm_adjoint.verification")
+    forward = wrapped_forward(forward)
+    if manager is None:
+        manager = _manager()
+    tlm_manager = manager.new("memory", {})
+    tlm_manager.stop()
+
+    M = control_copy(M)
+    M1 = control_new(M)
+
+    eps = perturbation_scales(M, seed, size)
+    if dM is None:
+        dM = random_direction(M)
+
+    @restore_manager
+    def forward_tlm(*M):
+        set_manager(tlm_manager)
+        reset_manager()
+        stop_manager()
+        clear_caches()
+
+        configure_tlm((M, dM))
+        start_manager(annotate=True, tlm=True)
+        J = forward(*M)
+        dJ = J.tlm_functional((M, dM))
+        stop_manager()
+
+        return J, dJ
+
+    J, dJ_tlm = forward_tlm(*M)
+    J_val = J.value()
+    dJ_val_tlm = dJ_tlm.value()
+    dJ, ddJ = tlm_manager.compute_gradient([J, dJ_tlm], M)
+    dJ_val = functions_inner(dM, dJ)
+    ddJ_val = functions_inner(dM, ddJ)
+    del J, dJ_tlm, dJ, ddJ
+
+    @restore_manager
+    def J_value(i):
+        assert len(M) == len(M1)
+        assert len(M) == len(dM)
+        for m0, m1, dm in zip(M, M1, dM):
+            function_assign(m1, m0)
+            function_axpy(m1, eps[i], dm)
+        set_manager(tlm_manager)
+        reset_manager()
+        stop_manager()
+        clear_caches()
+        return forward(*M1).value()
+
+    J_vals = perturbed_J_values(J_value, eps.shape[0], processes=processes,
+                                comm=function_comm(M1[0]))
+
+    min_orders = {}
+    for key, error_norms in \
+            [("forward", abs(J_vals - J_val)),
+             ("tlm", abs(J_vals - J_val - eps * dJ_val_tlm)),
+             ("adjoint", abs(J_vals - J_val - eps * dJ_val)),
+             ("hessian", abs(J_vals - J_val - eps * dJ_val
+                             - 0.5 * eps * eps * ddJ_val))]:
+        orders = np.log(error_norms[1:] / error_norms[:-1]) / np.log(0.5)
+        logger.info(f"Error norms, {key:s} = {error_norms}")
+        logger.info(f"Orders,      {key:s} = {orders}")
+        min_orders[key] = orders.min()
+    return min_orders
+
+
+@local_caches
+def taylor_test_tlm_adjoint_orders(forward, M, adjoint_order, seed=1.0e-2,
+                                   dMs=None, size=5, manager=None, *,
+                                   processes=None):
+    """
+    Perform the verification tests of taylor_test_tlm_adjoint for all adjoint
+    orders up to and including adjoint_order. The forward, with all
+    tangent-linears, is recorded once, and derivatives for all orders are
+    computed using a single adjoint calculation.
+
+    If dMs is supplied then the test for adjoint order k is equivalent to
+    calling taylor_test_tlm_adjoint with adjoint order k and with the first k
+    directions in dMs -- that is, the first k - 1 directions define the
+    tangent-linears, and direction k is the perturbation direction. The
+    perturbed forward runs, each of which computes all tangent-linears, are
+    shared between orders with the same perturbation direction. If dMs is not
+    supplied then random tangent-linear directions are used, and a single
+    random perturbation direction is used for all orders, so that one set of
+    perturbed forward runs is shared by all orders.
+
+    Arguments are as for taylor_test_tlm_adjoint. Returns a tuple containing
+    the minimum orders of convergence obtained for each adjoint order, starting
+    from one.
+    """
+
+    if not isinstance(M, Sequence):
+        if dMs is not None:
+            dMs = tuple((dM,) for dM in dMs)
+        return taylor_test_tlm_adjoint_orders(
+            forward, (M,), adjoint_order, seed=seed, dMs=dMs, size=size,
+            manager=manager, processes=processes)
+
+    logger = logging.getLogger("tlm_adjoint.verification")
+    forward = wrapped_forward(forward)
+    if manager is None:
+        manager = _manager()
+    tlm_manager = manager.new()
+    tlm_manager.stop()
+
+    M = control_copy(M)
+    M1 = control_new(M)
+
+    eps = perturbation_scales(M, seed, size)
+    if dMs is None:
+        dMs = tuple(random_direction(M) for i in range(adjoint_order - 1))
+        dM_tests = (random_direction(M),) * adjoint_order
+    else:
+        if len(dMs) != adjoint_order:
+            raise ValueError("Invalid directions")
+        dM_tests = tuple(dMs)
+        dMs = tuple(dMs[:-1])
+
+    @restore_manager
+    def forward_tlm(*M, annotate=False):
+        set_manager(tlm_manager)
+        reset_manager()
+        stop_manager()
+        clear_caches()
+
+        configure_tlm(*[(M, dM) for dM in dMs],
+                      annotate=annotate)
+        start_manager(annotate=annotate, tlm=True)
+        J = forward(*M)
+        Js = [J]
+        for dM in dMs:
+            J = J.tlm_functional((M, dM))
+            Js.append(J)
+        stop_manager()
+
+        return Js
+
+    Js = forward_tlm(*M, annotate=True)
+    J_val = np.array([J.value() for J in Js], dtype=np.complex128)
+    dJs = tlm_manager.compute_gradient(Js, M)
+    dJ_val = np.array([functions_inner(dM_test, dJ)
+                       for dM_test, dJ in zip(dM_tests, dJs)],
+                      dtype=np.complex128)
+    del Js, dJs
+
+    # Group orders by perturbation direction
+    orders_dM = {}
+    for k, dM_test in enumerate(dM_tests):
+        orders_dM.setdefault(id(dM_test), (dM_test, []))[1].append(k)
+
+    min_orders = [None for k in range(adjoint_order)]
+    for dM_test, ks in orders_dM.values():
+        def J_value(i):
+            assert len(M) == len(M1)
+            assert len(M) == len(dM_test)
+            for m0, m1, dm in zip(M, M1, dM_test):
+                function_assign(m1, m0)
+                function_axpy(m1, eps[i], dm)
+            return [J.value() for J in forward_tlm(*M1)[:max(ks) + 1]]
+
+        J_vals = perturbed_J_values(J_value, eps.shape[0],
+                                    processes=processes,
+                                    comm=function_comm(M1[0]))
+
+        for k in ks:
+            error_norms = abs(J_vals[:, k] - J_val[k] - eps * dJ_val[k])
+            orders = np.log(error_norms[1:] / error_norms[:-1]) / np.log(0.5)
+            logger.info(f"Error norms, adjoint order {k + 1:d} = "
+                        f"{error_norms}")
+            logger.info(f"Orders,      adjoint order {k + 1:d} = {orders}")
+            min_orders[k] = orders.min()
+    return tuple(min_orders)